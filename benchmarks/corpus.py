@@ -0,0 +1,130 @@
+"""Gerador determinístico de chamados sintéticos no formato das mensagens do Jira.
+
+As mensagens misturam o que aparece na coleção `interacoes`: marcação `{color}`
+e `{adf}`, tags gccode, anexos e imagens, tabelas vazias, URLs e dados pessoais
+(CPF, e-mail, telefone e nomes em português). A mesma semente gera sempre o
+mesmo corpus, para que as medições sejam comparáveis entre execuções.
+"""
+import random
+from typing import Dict, Iterator, List
+
+NOMES = [
+    "João", "Maria", "Ana", "Pedro", "Lucas", "Juliana", "Carlos", "Fernanda", "Rafael", "Beatriz",
+    "Gabriel", "Larissa", "Marcos", "Patrícia", "Thiago", "Camila", "Felipe", "Aline", "Rodrigo", "Letícia",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Pereira", "Lima", "Carvalho", "Ferreira", "Rodrigues", "Almeida",
+    "Costa", "Gomes", "Martins", "Araújo", "Ribeiro", "Barbosa", "da Silva", "dos Santos", "de Oliveira",
+]
+DOMINIOS = ["empresa.com.br", "gmail.com", "hotmail.com", "cliente.com", "outlook.com"]
+SAUDACOES = ["Bom dia", "Boa tarde", "Olá", "Prezados", "Prezado", "Gentileza", "Solicito", "Gostaria"]
+ASSUNTOS = [
+    "não consigo acessar o sistema desde ontem",
+    "o relatório de vendas está exibindo valores duplicados",
+    "preciso liberar o acesso ao módulo financeiro",
+    "a integração com o ERP parou de enviar os pedidos",
+    "o boleto do contrato {numero} foi gerado com a data errada",
+    "ao salvar o cadastro aparece a mensagem de erro {numero}",
+    "a nota fiscal {numero} não foi transmitida",
+    "o usuário foi bloqueado após trocar a senha",
+    "a tela de login fica carregando indefinidamente",
+    "favor cancelar o pedido {numero} que foi aberto em duplicidade",
+]
+COMPLEMENTOS = [
+    "Segue print em anexo.",
+    "Já tentei limpar o cache do navegador.",
+    "O problema acontece com todos os usuários da filial.",
+    "Isso está impactando o fechamento do mês.",
+    "Aguardo retorno com urgência.",
+    "Consegui reproduzir no ambiente de homologação também.",
+]
+DESPEDIDAS = ["Atenciosamente,", "Obrigado.", "Obrigada!", "Att,", "Fico no aguardo."]
+CORES = ["#172b4d", "#5b5b5b", "#ff5630", "#000000"]
+EXTENSOES = ["png", "jpg", "pdf", "docx", "xlsx"]
+
+
+def _cpf(rng: random.Random) -> str:
+    digitos = [rng.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * (tamanho + 1 - i) for i, d in enumerate(digitos[:tamanho]))
+        digitos.append((soma * 10 % 11) % 10)
+    texto = "".join(map(str, digitos))
+    if rng.random() < 0.7:
+        return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+    return texto
+
+
+def _telefone(rng: random.Random) -> str:
+    ddd = rng.choice([11, 12, 19, 21, 31, 41, 48, 51, 61, 71, 81, 85])
+    if rng.random() < 0.7:
+        return f"({ddd}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+    return f"{ddd}9{rng.randint(10000000, 99999999)}"
+
+
+def _nome(rng: random.Random) -> str:
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _email(rng: random.Random, nome: str) -> str:
+    usuario = nome.split()[0].lower().translate(str.maketrans("áãâéêíóôõúç", "aaaeeiooouc"))
+    return f"{usuario}.{rng.randint(1, 999)}@{rng.choice(DOMINIOS)}"
+
+
+def gerar_mensagem(rng: random.Random) -> str:
+    """Gera uma mensagem de chamado com marcação do Jira e dados pessoais"""
+    nome = _nome(rng)
+    assunto = rng.choice(ASSUNTOS).format(numero=rng.randint(1000, 99999))
+    partes = []
+
+    if rng.random() < 0.3:
+        partes.append(f"<[ #gccode#{rng.randint(1, 99)}:{rng.randint(0, 59)}:{rng.randint(0, 59)}:AB:{rng.randint(1, 9)}#!")
+    if rng.random() < 0.6:
+        partes.append(f"Tarefa: {rng.choice(SAUDACOES)}, {assunto}.")
+    else:
+        partes.append(f"{rng.choice(SAUDACOES)}, {assunto}.")
+
+    if rng.random() < 0.5:
+        cor = rng.choice(CORES)
+        partes.append(f"{{color:{cor}}}Sou {nome} e {rng.choice(COMPLEMENTOS).lower()}{{color}}")
+    else:
+        partes.append(rng.choice(COMPLEMENTOS))
+
+    dados = []
+    if rng.random() < 0.4:
+        dados.append(f"CPF {_cpf(rng)}")
+    if rng.random() < 0.5:
+        dados.append(f"e-mail {_email(rng, nome)}")
+    if rng.random() < 0.4:
+        dados.append(f"telefone {_telefone(rng)}")
+    if dados:
+        partes.append("Meus dados: " + ", ".join(dados) + ".")
+
+    if rng.random() < 0.3:
+        partes.append(f"Falei com {_nome(rng)} do suporte, mas não resolveu.")
+    if rng.random() < 0.25:
+        partes.append(f"{{adf}}{{\"type\":\"doc\",\"content\":[{rng.randint(1, 9)}]}}{{adf}}")
+    if rng.random() < 0.3:
+        partes.append(f"|!https://jira.exemplo.com/secure/attachment/{rng.randint(10000, 99999)}/image.png!|")
+    if rng.random() < 0.3:
+        partes.append(f"[print_{rng.randint(1, 99)}.{rng.choice(EXTENSOES)}]")
+    if rng.random() < 0.2:
+        partes.append(f"* {rng.randint(1, 4)} anexos *")
+    if rng.random() < 0.2:
+        partes.append("| | |")
+    if rng.random() < 0.2:
+        partes.append(f"Link: https://jira.exemplo.com/browse/SUP-{rng.randint(100, 9999)}")
+
+    partes.append(f"{rng.choice(DESPEDIDAS)}\n{nome}")
+    separadores = ["\n", "\r\n", " ", "  \n"]
+    return "".join(parte + rng.choice(separadores) for parte in partes).strip()
+
+
+def gerar_chamados(quantidade: int, semente: int = 42) -> List[Dict]:
+    """Documentos no formato da coleção `interacoes`"""
+    return list(iterar_chamados(quantidade, semente))
+
+
+def iterar_chamados(quantidade: int, semente: int = 42) -> Iterator[Dict]:
+    rng = random.Random(semente)
+    for i in range(quantidade):
+        yield {"chamadoId": f"SUP-{i:06d}", "mensagem": gerar_mensagem(rng)}
@@ -0,0 +1,62 @@
+"""Compara inicialização e memória do Anonimizador com e sem o pipeline compartilhado.
+
+Cada modo roda em um subprocesso separado para que o pico de memória (RSS)
+reflita apenas o carregamento daquele modo.
+
+Uso:
+    python -m benchmarks.inicializacao_anonimizador
+"""
+import json
+import os
+import subprocess
+import sys
+
+TEXTOS_AMOSTRA = [
+    "Olá, o colaborador João Silva solicitou acesso ao sistema. CPF 123.456.789-09",
+    "Bom dia, favor atualizar o cadastro da cliente Maria Souza, e-mail maria.souza@empresa.com.br",
+    "Solicito a exclusão do contrato. Contato: (11) 98765-4321",
+    "Erro ao gerar relatório mensal no módulo financeiro",
+] * 25
+
+_SCRIPT_MEDICAO = """
+import json, resource, time
+inicio = time.perf_counter()
+from modules.anonimo.service import Anonimizador
+anonimizador = Anonimizador()
+carregamento = time.perf_counter() - inicio
+textos = json.loads(input())
+inicio = time.perf_counter()
+for texto in textos:
+    anonimizador.anonimizar_texto(texto)
+processamento = time.perf_counter() - inicio
+print(json.dumps({
+    "carregamento_s": carregamento,
+    "textos_por_s": len(textos) / processamento,
+    "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def medir(compartilhado: bool) -> dict:
+    env = dict(os.environ, ANONIMIZADOR_PIPELINE_COMPARTILHADO=str(compartilhado).lower())
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDICAO],
+        input=json.dumps(TEXTOS_AMOSTRA),
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    modos = {"antigo (2 modelos)": medir(False), "compartilhado": medir(True)}
+
+    print(f"{'modo':<22}{'carregamento (s)':>18}{'textos/s':>12}{'pico RSS (MB)':>16}")
+    for nome, m in modos.items():
+        print(f"{nome:<22}{m['carregamento_s']:>18.2f}{m['textos_por_s']:>12.1f}{m['pico_rss_mb']:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Microbenchmark do motor de regras de limpeza contra as implementações anteriores.
+
+As funções `_limpar_mensagem_original` e `_limpar_descricao_original` reproduzem
+as versões que recompilavam e aplicavam cada regex a cada chamada.
+
+Uso:
+    python -m benchmarks.limpeza
+"""
+import json
+import re
+import timeit
+from pathlib import Path
+
+from modules.tratamento_mensagem.service import limpar_mensagem
+from modules.tratamento_descricao_dataset.service import limpar_descricao
+
+CORPUS = Path(__file__).resolve().parent.parent / "tests" / "dados" / "golden_limpeza.json"
+
+
+def _limpar_mensagem_original(mensagem):
+    if not mensagem:
+        return ""
+    padroes = [
+        r'\{color:[^}]+\}', r'https?://\S+', r'\|!https?://[^|]+\!\|', r'\|\s*\|',
+        r'\{adf\}.*?\{adf\}', r'<\[ #gccode#[^\]]+#!', r'[\r\n]+', r'\s{2,}'
+    ]
+    for padrao in padroes:
+        mensagem = re.sub(padrao, ' ', mensagem)
+    return mensagem.strip()
+
+
+def _limpar_descricao_original(descricao):
+    if not isinstance(descricao, str):
+        return ''
+    descricao = descricao.strip()
+    if not descricao:
+        return ''
+    if re.compile(r'take\s+\d+\s+min\s+today\s+to\s+see\s+your\s+monitors', re.IGNORECASE).search(descricao):
+        return ''
+    for pattern in [r'^<\[ ', r'postman\s+inc', r'avoid\s+suspension\s+of\s+your\s+postman\s+account']:
+        if re.search(pattern, descricao, re.IGNORECASE):
+            return ''
+    cleaning_patterns = [
+        (r'\{color[^}]*\}', ''), (r'#gccode#\d+:\d+:\d+:[A-Za-z]+:\d+#', ''), (r'<\[ #gccode#[^\]]+#!', ''),
+        (r'\{adf\}.*?\{adf\}', '', re.DOTALL), (r'^\d+\s*', ''), (r'^\[\d+-', ''), (r'h\d+\.\s*\w+', ''),
+        (r'\*\s*\d+\s*anexos?\s*\*', ''), (r'\[[^\]]+\.(pdf|jpe?g|png|docx?|xlsx?)\]', '', re.IGNORECASE),
+        (r'(\s*\[){2,}', ' '), (r'(\s*\]){2,}', ' '), (r'[\]\},]+', ''), (r'^\W+', ''), (r'\s+', ' ')
+    ]
+    for pattern in cleaning_patterns:
+        if len(pattern) == 2:
+            descricao = re.sub(pattern[0], pattern[1], descricao, flags=re.IGNORECASE)
+        else:
+            descricao = re.sub(pattern[0], pattern[1], descricao, flags=pattern[2])
+    descricao = descricao.strip()
+    if not descricao or len(descricao) < 3 or not any(c.isalnum() for c in descricao):
+        return ''
+    return descricao
+
+
+def _medir(funcao, textos, repeticoes=20):
+    tempo = min(timeit.repeat(lambda: [funcao(t) for t in textos], number=1, repeat=repeticoes))
+    return len(textos) / tempo
+
+
+def main():
+    textos = [caso["mensagem"] for caso in json.loads(CORPUS.read_text(encoding="utf-8"))]
+
+    comparacoes = [
+        ("limpar_mensagem", _limpar_mensagem_original, limpar_mensagem),
+        ("limpar_descricao", _limpar_descricao_original, limpar_descricao),
+    ]
+    print(f"{'função':<18}{'original (txt/s)':>18}{'motor (txt/s)':>16}{'ganho':>8}")
+    for nome, original, atual in comparacoes:
+        antes, depois = _medir(original, textos), _medir(atual, textos)
+        print(f"{nome:<18}{antes:>18.0f}{depois:>16.0f}{depois / antes:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Vazão da limpeza por coluna (pyarrow.compute) contra o caminho escalar documento a documento.
+
+Cada etapa recebe a saída da anterior sobre o corpus sintético e é medida de
+duas formas com a mesma entrada: `serie.map(funcao)` e a função `*_serie`
+correspondente. Antes de medir confere que as duas produzem o mesmo resultado.
+
+Uso:
+    python -m benchmarks.limpeza_vetorizada
+    python -m benchmarks.limpeza_vetorizada --quantidade 100000
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+from benchmarks.corpus import gerar_chamados
+from modules.tratamento_mensagem.service import limpar_mensagem, limpar_serie as limpar_mensagens
+from modules.nova_tabela_descricao_dataset.service import extrair_descricao, extrair_serie
+from modules.tratamento_descricao_dataset.service import limpar_descricao, limpar_serie as limpar_descricoes
+
+QUANTIDADE = 20000
+SEMENTE = 42
+
+
+def _medir(funcao, serie, repeticoes):
+    tempo = min(timeit.repeat(lambda: funcao(serie), number=1, repeat=repeticoes))
+    return len(serie) / tempo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quantidade", type=int, default=QUANTIDADE)
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    mensagens = pd.Series([c["mensagem"] for c in gerar_chamados(args.quantidade, args.semente)])
+    etapas = []
+    entrada = mensagens
+    for nome, escalar, vetorizada in [
+        ("limpar_mensagem", limpar_mensagem, limpar_mensagens),
+        ("extrair_descricao", extrair_descricao, extrair_serie),
+        ("limpar_descricao", limpar_descricao, limpar_descricoes),
+    ]:
+        saida = vetorizada(entrada)
+        if saida.tolist() != entrada.map(escalar).tolist():
+            raise SystemExit(f"{nome}: o caminho vetorizado diverge do escalar")
+        etapas.append((nome, escalar, vetorizada, entrada))
+        entrada = saida
+
+    print(f"{'etapa':<20}{'escalar (txt/s)':>17}{'vetorizado (txt/s)':>20}{'ganho':>8}")
+    for nome, escalar, vetorizada, entrada in etapas:
+        antes = _medir(lambda serie: serie.map(escalar), entrada, args.repeticoes)
+        depois = _medir(vetorizada, entrada, args.repeticoes)
+        print(f"{nome:<20}{antes:>17.0f}{depois:>20.0f}{depois / antes:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Memória por worker do servidor de produção, com e sem o pré-carregamento do modelo no mestre.
+
+Sobe o gunicorn (gunicorn.conf.py) com --workers workers em cada modo,
+aquece todos com textos da amostra de PII via /processar-stream e reporta o
+RSS e o PSS de cada processo, lidos de /proc/<pid>/smaps_rollup (o modo
+sem_freeze pré-carrega sem congelar o GC):
+
+  - RSS conta as páginas compartilhadas em todos os processos que as mapeiam;
+  - PSS divide cada página compartilhada entre eles, então a soma do PSS é a
+    memória que o servidor ocupa de fato no nó.
+
+O MongoDB não é necessário para a medição; sem ele a inicialização de cada
+worker espera o timeout de seleção do servidor. Use um MONGO_URI com
+serverSelectionTimeoutMS baixo para encurtar.
+
+Uso:
+    python -m benchmarks.memoria_workers --workers 4
+    # Sem o pt_core_news instalado: pipeline sintético com 500 mil vetores de 300 dimensões (~ lg)
+    python -m benchmarks.memoria_workers --workers 4 --sintetico 500000
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from modules.shared.metricas import memoria_processo
+
+RAIZ = Path(__file__).resolve().parent.parent
+AMOSTRA = RAIZ / "tests" / "dados" / "amostra_pii.json"
+MODOS = {
+    "preload": {"SERVIDOR_PRELOAD": "true", "SERVIDOR_CONGELAR_GC": "true"},
+    "sem_freeze": {"SERVIDOR_PRELOAD": "true", "SERVIDOR_CONGELAR_GC": "false"},
+    "sem_preload": {"SERVIDOR_PRELOAD": "false"},
+}
+ESPERA_MAX_S = 300
+
+
+def criar_modelo_sintetico(destino: Path, vetores: int, dimensoes: int = 300) -> str:
+    """Pipeline no formato dos pt_core_news (tok2vec + NER) com uma tabela de vetores do tamanho pedido"""
+    import numpy
+    import spacy
+
+    nlp = spacy.blank("pt")
+    nlp.add_pipe("tok2vec")
+    nlp.add_pipe("ner").add_label("PER")
+    nlp.initialize()
+    nlp.vocab.reset_vectors(shape=(vetores, dimensoes))
+    aleatorio = numpy.random.default_rng(0)
+    for inicio in range(0, vetores, 50000):
+        fim = min(inicio + 50000, vetores)
+        nlp.vocab.vectors.data[inicio:fim] = aleatorio.random((fim - inicio, dimensoes), dtype="float32")
+        for linha in range(inicio, fim):
+            nlp.vocab.vectors.add(f"palavra{linha}", row=linha)
+    nlp.to_disk(destino)
+    return str(destino)
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _filhos(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as arquivo:
+            return [int(filho) for filho in arquivo.read().split()]
+    except OSError:
+        return []
+
+
+def _postar(porta: int, textos):
+    requisicao = urllib.request.Request(
+        f"http://127.0.0.1:{porta}/api/v1/processar-stream",
+        data=json.dumps({"textos": textos}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(requisicao, timeout=ESPERA_MAX_S) as resposta:
+        return resposta.read()
+
+
+def medir(modo: str, workers: int, env_base: dict, requisicoes: int) -> dict:
+    porta = _porta_livre()
+    env = dict(
+        env_base,
+        API_PORT=str(porta),
+        SERVIDOR_WORKERS=str(workers),
+        **MODOS[modo],
+        SAUDE_AQUECIMENTO="sincrono",
+        INGESTAO_MODO="desligado",
+    )
+    mestre = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        inicio = time.monotonic()
+        while True:
+            if mestre.poll() is not None:
+                raise RuntimeError(f"gunicorn terminou com código {mestre.returncode}")
+            if time.monotonic() - inicio > ESPERA_MAX_S:
+                raise RuntimeError("workers não ficaram prontos a tempo")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{porta}/health/live", timeout=1).read()
+                if len(_filhos(mestre.pid)) == workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.5)
+        inicializacao = time.monotonic() - inicio
+
+        # Tráfego suficiente para todos os workers anonimizarem (e tocarem nas páginas do modelo)
+        textos = [caso["texto"] for caso in json.loads(AMOSTRA.read_text(encoding="utf-8"))]
+        for _ in range(requisicoes * workers):
+            _postar(porta, textos)
+        time.sleep(1)
+
+        memoria_workers = [memoria_processo(pid) for pid in _filhos(mestre.pid)]
+        return {
+            "inicializacao_s": inicializacao,
+            "mestre": memoria_processo(mestre.pid),
+            "workers": memoria_workers,
+        }
+    finally:
+        mestre.send_signal(signal.SIGTERM)
+        mestre.wait(timeout=60)
+
+
+def _mb(valor) -> str:
+    return f"{valor / 2 ** 20:>10.0f}" if valor is not None else f"{'n/d':>10}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    parser.add_argument("--requisicoes", type=int, default=5, help="requisições de aquecimento por worker")
+    parser.add_argument("--sintetico", type=int, metavar="VETORES",
+                        help="usa um pipeline sintético com VETORES vetores em vez de ANONIMIZADOR_MODELO")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as temporario:
+        if args.sintetico:
+            env["ANONIMIZADOR_MODELO"] = criar_modelo_sintetico(Path(temporario) / "pt_sintetico", args.sintetico)
+
+        print(f"{'modo':<13}{'início (s)':>11}{'mestre RSS':>11}{'worker RSS':>11}{'worker PSS':>11}"
+              f"{'Σ RSS':>10}{'Σ PSS':>10}  (MB; worker = média, Σ = mestre + workers)")
+        for modo in args.modos:
+            m = medir(modo, args.workers, env, args.requisicoes)
+            workers = m["workers"]
+            rss = [w["rss"] for w in workers]
+            pss = [w.get("pss") for w in workers]
+            tem_pss = all(p is not None for p in pss) and "pss" in m["mestre"]
+            print(f"{modo:<13}{m['inicializacao_s']:>11.1f}{_mb(m['mestre']['rss']):>11}"
+                  f"{_mb(sum(rss) / len(rss)):>11}{_mb(sum(pss) / len(pss) if tem_pss else None):>11}"
+                  f"{_mb(m['mestre']['rss'] + sum(rss))}"
+                  f"{_mb(m['mestre']['pss'] + sum(pss) if tem_pss else None)}")
+
+
+if __name__ == "__main__":
+    main()
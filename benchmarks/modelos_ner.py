@@ -0,0 +1,102 @@
+"""Precisão x velocidade do Anonimizador em cada nível de modelo spaCy e recorte do pipeline.
+
+Para cada combinação de ANONIMIZADOR_MODELO (lg, md, sm) e
+ANONIMIZADOR_COMPONENTES (completo, ner) reporta, na amostra rotulada de PII:
+
+  - carregamento (s) e pico de memória (RSS) do processo;
+  - vazão em textos/s, com todos os textos passando pelo NER;
+  - recall: fração das entidades rotuladas que não aparecem mais no texto
+    anonimizado, no total e só para nomes (PERSON), que dependem do NER;
+  - falsos positivos: textos sem entidade rotulada que foram alterados.
+
+Cada combinação roda em um subprocesso com o cache desligado; modelos não
+instalados aparecem como tal.
+
+Uso:
+    python -m benchmarks.modelos_ner
+    python -m benchmarks.modelos_ner --modelos lg sm --componentes ner --vetores descartar
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+AMOSTRA = Path(__file__).resolve().parent.parent / "tests" / "dados" / "amostra_pii.json"
+MODELOS = ["lg", "md", "sm"]
+COMPONENTES = ["completo", "ner"]
+REPETICOES = 10
+
+_SCRIPT_MEDICAO = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from modules.anonimo.service import Anonimizador
+anonimizador = Anonimizador()
+carregamento = time.perf_counter() - inicio
+amostra = json.loads(open(sys.argv[1], encoding="utf-8").read())
+repeticoes = int(sys.argv[2])
+inicio = time.perf_counter()
+for _ in range(repeticoes):
+    saidas = [anonimizador.anonimizar_texto(caso["texto"]) for caso in amostra]
+duracao = time.perf_counter() - inicio
+entidades = [(e["tipo"], e["texto"], saida) for caso, saida in zip(amostra, saidas) for e in caso["entidades"]]
+nomes = [e for e in entidades if e[0] == "PERSON"]
+negativos = [(caso["texto"], saida) for caso, saida in zip(amostra, saidas) if not caso["entidades"]]
+print(json.dumps({
+    "componentes": anonimizador.nlp.pipe_names,
+    "carregamento_s": carregamento,
+    "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "textos_por_s": len(amostra) * repeticoes / duracao,
+    "recall": sum(texto not in saida for _, texto, saida in entidades) / len(entidades),
+    "recall_nomes": sum(texto not in saida for _, texto, saida in nomes) / max(len(nomes), 1),
+    "falsos_positivos": sum(texto != saida for texto, saida in negativos),
+    "negativos": len(negativos),
+}))
+"""
+
+
+def medir(modelo: str, componentes: str, vetores: str) -> dict:
+    env = dict(
+        os.environ,
+        ANONIMIZADOR_MODELO=modelo,
+        ANONIMIZADOR_COMPONENTES=componentes,
+        ANONIMIZADOR_VETORES=vetores,
+        ANONIMIZADOR_TRIAGEM="desligado",
+        CACHE_ANONIMIZACAO="desligado",
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDICAO, str(AMOSTRA), str(REPETICOES)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if resultado.returncode != 0:
+        if "Modelo de linguagem não disponível" in resultado.stderr:
+            return {"erro": "não instalado"}
+        return {"erro": resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else "falhou"}
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modelos", nargs="+", default=MODELOS)
+    parser.add_argument("--componentes", nargs="+", choices=COMPONENTES, default=COMPONENTES)
+    parser.add_argument("--vetores", choices=["manter", "descartar"], default="manter")
+    args = parser.parse_args()
+
+    print(f"{'modelo':<8}{'componentes':<13}{'carga (s)':>10}{'RSS (MB)':>10}{'textos/s':>10}"
+          f"{'recall':>8}{'nomes':>8}{'falsos +':>10}  pipeline")
+    for modelo in args.modelos:
+        for componentes in args.componentes:
+            m = medir(modelo, componentes, args.vetores)
+            if "erro" in m:
+                print(f"{modelo:<8}{componentes:<13}  {m['erro']}")
+                continue
+            print(f"{modelo:<8}{componentes:<13}{m['carregamento_s']:>10.1f}{m['pico_rss_mb']:>10.0f}"
+                  f"{m['textos_por_s']:>10.1f}{m['recall']:>8.1%}{m['recall_nomes']:>8.1%}"
+                  f"{m['falsos_positivos']:>5}/{m['negativos']:<4}  {','.join(m['componentes'])}")
+
+
+if __name__ == "__main__":
+    main()
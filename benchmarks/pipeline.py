@@ -0,0 +1,272 @@
+"""Benchmark das etapas do pipeline e do caminho completo sobre um corpus sintético.
+
+Etapas medidas, cada uma em um subprocesso para que o pico de memória (RSS)
+reflita apenas aquela etapa:
+
+  - limpar_mensagem, extrair_descricao, limpar_descricao e anonimizar_texto,
+    chamadas documento a documento sobre a saída da etapa anterior;
+  - ponta_a_ponta: `processar_e_obter_descricoes` com o MongoDB substituído pelo
+    mongomock e um /prever local, medindo a latência de cada lote gravado.
+    --latencia-mongo-ms e --latencia-prever-ms somam uma espera a cada consulta
+    ou bulk_write e a cada requisição ao /prever, como um banco e um serviço
+    remotos, para medir a sobreposição de E/S e CPU entre os estágios.
+
+Para cada etapa reporta documentos/s, latência p50/p99 e pico de RSS. Os
+resultados podem ser salvos como baseline e comparados nas execuções seguintes;
+a saída é 1 se alguma métrica piorar além da tolerância. Sem uma baseline do
+mesmo corpus para cada etapa pedida a execução falha antes de medir, em vez de
+passar sem comparar nada; --sem-baseline só mede.
+
+Uso:
+    python -m benchmarks.pipeline                      # mede e compara com a baseline
+    python -m benchmarks.pipeline --salvar-baseline    # mede e grava a baseline
+    python -m benchmarks.pipeline --sem-baseline       # só mede
+    python -m benchmarks.pipeline --etapas limpar_mensagem limpar_descricao
+    python -m benchmarks.pipeline --etapas ponta_a_ponta --latencia-mongo-ms 20 --latencia-prever-ms 50
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "pipeline.json"
+ETAPAS = ["limpar_mensagem", "extrair_descricao", "limpar_descricao", "anonimizar_texto", "ponta_a_ponta"]
+QUANTIDADE = 2000
+SEMENTE = 42
+TOLERANCIA = 0.15
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def _pico_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _resumo(documentos: int, duracao_s: float, latencias_s: List[float]) -> Dict:
+    return {
+        "documentos": documentos,
+        "docs_por_s": documentos / duracao_s if duracao_s > 0 else 0.0,
+        "p50_ms": _percentil(latencias_s, 50) * 1000,
+        "p99_ms": _percentil(latencias_s, 99) * 1000,
+        "pico_rss_mb": _pico_rss_mb(),
+    }
+
+
+def _medir_por_documento(funcao: Callable[[str], str], entradas: List[str]) -> Dict:
+    latencias = []
+    inicio = time.perf_counter()
+    for entrada in entradas:
+        t0 = time.perf_counter()
+        funcao(entrada)
+        latencias.append(time.perf_counter() - t0)
+    return _resumo(len(entradas), time.perf_counter() - inicio, latencias)
+
+
+def _entradas_da_etapa(etapa: str, mensagens: List[str]) -> List[str]:
+    """Saída das etapas anteriores, calculada fora da medição"""
+    from modules.tratamento_mensagem.service import limpar_mensagem
+    from modules.nova_tabela_descricao_dataset.service import extrair_descricao
+    from modules.tratamento_descricao_dataset.service import limpar_descricao
+
+    if etapa == "limpar_mensagem":
+        return mensagens
+    limpas = [limpar_mensagem(m) for m in mensagens]
+    if etapa == "extrair_descricao":
+        return limpas
+    descricoes = [extrair_descricao(m) for m in limpas]
+    if etapa == "limpar_descricao":
+        return descricoes
+    return [d for d in (limpar_descricao(d) for d in descricoes if d) if d]
+
+
+def medir_etapa(etapa: str, quantidade: int, semente: int) -> Dict:
+    """Mede uma etapa no processo atual"""
+    from benchmarks.corpus import gerar_chamados
+
+    chamados = gerar_chamados(quantidade, semente)
+    if etapa == "ponta_a_ponta":
+        return _medir_ponta_a_ponta(chamados)
+
+    entradas = _entradas_da_etapa(etapa, [c["mensagem"] for c in chamados])
+
+    if etapa == "limpar_mensagem":
+        from modules.tratamento_mensagem.service import limpar_mensagem as funcao
+    elif etapa == "extrair_descricao":
+        from modules.nova_tabela_descricao_dataset.service import extrair_descricao as funcao
+    elif etapa == "limpar_descricao":
+        from modules.tratamento_descricao_dataset.service import limpar_descricao as funcao
+    elif etapa == "anonimizar_texto":
+        from modules.anonimo.service import Anonimizador
+        inicio = time.perf_counter()
+        anonimizador = Anonimizador()
+        carregamento = time.perf_counter() - inicio
+        resultado = _medir_por_documento(anonimizador.anonimizar_texto, entradas)
+        resultado["carregamento_s"] = carregamento
+        return resultado
+    else:
+        raise ValueError(f"Etapa desconhecida: {etapa}")
+
+    return _medir_por_documento(funcao, entradas)
+
+
+def _medir_ponta_a_ponta(chamados: List[Dict]) -> Dict:
+    import mongomock
+    from modules.shared import database
+    from tests.stub_prever import StubPrever
+
+    latencia_mongo_s = float(os.getenv("BENCHMARK_LATENCIA_MONGO_MS", "0")) / 1000
+    if latencia_mongo_s:
+        from mongomock.collection import Collection
+
+        for nome in ("find", "bulk_write"):
+            def com_latencia(*args, _original=getattr(Collection, nome), **kwargs):
+                time.sleep(latencia_mongo_s)
+                return _original(*args, **kwargs)
+            setattr(Collection, nome, com_latencia)
+
+    database._client = mongomock.MongoClient()
+    stub = StubPrever(atraso_s=float(os.getenv("BENCHMARK_LATENCIA_PREVER_MS", "0")) / 1000)
+
+    from modules.previsao import service as previsao
+    from modules.importacao.controller import processar_e_obter_descricoes
+    from modules.anonimo.service import Anonimizador
+
+    previsao.PREVISAO_URL = stub.url
+    database.get_db()["interacoes"].insert_many([dict(c) for c in chamados])
+    Anonimizador()
+
+    latencias = []
+    marcas = [time.perf_counter()]
+
+    def ao_salvar(chamado_ids):
+        agora = time.perf_counter()
+        latencias.append((agora - marcas[-1]) / max(len(chamado_ids), 1))
+        marcas.append(agora)
+
+    inicio = marcas[0]
+    processar_e_obter_descricoes([c["chamadoId"] for c in chamados], ao_salvar=ao_salvar)
+    duracao = time.perf_counter() - inicio
+    stub.encerrar()
+
+    resultado = _resumo(len(chamados), duracao, latencias or [duracao / max(len(chamados), 1)])
+    resultado["enviados_prever"] = len(stub.recebidos)
+    return resultado
+
+
+def executar(etapa: str, quantidade: int, semente: int) -> Dict:
+    """Mede a etapa em um subprocesso isolado, com o cache do Anonimizador desligado"""
+    env = dict(
+        os.environ,
+        CACHE_ANONIMIZACAO="desligado",
+        MONGODB_DBNAME="benchmark",
+        IMPORTACAO_MODO_EXECUCAO="local",
+        IMPORTACAO_LOTE_ESCRITA="50",
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--medir", etapa,
+         "--quantidade", str(quantidade), "--semente", str(semente)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Falha ao medir {etapa}:\n{resultado.stderr[-2000:]}")
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def comparar(atual: Dict, baseline: Dict, tolerancia: float) -> List[str]:
+    """Lista as métricas que pioraram além da tolerância"""
+    regressoes = []
+    if atual["docs_por_s"] < baseline["docs_por_s"] * (1 - tolerancia):
+        regressoes.append(f"docs/s {atual['docs_por_s']:.1f} < {baseline['docs_por_s']:.1f}")
+    for metrica in ("p50_ms", "p99_ms", "pico_rss_mb"):
+        if atual[metrica] > baseline[metrica] * (1 + tolerancia):
+            regressoes.append(f"{metrica} {atual[metrica]:.2f} > {baseline[metrica]:.2f}")
+    return regressoes
+
+
+def _ambiente() -> Dict:
+    return {"python": platform.python_version(), "maquina": platform.machine(), "cpus": os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--quantidade", type=int, default=QUANTIDADE)
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    parser.add_argument("--sem-baseline", action="store_true", help="só mede, sem comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--latencia-mongo-ms", type=float, default=0)
+    parser.add_argument("--latencia-prever-ms", type=float, default=0)
+    parser.add_argument("--medir", choices=ETAPAS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_etapa(args.medir, args.quantidade, args.semente)))
+        return
+
+    # Lidas pelo subprocesso do ponta_a_ponta
+    os.environ["BENCHMARK_LATENCIA_MONGO_MS"] = str(args.latencia_mongo_ms)
+    os.environ["BENCHMARK_LATENCIA_PREVER_MS"] = str(args.latencia_prever_ms)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    mesmo_corpus = (baseline.get("quantidade"), baseline.get("semente")) == (args.quantidade, args.semente)
+    if not (args.salvar_baseline or args.sem_baseline):
+        # Uma comparação que não acontece não pode passar como "sem regressões"
+        if not baseline:
+            parser.error(f"baseline {args.baseline} não encontrada; gere-a com --salvar-baseline "
+                         "na máquina de referência ou use --sem-baseline")
+        if not mesmo_corpus:
+            parser.error(f"a baseline foi gerada com outro corpus (--quantidade {baseline.get('quantidade')} "
+                         f"--semente {baseline.get('semente')})")
+        faltando = [etapa for etapa in args.etapas if etapa not in baseline.get("etapas", {})]
+        if faltando:
+            parser.error(f"a baseline não tem as etapas {', '.join(faltando)}; grave-as com --salvar-baseline")
+    if args.sem_baseline or (baseline and not mesmo_corpus):
+        baseline = {}
+    if baseline and baseline.get("ambiente") != _ambiente():
+        print(f"Aviso: baseline gerada em outro ambiente ({baseline.get('ambiente')}).")
+
+    resultados = {}
+    regressoes = {}
+    print(f"{'etapa':<20}{'docs/s':>11}{'p50 (ms)':>11}{'p99 (ms)':>11}{'pico RSS (MB)':>16}  comparação")
+    for etapa in args.etapas:
+        m = executar(etapa, args.quantidade, args.semente)
+        resultados[etapa] = m
+        referencia = baseline.get("etapas", {}).get(etapa)
+        if referencia:
+            regressoes[etapa] = comparar(m, referencia, args.tolerancia)
+            situacao = "REGRESSÃO: " + "; ".join(regressoes[etapa]) if regressoes[etapa] else "ok"
+        else:
+            situacao = "sem baseline"
+        print(f"{etapa:<20}{m['docs_por_s']:>11.1f}{m['p50_ms']:>11.3f}{m['p99_ms']:>11.3f}"
+              f"{m['pico_rss_mb']:>16.0f}  {situacao}")
+
+    if args.salvar_baseline:
+        etapas = dict(baseline.get("etapas", {}), **resultados)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "quantidade": args.quantidade,
+            "semente": args.semente,
+            "ambiente": _ambiente(),
+            "etapas": etapas,
+        }, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Baseline gravada em {args.baseline}")
+    elif any(regressoes.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
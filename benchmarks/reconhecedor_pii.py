@@ -0,0 +1,163 @@
+"""Compara o reconhecedor combinado de CPF/e-mail/telefone com os PatternRecognizers de patterns.py.
+
+Gera um corpus rotulado com CPFs, telefones e e-mails em vários formatos e
+com identificadores numéricos (pedidos, protocolos, notas) que não são PII.
+Para cada valor de ANONIMIZADOR_RECONHECEDOR reporta:
+
+  - candidatos: resultados devolvidos pelos reconhecedores do Presidio por
+    texto, antes da resolução de sobreposições e do SCORE_MINIMO;
+  - tempo médio do AnalyzerEngine.analyze por texto;
+  - recall: fração das PII rotuladas que não aparecem mais no texto anonimizado;
+  - precisão: fração dos trechos substituídos que eram PII, contando como
+    falso positivo cada identificador que sumiu do texto.
+
+Cada modo roda em um subprocesso com o cache desligado. Sem o pt_core_news
+instalado o NER usa um pipeline spaCy vazio, o que não afeta a comparação:
+CPF, e-mail e telefone vêm só dos reconhecedores de padrão.
+
+Uso:
+    python -m benchmarks.reconhecedor_pii
+    python -m benchmarks.reconhecedor_pii --textos 5000 --modelo-vazio
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+MODOS = ["padroes", "combinado"]
+DDDS = [11, 19, 21, 27, 31, 41, 47, 48, 51, 61, 62, 71, 81, 85, 91, 98]
+
+_SCRIPT_MEDICAO = """
+import json, sys, time
+from modules.anonimo.service import Anonimizador
+casos = json.loads(open(sys.argv[1], encoding="utf-8").read())
+anonimizador = Anonimizador()
+analyzer = anonimizador.analyzer
+candidatos = 0
+duracao = 0.0
+for caso in casos:
+    artefatos = analyzer.nlp_engine.process_text(caso["texto"], "pt")
+    for reconhecedor in analyzer.registry.get_recognizers("pt", all_fields=True):
+        candidatos += len(reconhecedor.analyze(caso["texto"], reconhecedor.supported_entities, artefatos))
+    inicio = time.perf_counter()
+    anonimizador._analisar(caso["texto"], artefatos)
+    duracao += time.perf_counter() - inicio
+saidas = [anonimizador.anonimizar_texto(caso["texto"]) for caso in casos]
+pii = [(valor, saida) for caso, saida in zip(casos, saidas) for valor in caso["pii"]]
+identificadores = [(valor, saida) for caso, saida in zip(casos, saidas) for valor in caso["identificadores"]]
+removidas = sum(valor not in saida for valor, saida in pii)
+falsos = [valor for valor, saida in identificadores if valor not in saida]
+print(json.dumps({
+    "candidatos": candidatos / len(casos),
+    "analise_us": duracao / len(casos) * 1e6,
+    "recall": removidas / len(pii),
+    "precisao": removidas / max(removidas + len(falsos), 1),
+    "falsos_positivos": len(falsos),
+    "identificadores": len(identificadores),
+}))
+"""
+
+
+def _cpf(rng: random.Random, formatado: bool) -> str:
+    digitos = [rng.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * (tamanho + 1 - i) for i, d in enumerate(digitos[:tamanho]))
+        digitos.append(soma * 10 % 11 % 10)
+    texto = "".join(map(str, digitos))
+    return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}" if formatado else texto
+
+
+def _telefone(rng: random.Random) -> str:
+    ddd = rng.choice(DDDS)
+    celular = rng.random() < 0.6
+    prefixo = f"9{rng.randint(1000, 9999)}" if celular else f"{rng.randint(2, 5)}{rng.randint(100, 999)}"
+    sufixo = f"{rng.randint(0, 9999):04d}"
+    return rng.choice([
+        f"({ddd}) {prefixo}-{sufixo}",
+        f"({ddd}){prefixo}{sufixo}",
+        f"{ddd} {prefixo}-{sufixo}",
+        f"+55 {ddd} {prefixo}-{sufixo}",
+        f"{ddd}{prefixo}{sufixo}",
+    ])
+
+
+def _identificador(rng: random.Random) -> str:
+    return str(rng.randint(10 ** 9, 10 ** 11 - 1))
+
+
+def gerar_casos(quantidade: int, semente: int = 7) -> List[Dict]:
+    """Textos com as PII e os identificadores (não PII) que cada um contém"""
+    rng = random.Random(semente)
+    casos = []
+    for _ in range(quantidade):
+        pii, identificadores, partes = [], [], [rng.choice(["Bom dia", "Prezados", "Olá"]) + ", preciso de ajuda."]
+        if rng.random() < 0.4:
+            cpf = _cpf(rng, rng.random() < 0.6)
+            pii.append(cpf)
+            partes.append(rng.choice(["CPF", "Meu CPF é", "documento"]) + f" {cpf}.")
+        if rng.random() < 0.4:
+            telefone = _telefone(rng)
+            pii.append(telefone)
+            partes.append(rng.choice(["Telefone", "Celular", "Contato:", "Ligar no"]) + f" {telefone}.")
+        if rng.random() < 0.3:
+            email = f"usuario{rng.randint(1, 999)}@{rng.choice(['empresa.com.br', 'gmail.com'])}"
+            pii.append(email)
+            partes.append(f"E-mail {email}.")
+        if rng.random() < 0.6:
+            identificador = _identificador(rng)
+            identificadores.append(identificador)
+            partes.append(rng.choice([
+                f"O pedido {identificador} não foi faturado.",
+                f"Protocolo {identificador}.",
+                f"A nota fiscal nº {identificador} foi rejeitada.",
+                f"O boleto {identificador} venceu.",
+            ]))
+        partes.append(rng.choice(["Aguardo retorno.", "Obrigado.", "Atenciosamente."]))
+        casos.append({"texto": " ".join(partes), "pii": pii, "identificadores": identificadores})
+    return casos
+
+
+def medir(modo: str, arquivo_casos: str, env_base: dict) -> dict:
+    env = dict(env_base, ANONIMIZADOR_RECONHECEDOR=modo, CACHE_ANONIMIZACAO="desligado")
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDICAO, arquivo_casos],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--textos", type=int, default=2000)
+    parser.add_argument("--modelo-vazio", action="store_true", help="usa um pipeline spaCy vazio no lugar do modelo")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as temporario:
+        if args.modelo_vazio:
+            import spacy
+
+            caminho = Path(temporario) / "pt_vazio"
+            spacy.blank("pt").to_disk(caminho)
+            env["ANONIMIZADOR_MODELO"] = str(caminho)
+
+        arquivo_casos = Path(temporario) / "casos.json"
+        arquivo_casos.write_text(json.dumps(gerar_casos(args.textos), ensure_ascii=False), encoding="utf-8")
+
+        print(f"{'reconhecedor':<14}{'candidatos':>11}{'análise (µs)':>14}{'recall':>9}{'precisão':>10}{'falsos +':>14}")
+        for modo in MODOS:
+            m = medir(modo, str(arquivo_casos), env)
+            print(f"{modo:<14}{m['candidatos']:>11.2f}{m['analise_us']:>14.0f}{m['recall']:>9.2%}{m['precisao']:>10.2%}"
+                  f"{m['falsos_positivos']:>8}/{m['identificadores']:<5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compara os modos de triagem do Anonimizador na amostra rotulada de PII.
+
+Para cada modo reporta quantos textos foram pelo NER e quantos só por regex,
+a vazão e o recall: fração das entidades rotuladas que não aparecem mais no
+texto anonimizado. Cada modo roda em um subprocesso com o cache desligado.
+
+Uso:
+    python -m benchmarks.triagem
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+AMOSTRA = Path(__file__).resolve().parent.parent / "tests" / "dados" / "amostra_pii.json"
+REPETICOES = 10
+
+_SCRIPT_MEDICAO = """
+import json, sys, time
+from modules.anonimo.service import Anonimizador
+amostra = json.loads(open(sys.argv[1], encoding="utf-8").read())
+repeticoes = int(sys.argv[2])
+anonimizador = Anonimizador()
+inicio = time.perf_counter()
+for _ in range(repeticoes):
+    saidas = [anonimizador.anonimizar_texto(caso["texto"]) for caso in amostra]
+duracao = time.perf_counter() - inicio
+entidades = [(e["texto"], saida) for caso, saida in zip(amostra, saidas) for e in caso["entidades"]]
+vazadas = [texto for texto, saida in entidades if texto in saida]
+print(json.dumps({
+    "textos_por_s": len(amostra) * repeticoes / duracao,
+    "ner": anonimizador.caminhos["ner"] // repeticoes,
+    "regex": anonimizador.caminhos["regex"] // repeticoes,
+    "recall": 1 - len(vazadas) / len(entidades),
+    "vazadas": vazadas,
+}))
+"""
+
+
+def medir(modo: str) -> dict:
+    env = dict(os.environ, ANONIMIZADOR_TRIAGEM=modo, CACHE_ANONIMIZACAO="desligado")
+    resultado = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDICAO, str(AMOSTRA), str(REPETICOES)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'modo':<12}{'NER':>6}{'regex':>7}{'textos/s':>11}{'recall':>9}  entidades vazadas")
+    for modo in ("desligado", "estrito", "rapido"):
+        m = medir(modo)
+        print(f"{modo:<12}{m['ner']:>6}{m['regex']:>7}{m['textos_por_s']:>11.1f}{m['recall']:>9.2%}  {m['vazadas']}")
+
+
+if __name__ == "__main__":
+    main()
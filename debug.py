@@ -1,11 +1,11 @@
 from fastapi import FastAPI, HTTPException, Request
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from pydantic import BaseModel
 import os
 import uvicorn
 import logging
 from typing import List, Dict, Optional
+from modules.shared.database import fechar_conexoes, get_db_async
 
 # Configuração
 load_dotenv()
@@ -23,25 +23,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Conexão com MongoDB Atlas
-def get_db():
-    return MongoClient(os.getenv("MONGO_URI"))
-
 @app.on_event("startup")
 async def startup_db_client():
     try:
-        client = MongoClient(os.getenv("MONGO_URI"))
-        db = client[os.getenv("MONGODB_DBNAME")]
+        # Mesmo pool da API (MONGODB_POOL_*), em vez de um cliente por requisição
+        db = get_db_async()
         # Testa a conexão
-        db.command('ping')
+        await db.command('ping')
         logger.info("✅ Conectado ao MongoDB com sucesso")
         # Verifica se a coleção existe
-        if "interacoes" not in db.list_collection_names():
+        if "interacoes" not in await db.list_collection_names():
             logger.error("❌ Coleção 'interacoes' não encontrada")
     except Exception as e:
         logger.error(f"❌ Falha na conexão com MongoDB: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+def fechar_db_client():
+    fechar_conexoes()
+
 @app.post("/api/v1/process")
 async def process_ids(request: Request):
     """Endpoint mais tolerante para receber IDs"""
@@ -75,16 +75,15 @@ async def process_ids(request: Request):
 @app.get("/api/v1/items/{item_id}")
 async def get_item(item_id: str):
     try:
-        client = MongoClient(os.getenv("MONGO_URI"))
-        db = client[os.getenv("MONGODB_DBNAME")]
+        db = get_db_async()
         
         logger.info(f"Buscando ID: {item_id}")
         
         # Verifica primeiro se o ID existe
-        if not db["interacoes"].find_one({"chamadoId": item_id}):
+        if not await db["interacoes"].find_one({"chamadoId": item_id}):
             logger.error(f"ID {item_id} não encontrado na coleção")
             # Verifica os primeiros 5 itens para debug
-            sample_items = list(db["interacoes"].find().limit(5))
+            sample_items = await db["interacoes"].find().limit(5).to_list(5)
             logger.info(f"Exemplo de itens no MongoDB: {[item['chamadoId'] for item in sample_items]}")
             
             raise HTTPException(
@@ -92,7 +91,7 @@ async def get_item(item_id: str):
                 detail=f"Item não encontrado. IDs existentes começam com: {[item['chamadoId'] for item in sample_items][:3]}..."
             )
         
-        item = db["interacoes"].find_one(
+        item = await db["interacoes"].find_one(
             {"chamadoId": item_id},
             {"_id": 0}  # Remove o campo _id do resultado
         )
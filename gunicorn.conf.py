@@ -0,0 +1,46 @@
+"""Servidor de produção: gunicorn -c gunicorn.conf.py
+
+O app é importado e o Anonimizador carregado no processo mestre antes do fork,
+então os pesos do modelo spaCy ficam em páginas compartilhadas (copy-on-write)
+por todos os workers. Para desenvolvimento use `python main.py --dev`.
+"""
+import glob
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Modo multiprocesso do prometheus_client: cada worker grava as métricas em arquivos nesta
+# pasta e o /metrics soma os de todos. Precisa estar definido antes do primeiro import do
+# prometheus_client; os arquivos de uma execução anterior são descartados.
+METRICAS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"apolo_metricas_{os.getenv('API_PORT', '8000')}")
+)
+os.makedirs(METRICAS_DIR, exist_ok=True)
+for arquivo in glob.glob(os.path.join(METRICAS_DIR, "*.db")):
+    os.remove(arquivo)
+
+from modules.servidor import service as servidor  # noqa: E402
+
+wsgi_app = "main:app"
+bind = f"0.0.0.0:{os.getenv('API_PORT', '8000')}"
+workers = servidor.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = servidor.PRELOAD
+# O /process só enfileira; requisições longas são as do /processar-stream
+timeout = int(os.getenv("SERVIDOR_TIMEOUT_S", "120"))
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Chamado no mestre, depois do import do app e antes do fork dos workers
+    servidor.preparar_mestre()
+
+
+def post_fork(server, worker):
+    servidor.apos_fork()
+
+
+def child_exit(server, worker):
+    servidor.worker_encerrado(worker.pid)
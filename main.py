@@ -1,17 +1,81 @@
-from fastapi import FastAPI
-from modules.importacao.controller import router as importacao_router
+from fastapi import FastAPI, Response
+from modules.importacao.controller import router as importacao_router, processar_e_obter_descricoes
+from modules.importacao.service import DRENAGEM_S, encerrar_pool
+from modules.jobs.controller import router as jobs_router
+from modules.jobs.service import ConsumidorJobs, garantir_indices_jobs
+from modules.ingestao.service import IngestaoContinua
+from modules.saude.controller import prontidao, router as saude_router
+from modules.shared import estagios, metricas
+from modules.shared.database import fechar_conexoes, garantir_indices
+from modules.shared.logger import logger
+import importlib.util
+import os
+import sys
 import uvicorn
 
 app = FastAPI(title="API de Processamento de Dados")
 
 # Registra todos os routers
 app.include_router(importacao_router)
+app.include_router(jobs_router)
+app.include_router(saude_router)
+
+consumidor_jobs = ConsumidorJobs(processar_e_obter_descricoes)
+ingestao = IngestaoContinua(processar_e_obter_descricoes)
+
+@app.get("/metrics")
+def exportar_metricas():
+    """Métricas do pipeline no formato texto do Prometheus"""
+    conteudo, content_type = metricas.exportar()
+    return Response(content=conteudo, media_type=content_type)
+
+@app.on_event("startup")
+def aquecer():
+    # Ping no MongoDB e carregamento do modelo conforme SAUDE_AQUECIMENTO;
+    # o /health/ready só responde 200 depois disso
+    prontidao.iniciar()
+
+@app.on_event("startup")
+def verificar_indices():
+    try:
+        garantir_indices()
+        garantir_indices_jobs()
+        logger.info("Índices do MongoDB verificados.")
+    except Exception as e:
+        logger.error(f"Falha ao verificar índices do MongoDB: {str(e)}")
+
+@app.on_event("startup")
+def iniciar_consumidores():
+    # Também retoma jobs cujo lease expirou, inclusive os interrompidos por um restart
+    consumidor_jobs.iniciar()
+    # Só inicia se INGESTAO_MODO estiver ativo
+    ingestao.iniciar()
+
+@app.on_event("shutdown")
+def finalizar_workers():
+    # Primeiro impede novos micro-lotes e jobs, senão um job novo seria reivindicado durante a drenagem
+    ingestao.solicitar_parada()
+    consumidor_jobs.solicitar_parada()
+    # Para de ler novos lotes e conclui os que já estão nas filas dos estágios
+    estagios.parar_todos(timeout=DRENAGEM_S)
+    ingestao.parar(timeout=5)
+    consumidor_jobs.parar(timeout=5)
+    encerrar_pool()
+    fechar_conexoes()
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    if "--dev" in sys.argv:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
+    elif os.name == "posix" and importlib.util.find_spec("gunicorn"):
+        # Produção: gunicorn com o modelo carregado uma vez no mestre (ver gunicorn.conf.py)
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"])
+    else:
+        # O gunicorn não roda no Windows: um único processo do uvicorn, sem preload
+        logger.warning("gunicorn indisponível; iniciando o uvicorn com um único worker.")
+        uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("API_PORT", "8000")), log_level="info")
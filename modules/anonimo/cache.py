@@ -0,0 +1,228 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from modules.shared.database import get_db
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# "memoria" mantém apenas o LRU do processo; "disco" (SQLite) e "mongo" adicionam
+# um nível persistente compartilhado entre processos; "desligado" desativa o cache.
+BACKEND = os.getenv("CACHE_ANONIMIZACAO", "memoria").lower()
+TAMANHO_MEMORIA = int(os.getenv("CACHE_ANONIMIZACAO_TAMANHO", "10000"))
+MAX_PERSISTENTE = int(os.getenv("CACHE_ANONIMIZACAO_MAX_PERSISTENTE", "200000"))
+ARQUIVO = os.getenv("CACHE_ANONIMIZACAO_ARQUIVO", "cache_anonimizacao.sqlite3")
+# Entradas de outra versão da configuração sem acesso há este tempo são removidas. Durante
+# um deploy gradual a versão anterior ainda está no ar e continua lendo (e renovando) as suas
+EXPIRACAO_OUTRAS_VERSOES = timedelta(hours=float(os.getenv("CACHE_ANONIMIZACAO_EXPIRACAO_VERSAO_H", "24")))
+COLECAO = "cache_anonimizacao"
+
+# A cada quantas gravações o nível persistente verifica se passou do limite
+_INTERVALO_EVICCAO = 1000
+# Idade mínima da data de acesso para que um hit a atualize: o despejo e a expiração
+# só precisam da ordem aproximada, e assim a maioria dos hits é só uma leitura
+_INTERVALO_ACESSO = timedelta(hours=1)
+
+
+class _NivelDisco:
+    """Nível persistente em SQLite, com despejo das entradas menos acessadas"""
+
+    def __init__(self, versao: str, arquivo: str, max_entradas: int):
+        self.versao = versao
+        self.max_entradas = max_entradas
+        self._conexao = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "chave TEXT PRIMARY KEY, resultado TEXT NOT NULL, versao TEXT NOT NULL, acessado REAL NOT NULL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_cache_acessado ON cache (acessado)")
+        self.expirar_outras_versoes()
+
+    def obter(self, chave: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conexao.execute("SELECT resultado, acessado FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                return None
+            agora = datetime.now().timestamp()
+            if agora - linha[1] >= _INTERVALO_ACESSO.total_seconds():
+                self._conexao.execute("UPDATE cache SET acessado = ? WHERE chave = ?", (agora, chave))
+        return linha[0]
+
+    def guardar(self, chave: str, resultado: str, versao: str):
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO cache (chave, resultado, versao, acessado) VALUES (?, ?, ?, ?)",
+                (chave, resultado, versao, datetime.now().timestamp())
+            )
+
+    def expirar_outras_versoes(self):
+        limite = (datetime.now() - EXPIRACAO_OUTRAS_VERSOES).timestamp()
+        with self._lock:
+            self._conexao.execute("DELETE FROM cache WHERE versao != ? AND acessado < ?", (self.versao, limite))
+
+    def despejar(self):
+        self.expirar_outras_versoes()
+        with self._lock:
+            total = self._conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            excesso = total - self.max_entradas
+            if excesso > 0:
+                self._conexao.execute(
+                    "DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY acessado LIMIT ?)",
+                    (excesso,)
+                )
+
+
+class _NivelMongo:
+    """Nível persistente em uma coleção do MongoDB, com despejo das entradas menos acessadas"""
+
+    def __init__(self, versao: str, max_entradas: int):
+        self.versao = versao
+        self.max_entradas = max_entradas
+        self._colecao = get_db()[COLECAO]
+        self._colecao.create_index("acessado")
+        self.expirar_outras_versoes()
+
+    def obter(self, chave: str) -> Optional[str]:
+        doc = self._colecao.find_one({"_id": chave}, {"_id": 0, "resultado": 1, "acessado": 1})
+        if doc is None:
+            return None
+        agora = datetime.now(timezone.utc)
+        acessado = doc.get("acessado")
+        if acessado is not None and acessado.tzinfo is None:
+            # O pymongo devolve datas sem fuso, já em UTC
+            acessado = acessado.replace(tzinfo=timezone.utc)
+        if acessado is None or agora - acessado >= _INTERVALO_ACESSO:
+            self._colecao.update_one({"_id": chave}, {"$set": {"acessado": agora}})
+        return doc["resultado"]
+
+    def guardar(self, chave: str, resultado: str, versao: str):
+        self._colecao.update_one(
+            {"_id": chave},
+            {"$set": {"resultado": resultado, "versao": versao, "acessado": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    def expirar_outras_versoes(self):
+        self._colecao.delete_many({
+            "versao": {"$ne": self.versao},
+            "acessado": {"$lt": datetime.now(timezone.utc) - EXPIRACAO_OUTRAS_VERSOES}
+        })
+
+    def despejar(self):
+        self.expirar_outras_versoes()
+        excesso = self._colecao.estimated_document_count() - self.max_entradas
+        if excesso > 0:
+            antigos = self._colecao.find({}, {"_id": 1}).sort("acessado", 1).limit(excesso)
+            self._colecao.delete_many({"_id": {"$in": [doc["_id"] for doc in antigos]}})
+
+
+class CacheAnonimizacao:
+    """Cache de textos anonimizados, indexado pelo hash do texto e da versão da configuração.
+
+    Tem um nível LRU em memória e, opcionalmente, um nível persistente
+    (SQLite ou MongoDB). Como a versão faz parte da chave, qualquer mudança nos
+    padrões ou listas de palavras do Anonimizador invalida o cache.
+    """
+
+    def __init__(self, versao: str, backend: str = None, tamanho_memoria: int = None):
+        self.versao = versao
+        self.backend = backend or BACKEND
+        self.tamanho_memoria = TAMANHO_MEMORIA if tamanho_memoria is None else tamanho_memoria
+        self._memoria: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._gravacoes = 0
+        self.hits_memoria = 0
+        self.hits_persistente = 0
+        self.misses = 0
+        self._persistente = None
+
+        if self.backend == "disco":
+            self._persistente = _NivelDisco(versao, ARQUIVO, MAX_PERSISTENTE)
+        elif self.backend == "mongo":
+            self._persistente = _NivelMongo(versao, MAX_PERSISTENTE)
+
+    @property
+    def ativo(self) -> bool:
+        return self.backend != "desligado"
+
+    def _chave(self, texto: str) -> str:
+        return hashlib.sha256(f"{self.versao}\0{texto}".encode("utf-8")).hexdigest()
+
+    def obter(self, texto: str) -> Optional[str]:
+        """Retorna o texto anonimizado em cache, ou None"""
+        if not self.ativo:
+            return None
+
+        chave = self._chave(texto)
+        with self._lock:
+            resultado = self._memoria.get(chave)
+            if resultado is not None:
+                self._memoria.move_to_end(chave)
+                self.hits_memoria += 1
+                return resultado
+
+        if self._persistente is not None:
+            try:
+                resultado = self._persistente.obter(chave)
+            except Exception as e:
+                logger.warning(f"Erro ao consultar cache persistente: {str(e)}")
+                resultado = None
+            if resultado is not None:
+                with self._lock:
+                    self.hits_persistente += 1
+                self._guardar_memoria(chave, resultado)
+                return resultado
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def guardar(self, texto: str, resultado: str):
+        """Armazena o resultado nos níveis de cache configurados"""
+        if not self.ativo:
+            return
+
+        chave = self._chave(texto)
+        self._guardar_memoria(chave, resultado)
+
+        if self._persistente is not None:
+            try:
+                self._persistente.guardar(chave, resultado, self.versao)
+                self._gravacoes += 1
+                if self._gravacoes % _INTERVALO_EVICCAO == 0:
+                    self._persistente.despejar()
+            except Exception as e:
+                logger.warning(f"Erro ao gravar no cache persistente: {str(e)}")
+
+    def _guardar_memoria(self, chave: str, resultado: str):
+        if self.tamanho_memoria <= 0:
+            return
+        with self._lock:
+            self._memoria[chave] = resultado
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.tamanho_memoria:
+                self._memoria.popitem(last=False)
+
+    def estatisticas(self) -> Dict:
+        """Contadores de acertos e falhas do cache"""
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_persistente + self.misses
+            return {
+                "backend": self.backend,
+                "versao": self.versao,
+                "entradas_memoria": len(self._memoria),
+                "hits_memoria": self.hits_memoria,
+                "hits_persistente": self.hits_persistente,
+                "misses": self.misses,
+                "taxa_acerto": (self.hits_memoria + self.hits_persistente) / consultas if consultas else 0.0
+            }
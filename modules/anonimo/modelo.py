@@ -0,0 +1,130 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Set
+from dotenv import load_dotenv
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# Modelo do NER: "lg", "md", "sm" (pt_core_news_*) ou o nome/caminho de qualquer pipeline spaCy
+_NIVEIS = {"lg": "pt_core_news_lg", "md": "pt_core_news_md", "sm": "pt_core_news_sm"}
+_MODELO = os.getenv("ANONIMIZADOR_MODELO", "lg")
+MODELO_SPACY = _NIVEIS.get(_MODELO.lower(), _MODELO)
+
+# "ner": carrega só o NER e os componentes de que ele depende (tok2vec compartilhado);
+# "completo": o pipeline inteiro, menos parser e tagger, como antes
+COMPONENTES = os.getenv("ANONIMIZADOR_COMPONENTES", "completo").lower()
+# "descartar" libera os vetores estáticos quando nenhum componente mantido os usa
+VETORES = os.getenv("ANONIMIZADOR_VETORES", "manter").lower()
+
+DESATIVADOS_COMPLETO = ["parser", "tagger"]
+_FABRICAS_TOK2VEC = {"tok2vec", "transformer"}
+LEMA_MINUSCULO = "lema_minusculo"
+
+
+def configuracao() -> Dict:
+    """Parte da versão do Anonimizador que depende do modelo carregado"""
+    config = {"modelo": MODELO_SPACY}
+    # Os valores padrão ficam de fora para não invalidar o cache e a versão do pipeline existentes
+    if COMPONENTES != "completo":
+        config["componentes"] = COMPONENTES
+    if VETORES != "manter":
+        config["vetores"] = VETORES
+    return config
+
+
+def _diretorio_modelo(nome: str) -> Path:
+    """Diretório com o config.cfg, seja o modelo um caminho ou um pacote instalado"""
+    import spacy
+
+    if Path(nome).exists():
+        return Path(nome)
+    try:
+        pacote = spacy.util.get_package_path(nome)
+    except ModuleNotFoundError as e:
+        # Mesmo erro do spacy.load para um modelo ausente
+        raise OSError(f"Modelo spaCy {nome} não instalado") from e
+    meta = spacy.util.get_model_meta(pacote)
+    return pacote / f"{meta['lang']}_{meta['name']}-{meta['version']}"
+
+
+def _dependencias(config_modelo, componentes: Dict) -> Set[str]:
+    """Componentes tok2vec/transformer que o modelo de um componente escuta"""
+    dependencias = set()
+    if isinstance(config_modelo, dict):
+        arquitetura = str(config_modelo.get("@architectures", ""))
+        if "Listener" in arquitetura:
+            upstream = config_modelo.get("upstream", "*")
+            if upstream == "*":
+                dependencias |= {nome for nome, c in componentes.items() if c.get("factory") in _FABRICAS_TOK2VEC}
+            else:
+                dependencias.add(upstream)
+        for valor in config_modelo.values():
+            dependencias |= _dependencias(valor, componentes)
+    return dependencias
+
+
+def _usa_vetores(config_modelo) -> bool:
+    if isinstance(config_modelo, dict):
+        if config_modelo.get("include_static_vectors"):
+            return True
+        return any(_usa_vetores(valor) for valor in config_modelo.values())
+    return False
+
+
+def componentes_necessarios(config) -> List[str]:
+    """Componentes do pipeline necessários para o NER, pela ordem do pipeline"""
+    componentes = config["components"]
+    necessarios = {"ner"} | _dependencias(componentes.get("ner", {}).get("model"), componentes)
+    return [nome for nome in config["nlp"]["pipeline"] if nome in necessarios]
+
+
+def _registrar_lema_minusculo():
+    from spacy.language import Language
+
+    if Language.has_factory(LEMA_MINUSCULO):
+        return
+
+    @Language.component(LEMA_MINUSCULO)
+    def lema_minusculo(doc):
+        """Sem o lematizador, a forma minúscula faz o papel do lema nas palavras de contexto do Presidio"""
+        for token in doc:
+            token.lemma_ = token.lower_
+        return doc
+
+
+def carregar_modelo(nome: str = None, componentes: str = None, vetores: str = None):
+    """Carrega o pipeline spaCy do NER conforme ANONIMIZADOR_MODELO/COMPONENTES/VETORES"""
+    import spacy
+
+    nome = nome or MODELO_SPACY
+    componentes = (componentes or COMPONENTES).lower()
+    vetores = (vetores or VETORES).lower()
+
+    if componentes == "completo":
+        nlp = spacy.load(nome, disable=DESATIVADOS_COMPLETO)
+    else:
+        config = spacy.util.load_config(_diretorio_modelo(nome) / "config.cfg")
+        manter = componentes_necessarios(config)
+        excluir = [c for c in config["nlp"]["pipeline"] if c not in manter]
+        nlp = spacy.load(nome, exclude=excluir)
+        if "lemmatizer" in excluir:
+            _registrar_lema_minusculo()
+            nlp.add_pipe(LEMA_MINUSCULO, last=True)
+
+    if vetores == "descartar":
+        _descartar_vetores(nlp)
+
+    logger.info(f"Modelo spaCy {nome} carregado com os componentes {nlp.pipe_names}")
+    return nlp
+
+
+def _descartar_vetores(nlp):
+    """Libera os vetores estáticos, a menos que algum componente carregado dependa deles"""
+    usados_por = [nome for nome in nlp.pipe_names if _usa_vetores(nlp.get_pipe_config(nome).get("model"))]
+    if usados_por:
+        logger.warning(f"Vetores mantidos: usados por {usados_por} (ANONIMIZADOR_VETORES=descartar ignorado).")
+        return
+    nlp.vocab.reset_vectors(width=0)
@@ -0,0 +1,32 @@
+from typing import Iterator, List, Tuple
+from presidio_analyzer.nlp_engine import NlpArtifacts, SpacyNlpEngine
+from .modelo import MODELO_SPACY
+
+
+class MotorNlpSpacy(SpacyNlpEngine):
+    """SpacyNlpEngine do Presidio sobre um pipeline spaCy já carregado.
+
+    O `load` original chama `spacy.load` e tenta baixar o modelo quando ele não
+    é um pacote instalado, o que falha com um caminho em ANONIMIZADOR_MODELO e
+    ignora ANONIMIZADOR_COMPONENTES/VETORES. Aqui o pipeline vem de
+    `modelo.carregar_modelo`, e pode ser o mesmo objeto usado na busca de nomes.
+    """
+
+    def __init__(self, nlp, lang_code: str = "pt"):
+        super().__init__(models=[{"lang_code": lang_code, "model_name": MODELO_SPACY}])
+        self._pipeline = nlp
+
+    def load(self) -> None:
+        self.nlp = {modelo["lang_code"]: self._pipeline for modelo in self.models}
+
+    def process_batch(self, texts: List[str], language: str, as_tuples: bool = False,
+                      batch_size: int = 50, n_process: int = 1) -> Iterator[Tuple[str, NlpArtifacts]]:
+        """`process_batch` do Presidio com o `batch_size` e o `n_process` repassados ao `nlp.pipe`"""
+        if not self.nlp:
+            raise ValueError("NLP engine is not loaded. Consider calling .load()")
+
+        docs = self.nlp[language].pipe(
+            (str(text) for text in texts), as_tuples=as_tuples, batch_size=batch_size, n_process=n_process
+        )
+        for doc in docs:
+            yield doc.text, self._doc_to_nlp_artifact(doc, language)
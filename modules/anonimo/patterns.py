@@ -1,4 +1,16 @@
-from presidio_analyzer import Pattern
+from typing import NamedTuple
+
+
+class Pattern(NamedTuple):
+    """Padrão de um reconhecedor; vira um `presidio_analyzer.Pattern` ao configurar o Presidio.
+
+    Mantido sem dependência do Presidio para que a triagem e a versão da
+    configuração não precisem importá-lo.
+    """
+    name: str
+    regex: str
+    score: float
+
 
 PADROES_PERSONALIZADOS = [
     {
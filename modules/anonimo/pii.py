@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+from typing import List, NamedTuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "combinado": CPF, e-mail e telefone em uma única regex, com validação (ver `encontrar`);
+# "padroes": os PatternRecognizers de patterns.py, um por padrão, como antes
+RECONHECEDOR = os.getenv("ANONIMIZADOR_RECONHECEDOR", "combinado").lower()
+
+# O e-mail sai como EMAIL_ADDRESS, o rótulo que o EmailRecognizer do Presidio já deixava no texto
+CPF = "CPF"
+EMAIL = "EMAIL_ADDRESS"
+TELEFONE = "TELEFONE"
+ENTIDADES = (CPF, EMAIL, TELEFONE)
+
+# Códigos de área em uso no Brasil (Anatel)
+DDDS = frozenset({
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28, 31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49, 51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89, 91, 92, 93, 94, 95, 96, 97, 98, 99,
+})
+
+SCORE_VALIDADO = 0.95
+# Formato ou palavra de contexto indicam a entidade, mas os dígitos não foram validados
+SCORE_CONTEXTO = 0.85
+# Palavras até esta distância antes do número servem de contexto
+JANELA_CONTEXTO = 40
+# Incrementar ao mudar a lógica de `_classificar` sem mudar os padrões, para invalidar o cache
+VERSAO_REGRAS = 2
+
+_REGEX = re.compile(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?<!\w)(?:'
+    r'(?P<cpf>\d{3}\.\d{3}\.\d{3}-\d{2})'
+    # DDD entre parênteses ou seguido de separador, com ou sem +55
+    r'|(?P<telefone>(?:\+55\s?)?(?:\((?P<ddd>\d{2})\)\s?|(?P<ddd_sep>\d{2})[\s-])(?P<assinante>9?\d{4}[\s-]?\d{4}))'
+    r'|(?P<numero>\d{10,11})'
+    r')(?!\w)'
+)
+_CONTEXTO_CPF = re.compile(r'\b(?:cpf|documento|cadastro)\b', re.IGNORECASE)
+_CONTEXTO_TELEFONE = re.compile(
+    r'\b(?:telefone|tel|fone|celular|cel|whatsapp|whats|contato|ligar|ramal)\b', re.IGNORECASE
+)
+# Números logo depois destas palavras são identificadores, não PII, mesmo que passem na validação
+_CONTEXTO_IDENTIFICADOR = re.compile(
+    r'\b(?:pedido|protocolo|chamado|ticket|nota|nf|nfe|boleto|c[oó]digo|matr[ií]cula|id|n[º°])\b', re.IGNORECASE
+)
+_NAO_DIGITO = re.compile(r'\D')
+# Sem "@" nem dígitos não há candidato; a maioria das descrições para aqui
+_CANDIDATO = re.compile(r'[@\d]')
+
+
+class Entidade(NamedTuple):
+    tipo: str
+    inicio: int
+    fim: int
+    score: float
+
+
+def cpf_valido(digitos: str) -> bool:
+    """Confere os dois dígitos verificadores de um CPF de 11 dígitos"""
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+    for tamanho in (9, 10):
+        soma = sum(int(d) * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        verificador = soma * 10 % 11 % 10
+        if verificador != int(digitos[tamanho]):
+            return False
+    return True
+
+
+def assinante_valido(assinante: str) -> bool:
+    """Celular: 9 dígitos começando com 9; fixo: 8 dígitos começando com 2 a 5"""
+    if len(assinante) == 9:
+        return assinante[0] == "9"
+    return len(assinante) == 8 and assinante[0] in "2345"
+
+
+def telefone_valido(digitos: str) -> bool:
+    """DDD em uso seguido de um número de assinante válido (10 ou 11 dígitos, sem o +55)"""
+    return len(digitos) in (10, 11) and int(digitos[:2]) in DDDS and assinante_valido(digitos[2:])
+
+
+def _contexto(texto: str, inicio: int, regex) -> int:
+    """Posição da palavra de contexto mais próxima antes do número, ou -1"""
+    ultima = -1
+    for m in regex.finditer(texto, max(0, inicio - JANELA_CONTEXTO), inicio):
+        ultima = m.start()
+    return ultima
+
+
+def _classificar(texto: str, m) -> List[Entidade]:
+    inicio, fim = m.span()
+    if m.lastgroup == "email":
+        return [Entidade(EMAIL, inicio, fim, SCORE_VALIDADO)]
+
+    if m.lastgroup == "cpf":
+        digitos = _NAO_DIGITO.sub("", m.group())
+        # O formato já indica CPF; dígitos inválidos costumam ser erro de digitação
+        return [Entidade(CPF, inicio, fim, SCORE_VALIDADO if cpf_valido(digitos) else SCORE_CONTEXTO)]
+
+    if m.group("telefone"):
+        ddd = m.group("ddd") or m.group("ddd_sep")
+        valido = int(ddd) in DDDS and assinante_valido(_NAO_DIGITO.sub("", m.group("assinante")))
+        # Parênteses, hífen ou +55 já indicam telefone, como o CPF formatado; só com espaços
+        # ("Valor 15 3000 4000 reais") pode ser um valor ou quantidade e precisa de contexto
+        formatado = bool(m.group("ddd")) or "-" in m.group() or m.group().startswith("+")
+        if not formatado and _contexto(texto, inicio, _CONTEXTO_TELEFONE) < 0:
+            return []
+        return [Entidade(TELEFONE, inicio, fim, SCORE_VALIDADO if valido else SCORE_CONTEXTO)]
+
+    # Só dígitos: CPF, telefone ou um identificador qualquer (pedido, protocolo, nota)
+    digitos = m.group()
+    contexto_cpf = _contexto(texto, inicio, _CONTEXTO_CPF)
+    contexto_telefone = _contexto(texto, inicio, _CONTEXTO_TELEFONE)
+    # Vale a palavra mais próxima: em "Celular (11) 9... A nota nº 123..." o número é da nota
+    if _contexto(texto, inicio, _CONTEXTO_IDENTIFICADOR) > max(contexto_cpf, contexto_telefone):
+        return []
+    if cpf_valido(digitos):
+        return [Entidade(CPF, inicio, fim, SCORE_VALIDADO)]
+    if telefone_valido(digitos):
+        return [Entidade(TELEFONE, inicio, fim, SCORE_VALIDADO)]
+    if len(digitos) == 11 and contexto_cpf >= 0:
+        return [Entidade(CPF, inicio, fim, SCORE_CONTEXTO)]
+    if contexto_telefone >= 0:
+        return [Entidade(TELEFONE, inicio, fim, SCORE_CONTEXTO)]
+    return []
+
+
+def encontrar(texto: str) -> List[Entidade]:
+    """CPFs, e-mails e telefones do texto em uma única passada, sem sobreposição e em ordem"""
+    if not _CANDIDATO.search(texto):
+        return []
+    return [entidade for m in _REGEX.finditer(texto) for entidade in _classificar(texto, m)]
+
+
+def assinatura() -> str:
+    """Hash das regras de detecção, para a versão da configuração do Anonimizador"""
+    partes = [
+        _REGEX.pattern, _CONTEXTO_CPF.pattern, _CONTEXTO_TELEFONE.pattern, _CONTEXTO_IDENTIFICADOR.pattern,
+        sorted(DDDS), SCORE_VALIDADO, SCORE_CONTEXTO, JANELA_CONTEXTO, ENTIDADES, VERSAO_REGRAS
+    ]
+    return hashlib.sha256(repr(partes).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,41 @@
+from typing import List, Optional
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts
+from . import pii
+
+# Reconhecedores nativos do Presidio que duplicam o combinado: o de e-mail acha os mesmos
+# endereços e o de telefone (phonenumbers) nunca passa do SCORE_MINIMO em texto em português
+SUBSTITUIDOS = ("EmailRecognizer", "PhoneRecognizer")
+
+
+class ReconhecedorPII(EntityRecognizer):
+    """CPF, e-mail e telefone em uma única passada de `pii.encontrar`.
+
+    Os resultados já vêm validados (dígitos do CPF, DDD e número do assinante),
+    sem sobreposição e com o score final, então o Presidio não tem candidatos
+    duplicados para resolver nem precisa reforçá-los pelo contexto.
+    """
+
+    def __init__(self, supported_language: str = "pt"):
+        super().__init__(
+            supported_entities=list(pii.ENTIDADES),
+            name="ReconhecedorPII",
+            supported_language=supported_language,
+        )
+
+    def load(self) -> None:
+        pass
+
+    def analyze(self, text: str, entities: List[str], nlp_artifacts: Optional[NlpArtifacts] = None) -> List[RecognizerResult]:
+        metadados = {
+            RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+            RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+            # O contexto já foi considerado em `pii.encontrar`
+            RecognizerResult.IS_SCORE_ENHANCED_BY_CONTEXT_KEY: True,
+        }
+        return [
+            RecognizerResult(entidade.tipo, entidade.inicio, entidade.fim, entidade.score,
+                             recognition_metadata=dict(metadados))
+            for entidade in pii.encontrar(text)
+            if entidade.tipo in entities
+        ]
@@ -1,15 +1,94 @@
+import hashlib
+import json
+import os
 import re
-from typing import Optional, List
-import spacy
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer
-from presidio_anonymizer import AnonymizerEngine
-from presidio_analyzer.nlp_engine import NlpEngineProvider
-from modules.shared.logger import logger
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, List, Pattern, Tuple
+from dotenv import load_dotenv
+from modules.shared import metricas
+from modules.shared.logger import obter_logger
+from . import modelo, pii, triagem
+from .cache import CacheAnonimizacao
+from .modelo import MODELO_SPACY
 from .patterns import PADROES_PERSONALIZADOS
+from .triagem import MODO_TRIAGEM, precisa_ner
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# Com o pipeline compartilhado o Presidio reutiliza o modelo carregado em self.nlp
+# e os artefatos da análise servem também para a identificação manual de nomes.
+# Os nomes passam a vir do texto original, não do já anonimizado: um nome que o NER
+# marcou em um trecho é trocado também onde se repete sem ter sido marcado.
+# Defina como "false" para voltar ao comportamento antigo (dois modelos, duas passadas de NER).
+PIPELINE_COMPARTILHADO = os.getenv("ANONIMIZADOR_PIPELINE_COMPARTILHADO", "true").lower() == "true"
+
+# Correções de substituições indesejadas do Presidio, aplicadas depois dos nomes
+CORRECOES = {
+    "<LOCATION> Olá": "Olá",
+    "<LOCATION> a": "a",
+    "<LOCATION> \\": "\\",
+    "<ORGANIZATION>": "Termo"
+}
+# Só as sequências que mudam o texto: 2+ espaços ou um espaço que não é " "
+_ESPACOS = r'\s{2,}|[^\S ]'
+
+
+@lru_cache(maxsize=1024)
+def compilar_pos_processamento(nomes: Tuple[str, ...]) -> Tuple[Pattern, Dict[str, str]]:
+    """Regex única para `_pos_processar` com os nomes do texto, e a substituição de cada grupo.
+
+    Equivale às passadas anteriores (um `re.sub` por nome, um `str.replace` por
+    correção e a normalização de espaços) em uma só varredura:
+      - os nomes formam uma alternação do mais longo para o mais curto, então
+        quando um nome contém outro vale o mais longo;
+      - uma correção que mantém o final do trecho (ex.: "<LOCATION> a" -> "a")
+        remove só o prefixo e não se aplica quando ali começa um nome, que
+        antes já teria virado "<PERSON>" antes da correção;
+      - espaços viram um só espaço, como na normalização feita no fim.
+    """
+    alternativas = []
+    substituicoes = {}
+    nomes_regex = ''
+    if nomes:
+        nomes_regex = r'\b(?:' + '|'.join(map(re.escape, nomes)) + r')\b'
+        alternativas.append(f'(?P<nome>{nomes_regex})')
+        substituicoes["nome"] = "<PERSON>"
+
+    for i, (padrao, substituicao) in enumerate(CORRECOES.items()):
+        grupo = f"correcao{i}"
+        if substituicao and padrao.endswith(substituicao):
+            regex = re.escape(padrao[:-len(substituicao)]) + f'(?={re.escape(substituicao)})'
+            if nomes_regex:
+                regex += f'(?!{nomes_regex})'
+            substituicoes[grupo] = ''
+        else:
+            regex = re.escape(padrao)
+            substituicoes[grupo] = substituicao
+        alternativas.append(f'(?P<{grupo}>{regex})')
+
+    alternativas.append(f'(?P<espacos>{_ESPACOS})')
+    substituicoes["espacos"] = ' '
+    return re.compile('|'.join(alternativas)), substituicoes
+
 
 class Anonimizador:
     _instance = None
-    _ESPACOS_REGEX = re.compile(r'\s+')
+    _inicializacao_lock = threading.Lock()
+
+    # Lista de palavras para preservar (não anonimizar)
+    PALAVRAS_PRESERVAR = {
+        "Solicito", "solicito", "Peço", "peço", "Olá", "Contrato",
+        "Atenciosamente", "atenciosamente", "Termo", "Formulário"
+    }
+    PALAVRAS_IGNORAR = {
+        "solicito", "Solicito", "Peço", "peço", "Pedido", "Atenciosamente", "att", "contrato", "termo", "formulário", 
+        "atenciosamente", "exclusão", "sistema"
+    }
+    CONTEXTOS = ["cadastro", "dados", "colaborador", "documento", "cliente", "usuário", "funcionário"]
+    SCORE_MINIMO = 0.8  # Threshold mais baixo para capturar mais entidades
     
     def __new__(cls):
         if cls._instance is None:
@@ -18,34 +97,75 @@ class Anonimizador:
         return cls._instance
     
     def __init__(self):
-        if not self._inicializado:
+        if self._inicializado:
+            return
+        # O aquecimento na inicialização e um job podem chegar aqui ao mesmo tempo
+        with self._inicializacao_lock:
+            if self._inicializado:
+                return
             try:
                 self.nlp = self._carregar_modelo_spacy()
                 self.analyzer, self.anonymizer = self._configurar_presidio()
+                self.cache = CacheAnonimizacao(self.versao_configuracao())
+                self.caminhos = {"cache": 0, "ner": 0, "regex": 0}
+                self._caminhos_lock = threading.Lock()
                 self._inicializado = True
             except Exception as e:
                 logger.critical(f"Falha ao inicializar Anonimizador: {str(e)}")
                 raise
 
+    @classmethod
+    def carregado(cls) -> bool:
+        """Se o modelo já foi carregado neste processo, sem disparar o carregamento"""
+        return cls._instance is not None and cls._instance._inicializado
+
+    @classmethod
+    def versao_configuracao(cls) -> str:
+        """Hash de tudo que influencia a saída da anonimização (padrões, listas de palavras, correções e modelo)"""
+        if pii.RECONHECEDOR == "combinado":
+            padroes = {"reconhecedor": pii.assinatura()}
+        else:
+            padroes = {"padroes": [
+                {
+                    "entidade": padrao["entidade"],
+                    "padroes": [(p.name, p.regex, p.score) for p in padrao["padroes"]],
+                    "contexto": padrao.get("contexto", [])
+                }
+                for padrao in PADROES_PERSONALIZADOS
+            ]}
+        configuracao = {
+            **padroes,
+            "preservar": sorted(cls.PALAVRAS_PRESERVAR),
+            "ignorar": sorted(cls.PALAVRAS_IGNORAR),
+            "contextos": cls.CONTEXTOS,
+            "score_minimo": cls.SCORE_MINIMO,
+            "correcoes": CORRECOES,
+            **modelo.configuracao(),
+            "pipeline_compartilhado": PIPELINE_COMPARTILHADO,
+            "triagem": MODO_TRIAGEM,
+            "palavras_comuns": sorted(triagem.PALAVRAS_COMUNS)
+        }
+        return hashlib.sha256(json.dumps(configuracao, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
     def _carregar_modelo_spacy(self):
         """Carrega o modelo spaCy uma única vez"""
         try:
-            nlp = spacy.load("pt_core_news_lg", disable=["parser", "tagger"])
-            logger.info("Modelo spaCy carregado com sucesso")
-            return nlp
+            return modelo.carregar_modelo()
         except OSError as e:
-            logger.error("Modelo spaCy não encontrado. Execute: python -m spacy download pt_core_news_lg")
+            logger.error(f"Modelo spaCy não encontrado. Execute: python -m spacy download {MODELO_SPACY}")
             raise RuntimeError("Modelo de linguagem não disponível") from e
 
     def _configurar_presidio(self):
         """Configura o Presidio para usar o modelo spaCy já carregado"""
-        configuration = {
-            "nlp_engine_name": "spacy",
-            "models": [{"lang_code": "pt", "model_name": "pt_core_news_lg"}],
-        }
+        from presidio_analyzer import AnalyzerEngine, Pattern, PatternRecognizer
+        from presidio_anonymizer import AnonymizerEngine
+        from .motor_nlp import MotorNlpSpacy
 
-        provider = NlpEngineProvider(nlp_configuration=configuration)
-        nlp_engine = provider.create_engine()
+        if PIPELINE_COMPARTILHADO:
+            # Reaproveita self.nlp em vez de carregar uma segunda cópia do modelo
+            nlp_engine = MotorNlpSpacy(self.nlp)
+        else:
+            nlp_engine = MotorNlpSpacy(self._carregar_modelo_spacy())
 
         analyzer = AnalyzerEngine(
             nlp_engine=nlp_engine,
@@ -53,12 +173,21 @@ class Anonimizador:
             default_score_threshold=0.7
         )
 
+        if pii.RECONHECEDOR == "combinado":
+            from .reconhecedor import SUBSTITUIDOS, ReconhecedorPII
+
+            # Um reconhecedor no lugar dos três PatternRecognizers e dos nativos de e-mail e telefone
+            for nome in SUBSTITUIDOS:
+                analyzer.registry.remove_recognizer(nome)
+            analyzer.registry.add_recognizer(ReconhecedorPII())
+            return analyzer, AnonymizerEngine()
+
         # Adiciona padrões customizados com verificação
         for padrao in PADROES_PERSONALIZADOS:
             try:
                 recognizer = PatternRecognizer(
                     supported_entity=padrao["entidade"],
-                    patterns=padrao["padroes"],
+                    patterns=[Pattern(p.name, p.regex, p.score) for p in padrao["padroes"]],
                     supported_language="pt",
                     context=padrao.get("contexto", [])
                 )
@@ -70,87 +199,193 @@ class Anonimizador:
 
     def _identificar_nomes_manualmente(self, texto: str) -> List[str]:
         """Identifica nomes com verificação mais segura"""
-        PALAVRAS_IGNORAR = {
-            "solicito", "Solicito", "Peço", "peço", "Pedido", "Atenciosamente", "att", "contrato", "termo", "formulário", 
-            "atenciosamente", "exclusão", "sistema"
-        }
-        
         try:
             if not texto:
                 return []
                 
-            doc = self.nlp(texto)
-            return [
-                ent.text 
-                for ent in doc.ents 
-                if (ent.label_ in ("PER", "PERSON") and
-                    len(ent.text.split()) > 1 and
-                    ent.text.lower() not in PALAVRAS_IGNORAR and
-                    not any(palavra.lower() in PALAVRAS_IGNORAR
-                        for palavra in ent.text.split()))
-            ]
+            return self._extrair_nomes(self.nlp(texto))
         except Exception as e:
             logger.warning(f"Erro ao identificar nomes: {str(e)}")
             return []
 
+    def _extrair_nomes(self, doc) -> List[str]:
+        """Filtra as entidades PER/PERSON de um Doc já processado pelo spaCy"""
+        return [
+            ent.text 
+            for ent in doc.ents 
+            if (ent.label_ in ("PER", "PERSON") and
+                len(ent.text.split()) > 1 and
+                ent.text.lower() not in self.PALAVRAS_IGNORAR and
+                not any(palavra.lower() in self.PALAVRAS_IGNORAR
+                    for palavra in ent.text.split()))
+        ]
+
+    def _aplicar_presidio(self, texto: str, resultados) -> str:
+        """Remove as entidades preservadas e aplica o AnonymizerEngine"""
+        # Filtra resultados para remover entidades que são palavras a preservar
+        resultados_filtrados = [
+            r for r in resultados 
+            if texto[r.start:r.end] not in self.PALAVRAS_PRESERVAR
+        ]
+        
+        return self.anonymizer.anonymize(
+            text=texto, 
+            analyzer_results=resultados_filtrados
+        ).text
+
+    def _pos_processar(self, texto_anonimizado: str, nomes_detectados: List[str]) -> str:
+        """Substitui os nomes detectados manualmente, corrige substituições indesejadas e normaliza espaços"""
+        nomes = sorted(
+            {nome for nome in nomes_detectados if nome not in self.PALAVRAS_PRESERVAR},
+            key=lambda nome: (-len(nome), nome)
+        )
+        regex, substituicoes = compilar_pos_processamento(tuple(nomes))
+        return regex.sub(lambda m: substituicoes[m.lastgroup], texto_anonimizado).strip()
+
+    def _analisar(self, texto: str, nlp_artifacts=None):
+        """Executa o AnalyzerEngine do Presidio, opcionalmente com artefatos já calculados"""
+        return self.analyzer.analyze(
+            text=texto,
+            language="pt",
+            context=self.CONTEXTOS,
+            score_threshold=self.SCORE_MINIMO,
+            nlp_artifacts=nlp_artifacts
+        )
+
+    def _contar_caminho(self, caminho: str, quantidade: int = 1):
+        with self._caminhos_lock:
+            self.caminhos[caminho] += quantidade
+        metricas.contar("anonimizacao", caminho, quantidade)
+
+    def _anonimizar_sem_ner(self, texto: str) -> str:
+        """Anonimiza apenas com os reconhecedores de padrão do Presidio, sem o pipeline estatístico.
+
+        O Doc tem só a tokenização; as formas minúsculas fazem o papel dos lemas
+        na busca por palavras de contexto.
+        """
+        from presidio_analyzer.nlp_engine import NlpArtifacts
+
+        doc = self.nlp.make_doc(texto)
+        nlp_artifacts = NlpArtifacts(
+            entities=[],
+            tokens=doc,
+            tokens_indices=[token.idx for token in doc],
+            lemmas=[token.lower_ for token in doc],
+            nlp_engine=self.analyzer.nlp_engine,
+            language="pt"
+        )
+        texto_anonimizado = self._aplicar_presidio(texto, self._analisar(texto, nlp_artifacts))
+        return self._pos_processar(texto_anonimizado, [])
+
+    def _anonimizar(self, texto: str) -> str:
+        """Executa a anonimização completa de um texto não vazio, sem cache"""
+        if not precisa_ner(texto):
+            self._contar_caminho("regex")
+            return self._anonimizar_sem_ner(texto)
+
+        self._contar_caminho("ner")
+        if PIPELINE_COMPARTILHADO:
+            # Uma única passada do spaCy: os artefatos do Presidio alimentam a busca de nomes
+            nlp_artifacts = self.analyzer.nlp_engine.process_text(texto, "pt")
+            texto_anonimizado = self._aplicar_presidio(texto, self._analisar(texto, nlp_artifacts))
+            return self._pos_processar(texto_anonimizado, self._extrair_nomes(nlp_artifacts.tokens))
+
+        # 1. Primeira passada com Presidio
+        texto_anonimizado = self._aplicar_presidio(texto, self._analisar(texto))
+
+        # 2. Identificação manual de nomes (com palavras preservadas)
+        nomes = self._identificar_nomes_manualmente(texto_anonimizado)
+
+        return self._pos_processar(texto_anonimizado, nomes)
+
     def anonimizar_texto(self, texto: Optional[str]) -> str:
         """Versão melhorada do método de anonimização"""
         if not texto or not isinstance(texto, str):
             return ""
 
+        em_cache = self.cache.obter(texto)
+        if em_cache is not None:
+            self._contar_caminho("cache")
+            return em_cache
+
+        return self._anonimizar_e_guardar(texto)
+
+    def _anonimizar_e_guardar(self, texto: str) -> str:
+        """Anonimiza um texto fora do cache e guarda o resultado; em caso de erro retorna o original"""
+        try:
+            resultado = self._anonimizar(texto)
+        except Exception as e:
+            logger.error(f"Erro ao anonimizar texto. Texto: '{texto[:50]}...'. Erro: {str(e)}")
+            return texto
+
+        self.cache.guardar(texto, resultado)
+        return resultado
+
+    def anonimizar_lote(self, textos: List[Optional[str]], batch_size: int = 50, n_process: int = 1) -> List[str]:
+        """Anonimiza uma lista de textos usando o processamento em lote do Presidio e do spaCy.
+
+        Produz o mesmo resultado de chamar `anonimizar_texto` para cada item, mas
+        evita o custo de pipeline por documento. `batch_size` e `n_process` são
+        repassados ao `nlp.pipe`: com o pipeline compartilhado, ao que gera os Docs
+        do Presidio e da busca de nomes; sem ele, ao da busca de nomes. Textos já
+        presentes no cache não passam pelo NLP.
+        """
+        saida = ["" for _ in textos]
+        indices = []
+        for i, texto in enumerate(textos):
+            if not texto or not isinstance(texto, str):
+                continue
+            em_cache = self.cache.obter(texto)
+            if em_cache is not None:
+                self._contar_caminho("cache")
+                saida[i] = em_cache
+            elif precisa_ner(texto):
+                indices.append(i)
+            else:
+                # Sem candidatos para o NER: anonimização só por padrões, fora do lote
+                saida[i] = self._anonimizar_e_guardar(texto)
+
+        if not indices:
+            return saida
+
+        validos = [textos[i] for i in indices]
+
         try:
-            # Lista de palavras para preservar (não anonimizar)
-            PALAVRAS_PRESERVAR = {
-                "Solicito", "solicito", "Peço", "peço", "Olá", "Contrato",
-                "Atenciosamente", "atenciosamente", "Termo", "Formulário"
-            }
-            contextos = ["cadastro", "dados", "colaborador", "documento", "cliente", "usuário", "funcionário"]
-            
-            # Primeira passada com Presidio
-            resultados = self.analyzer.analyze(
-                text=texto,
-                language="pt",
-                context=contextos,
-                score_threshold=0.8  # Threshold mais baixo para capturar mais entidades
-            )
-
-            # Filtra resultados para remover entidades que são palavras a preservar
-            resultados_filtrados = [
-                r for r in resultados 
-                if texto[r.start:r.end] not in PALAVRAS_PRESERVAR
-            ]
-            
-            texto_anonimizado = self.anonymizer.anonymize(
-                text=texto, 
-                analyzer_results=resultados_filtrados
-            ).text
-
-            # 3. Identificação manual de nomes (com palavras preservadas)
-            nomes = set(
-                nome for nome in self._identificar_nomes_manualmente(texto_anonimizado)
-                if nome not in PALAVRAS_PRESERVAR
-            )
-
-            for nome in nomes:
-                texto_anonimizado = re.sub(
-                    r'\b' + re.escape(nome) + r'\b',
-                    "<PERSON>",
-                    texto_anonimizado
+            if PIPELINE_COMPARTILHADO:
+                # Os Docs do lote servem tanto ao Presidio quanto à busca de nomes
+                artefatos = self.analyzer.nlp_engine.process_batch(
+                    validos, "pt", batch_size=batch_size, n_process=n_process
+                )
+                for i, texto, (_, nlp_artifacts) in zip(indices, validos, artefatos):
+                    texto_anonimizado = self._aplicar_presidio(texto, self._analisar(texto, nlp_artifacts))
+                    saida[i] = self._pos_processar(texto_anonimizado, self._extrair_nomes(nlp_artifacts.tokens))
+            else:
+                from presidio_analyzer import BatchAnalyzerEngine
+
+                # 1. Primeira passada com Presidio, em lote
+                resultados_lote = BatchAnalyzerEngine(self.analyzer).analyze_iterator(
+                    validos,
+                    language="pt",
+                    context=self.CONTEXTOS,
+                    score_threshold=self.SCORE_MINIMO
                 )
+                anonimizados = [
+                    self._aplicar_presidio(texto, resultados)
+                    for texto, resultados in zip(validos, resultados_lote)
+                ]
+
+                # 2. Identificação manual de nomes com nlp.pipe
+                docs = self.nlp.pipe(anonimizados, batch_size=batch_size, n_process=n_process)
+                for i, texto_anonimizado, doc in zip(indices, anonimizados, docs):
+                    saida[i] = self._pos_processar(texto_anonimizado, self._extrair_nomes(doc))
 
-            # 4. Pós-processamento para corrigir substituições indesejadas
-            substituicoes = {
-                "<LOCATION> Olá": "Olá",
-                "<LOCATION> a": "a",
-                "<LOCATION> \\": "\\",
-                "<ORGANIZATION>": "Termo"
-            }
-            
-            for padrao, substituicao in substituicoes.items():
-                texto_anonimizado = texto_anonimizado.replace(padrao, substituicao)
-
-            return self._ESPACOS_REGEX.sub(' ', texto_anonimizado).strip()
-            
         except Exception as e:
-            logger.error(f"Erro ao anonimizar texto. Texto: '{texto[:50]}...'. Erro: {str(e)}")
-            return texto
\ No newline at end of file
+            logger.error(f"Erro ao anonimizar lote de {len(validos)} textos, processando individualmente. Erro: {str(e)}")
+            for i in indices:
+                saida[i] = self._anonimizar_e_guardar(textos[i])
+            return saida
+
+        self._contar_caminho("ner", len(indices))
+        for i in indices:
+            self.cache.guardar(textos[i], saida[i])
+        return saida
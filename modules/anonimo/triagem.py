@@ -0,0 +1,57 @@
+import os
+import re
+from typing import Iterable
+from dotenv import load_dotenv
+from . import pii
+from .patterns import PADROES_PERSONALIZADOS
+
+load_dotenv()
+
+# "estrito": qualquer PII ou palavra capitalizada fora da lista de palavras comuns vai para o NER
+# "rapido": só sequências de 2+ palavras capitalizadas (possíveis nomes) vão para o NER
+# "desligado": todo texto passa pelo NER, como antes da triagem
+MODO_TRIAGEM = os.getenv("ANONIMIZADOR_TRIAGEM", "estrito").lower()
+
+# Palavras capitalizadas frequentes nas descrições que, sozinhas, não indicam entidade
+PALAVRAS_COMUNS = {
+    "A", "O", "As", "Os", "Ao", "Aos", "Em", "No", "Na", "Nos", "Nas", "De", "Do", "Da", "Dos", "Das",
+    "Para", "Por", "Com", "Sem", "Se", "E", "Ou", "Um", "Uma", "Não", "Nao", "Sim", "Foi", "Está", "Esta",
+    "Estou", "Este", "Essa", "Esse", "Isso", "Favor", "Segue", "Seguem", "Após", "Quando",
+    "Como", "Qual", "Quais", "Hoje", "Ontem", "Amanhã", "Bom", "Boa", "Dia", "Tarde", "Noite", "Olá", "Ola",
+    "Oi", "Prezados", "Prezado", "Prezada", "Solicito", "Solicitamos", "Gostaria", "Gentileza", "Identificado",
+    "Identificamos", "Preciso", "Precisamos", "Peço", "Pedido", "Erro", "Problema", "Verificar", "Obrigado",
+    "Obrigada", "Atenciosamente", "Att", "Contrato", "Termo", "Formulário",
+}
+
+_PII_REGEX = re.compile('|'.join(
+    f'(?:{pattern.regex})'
+    for padrao in PADROES_PERSONALIZADOS
+    for pattern in padrao["padroes"]
+))
+_PALAVRA_CAPITALIZADA = re.compile(r'\b[A-ZÀ-ÖØ-Þ][\wÀ-ÖØ-öø-ÿ]*')
+_SEQUENCIA_CAPITALIZADA = re.compile(
+    r'\b[A-ZÀ-ÖØ-Þ][a-zß-öø-ÿ]+(?:\s+(?:(?:d[aeo]s?|e)\s+)?[A-ZÀ-ÖØ-Þ][a-zß-öø-ÿ]+)+'
+)
+_CONECTORES = {"de", "da", "do", "das", "dos", "e"}
+
+
+def _capitalizadas_relevantes(palavras: Iterable[str]) -> bool:
+    return any(palavra not in PALAVRAS_COMUNS for palavra in palavras)
+
+
+def precisa_ner(texto: str, modo: str = None) -> bool:
+    """Decide se o texto precisa do NER do spaCy ou se basta a anonimização por regex"""
+    modo = modo or MODO_TRIAGEM
+
+    if modo == "estrito":
+        if pii.encontrar(texto) if pii.RECONHECEDOR == "combinado" else _PII_REGEX.search(texto):
+            return True
+        return _capitalizadas_relevantes(m.group() for m in _PALAVRA_CAPITALIZADA.finditer(texto))
+
+    if modo == "rapido":
+        return any(
+            _capitalizadas_relevantes(p for p in m.group().split() if p not in _CONECTORES)
+            for m in _SEQUENCIA_CAPITALIZADA.finditer(texto)
+        )
+
+    return True
@@ -0,0 +1,32 @@
+"""Exporta o dataset pré-processado para shards Parquet, sem passar pela API.
+
+Uso:
+    python -m modules.exportacao --entrada mongo --saida dataset/
+    python -m modules.exportacao --entrada interacoes.jsonl --saida dataset/ --workers 8
+
+Rodar de novo com o mesmo --saida retoma a partir do último shard gravado.
+"""
+import argparse
+import sys
+
+from modules.exportacao.service import TAMANHO_SHARD, CheckpointIncompativel, exportar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrada", required=True, help="'mongo' (coleção interacoes) ou arquivo .jsonl/.parquet")
+    parser.add_argument("--saida", required=True, help="diretório dos shards e do checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="processos de pré-processamento (padrão: CPUs)")
+    parser.add_argument("--tamanho-shard", type=int, default=TAMANHO_SHARD, help="interações lidas por shard")
+    args = parser.parse_args()
+
+    try:
+        resumo = exportar(args.entrada, args.saida, workers=args.workers, tamanho_shard=args.tamanho_shard)
+    except CheckpointIncompativel as e:
+        sys.exit(str(e))
+
+    print(f"{resumo['lidos']} chamados gravados em {resumo['shards']} shards.")
+
+
+if __name__ == "__main__":
+    main()
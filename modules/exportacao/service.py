@@ -0,0 +1,192 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from bson import ObjectId
+from dotenv import load_dotenv
+from modules.anonimo.service import Anonimizador
+from modules.shared.database import get_db
+from modules.shared.logger import ProgressoLog, obter_logger
+from modules.importacao.service import LOTE_ANONIMIZACAO, agrupar, executar_em_janela, inicializar_worker
+from modules.nova_tabela_descricao_dataset.service import extrair_serie
+from modules.tratamento_descricao_dataset.service import limpar_serie as limpar_descricoes
+from modules.tratamento_mensagem.service import limpar_serie as limpar_mensagens
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+TAMANHO_SHARD = int(os.getenv("EXPORTACAO_TAMANHO_SHARD", "50000"))
+LOTE_LEITURA = int(os.getenv("EXPORTACAO_LOTE_LEITURA", "5000"))
+
+COLUNAS = ["chamadoId", "mensagem_limpa", "descricao_dataset"]
+ARQUIVO_CHECKPOINT = "_checkpoint.json"
+
+
+class CheckpointIncompativel(Exception):
+    """O diretório de saída já tem um checkpoint de outra entrada"""
+
+
+def ler_mongo(posicao: Optional[str] = None) -> Iterator[Dict]:
+    """Interações em ordem de _id, a partir da posição salva; cada item traz sua posição"""
+    filtro = {}
+    if posicao is not None:
+        filtro = {"_id": {"$gt": ObjectId(posicao) if ObjectId.is_valid(posicao) else posicao}}
+    cursor = get_db()["interacoes"].find(
+        filtro, {"_id": 1, "chamadoId": 1, "mensagem": 1}
+    ).sort("_id", 1).batch_size(LOTE_LEITURA)
+    for doc in cursor:
+        yield {"chamadoId": doc.get("chamadoId"), "mensagem": doc.get("mensagem"), "_posicao": str(doc["_id"])}
+
+
+def ler_jsonl(caminho: str, posicao: Optional[int] = None) -> Iterator[Dict]:
+    """Uma interação por linha; a posição é o número de linhas já consumidas"""
+    inicio = posicao or 0
+    with open(caminho, encoding="utf-8") as arquivo:
+        for numero, linha in enumerate(islice(arquivo, inicio, None), start=inicio + 1):
+            if not linha.strip():
+                continue
+            doc = json.loads(linha)
+            yield {"chamadoId": doc.get("chamadoId"), "mensagem": doc.get("mensagem"), "_posicao": numero}
+
+
+def ler_parquet(caminho: str, posicao: Optional[int] = None) -> Iterator[Dict]:
+    """Lê o arquivo em lotes de LOTE_LEITURA linhas, só com as colunas usadas"""
+    import pyarrow.parquet as pq
+
+    inicio = posicao or 0
+    linha = 0
+    for lote in pq.ParquetFile(caminho).iter_batches(batch_size=LOTE_LEITURA, columns=["chamadoId", "mensagem"]):
+        if linha + lote.num_rows <= inicio:
+            linha += lote.num_rows
+            continue
+        for doc in lote.to_pylist():
+            linha += 1
+            if linha > inicio:
+                yield {"chamadoId": doc.get("chamadoId"), "mensagem": doc.get("mensagem"), "_posicao": linha}
+
+
+def abrir_entrada(entrada: str, posicao=None) -> Iterator[Dict]:
+    """`entrada` é "mongo" ou o caminho de um arquivo .jsonl/.parquet"""
+    if entrada == "mongo":
+        return ler_mongo(posicao)
+    if entrada.endswith((".jsonl", ".ndjson")):
+        return ler_jsonl(entrada, posicao)
+    if entrada.endswith(".parquet"):
+        return ler_parquet(entrada, posicao)
+    raise ValueError(f"Entrada não suportada: {entrada}. Use 'mongo', .jsonl ou .parquet")
+
+
+def carregar_checkpoint(saida: str, entrada: str) -> Dict:
+    caminho = os.path.join(saida, ARQUIVO_CHECKPOINT)
+    if not os.path.exists(caminho):
+        return {"entrada": entrada, "shards": 0, "lidos": 0, "posicao": None}
+    with open(caminho, encoding="utf-8") as arquivo:
+        checkpoint = json.load(arquivo)
+    if checkpoint["entrada"] != entrada:
+        raise CheckpointIncompativel(
+            f"{saida} contém uma exportação de {checkpoint['entrada']}; use outro diretório de saída."
+        )
+    return checkpoint
+
+
+def _gravar_atomico(caminho: str, gravar):
+    temporario = f"{caminho}.tmp"
+    gravar(temporario)
+    os.replace(temporario, caminho)
+
+
+def gravar_shard(saida: str, numero: int, tabela: pd.DataFrame) -> str:
+    caminho = os.path.join(saida, f"parte-{numero:05d}.parquet")
+    _gravar_atomico(caminho, lambda destino: tabela[COLUNAS].to_parquet(destino, index=False))
+    return caminho
+
+
+def gravar_checkpoint(saida: str, checkpoint: Dict):
+    def gravar(destino):
+        with open(destino, "w", encoding="utf-8") as arquivo:
+            json.dump(checkpoint, arquivo)
+
+    _gravar_atomico(os.path.join(saida, ARQUIVO_CHECKPOINT), gravar)
+
+
+def preparar_shard(shard: List[Dict]) -> pd.DataFrame:
+    """Limpeza e extração do shard inteiro de uma vez, pelo caminho vetorizado"""
+    tabela = pd.DataFrame(shard, columns=["chamadoId", "mensagem"])
+    tabela["mensagem_limpa"] = limpar_mensagens(tabela["mensagem"])
+    tabela["descricao_dataset"] = limpar_descricoes(extrair_serie(tabela["mensagem_limpa"]))
+    return tabela
+
+
+def anonimizar_lote(descricoes: List[str]) -> List[str]:
+    return Anonimizador().anonimizar_lote(descricoes)
+
+
+def processar_shard(tarefa: Tuple[str, int, List[Dict]]) -> Dict:
+    """Limpeza, anonimização e gravação de um shard inteiro, no worker.
+
+    Devolve o que o checkpoint precisa: quantas interações o shard leu e a
+    posição da última na entrada.
+    """
+    saida, numero, shard = tarefa
+    tabela = preparar_shard(shard)
+    descricoes = tabela["descricao_dataset"].tolist()
+    tabela["descricao_dataset"] = [
+        descricao for lote in agrupar(descricoes, LOTE_ANONIMIZACAO) for descricao in anonimizar_lote(lote)
+    ]
+    gravar_shard(saida, numero, tabela)
+    return {"lidos": len(shard), "posicao": shard[-1]["_posicao"]}
+
+
+def ler_shards(itens: Iterator[Dict], tamanho_shard: int) -> Iterator[List[Dict]]:
+    while True:
+        shard = list(islice(itens, tamanho_shard))
+        if not shard:
+            return
+        yield shard
+
+
+def exportar(entrada: str, saida: str, workers: int = None, tamanho_shard: int = None) -> Dict:
+    """Processa a entrada inteira e grava shards Parquet em `saida`, retomando do último checkpoint.
+
+    O processo principal só lê a entrada e mantém o checkpoint: cada shard é
+    limpo (pelo caminho vetorizado), anonimizado e gravado por um worker, com no
+    máximo `workers` shards em memória ao mesmo tempo. Cada shard corresponde a
+    `tamanho_shard` interações lidas; o checkpoint (posição na entrada e número
+    de shards) avança na ordem dos shards, só depois que cada um foi gravado,
+    então uma interrupção refaz no máximo os shards que estavam em andamento.
+    """
+    workers = workers or os.cpu_count() or 1
+    tamanho_shard = tamanho_shard or TAMANHO_SHARD
+    os.makedirs(saida, exist_ok=True)
+
+    checkpoint = carregar_checkpoint(saida, entrada)
+    if checkpoint["shards"]:
+        logger.info(f"Retomando exportação a partir do shard {checkpoint['shards']} ({checkpoint['lidos']} lidos).")
+
+    shards = ler_shards(abrir_entrada(entrada, checkpoint["posicao"]), tamanho_shard)
+    tarefas = ((saida, numero, shard) for numero, shard in enumerate(shards, start=checkpoint["shards"]))
+    progresso = ProgressoLog("Exportação", log=logger)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=inicializar_worker) if workers > 1 else None
+    try:
+        if pool:
+            concluidos = executar_em_janela(pool, processar_shard, tarefas, workers)
+        else:
+            concluidos = map(processar_shard, tarefas)
+        for concluido in concluidos:
+            checkpoint.update(
+                shards=checkpoint["shards"] + 1,
+                lidos=checkpoint["lidos"] + concluido["lidos"],
+                posicao=concluido["posicao"]
+            )
+            gravar_checkpoint(saida, checkpoint)
+            progresso.avancar(concluido["lidos"])
+    finally:
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    progresso.finalizar()
+    return checkpoint
@@ -1,19 +1,33 @@
-from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
-from modules.shared.database import get_db
-from modules.shared.logger import logger
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from modules.shared import metricas
+from modules.shared.database import get_db, get_db_async
+from modules.shared.estagios import Estagio, GrafoEstagios
+from modules.shared.logger import ProgressoLog, obter_logger
 from modules.tratamento_mensagem.service import limpar_mensagem
 from modules.nova_tabela_descricao_dataset.service import extrair_descricao
 from modules.tratamento_descricao_dataset.service import limpar_descricao
 from modules.anonimo.service import Anonimizador
-import requests
+from modules.jobs.service import criar_job_async
+from modules.previsao.service import EnviadorPrevisao, enviar_lote
+from modules.importacao.service import (
+    CAPACIDADE_FILA, CONCORRENCIA_ANONIMIZACAO, CONCORRENCIA_LIMPEZA, CONCORRENCIA_PERSISTENCIA, LOTE_ANONIMIZACAO,
+    LOTE_STREAM, MAX_ITENS_STREAM, agrupar, anonimizar_preparados, buscar_interacoes_async, executar_cpu,
+    hash_mensagem, iterar_pendentes, preparar_lote, processar_lote_async, salvar_resultados, salvar_resultados_async
+)
 
-router = APIRouter(prefix="/api/v1")
+logger = obter_logger(__name__)
 
-LOTE_TAMANHO = 10
+router = APIRouter(prefix="/api/v1")
 
 @router.post("/process")
-async def process_ids(request: Request, background_tasks: BackgroundTasks):
-    """Endpoint para receber IDs e iniciar processamento"""
+async def process_ids(request: Request):
+    """Endpoint para receber IDs e enfileirar o processamento"""
     try:
         data = await request.json()
         ids = data.get('ids', []) if isinstance(data, dict) else data
@@ -25,17 +39,21 @@ async def process_ids(request: Request, background_tasks: BackgroundTasks):
             logger.info("Nenhum ID foi enviado para processamento.")
             return {"status": "success", "message": "Nenhum ID para processar"}
         
-        logger.info(f"Recebido {len(ids)} IDs para processamento. Iniciando o processamento em background.")
+        logger.info(f"Recebido {len(ids)} IDs para processamento. Criando job.")
         
-        # Adiciona o processamento em segundo plano
-        background_tasks.add_task(processar_e_obter_descricoes, ids)
+        # O job fica no MongoDB e é executado pelo consumidor da fila
+        perfilar = bool(data.get("perfilar")) if isinstance(data, dict) else False
+        job = await criar_job_async(ids, perfilar=perfilar)
         
-        logger.info("Processamento adicionado à fila de tarefas do BackgroundTasks.")
+        logger.info(f"Job {job['jobId']} enfileirado com {job['total']} IDs.")
         
         return {
             "status": "success",
-            "message": "Processamento iniciado em background.",
-            "received_ids": len(ids)
+            "message": "Processamento enfileirado.",
+            "jobId": job["jobId"],
+            "received_ids": len(ids),
+            "queued_ids": job["total"],
+            "duplicated_ids": len(job["duplicados"])
         }
     
     except Exception as e:
@@ -43,85 +61,204 @@ async def process_ids(request: Request, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=422, detail=str(e))
 
 
-def processar_e_obter_descricoes(ids: list):
-    """Processa os IDs e retorna lista de dicionários com chamadoId e descricao_dataset"""
+def processar_e_obter_descricoes(ids: list, ao_salvar: Optional[Callable[[List[str]], None]] = None,
+                                 ao_falhar: Optional[Callable[[List[str], str], None]] = None,
+                                 parar: Optional[threading.Event] = None) -> Dict:
+    """Processa os IDs, salva os resultados e os envia para previsão.
+
+    As etapas formam um grafo de estágios ligados por filas limitadas (busca →
+    limpeza → anonimização → persistência → previsão), então a leitura do
+    MongoDB, a CPU, a escrita e o /prever andam ao mesmo tempo e o estágio mais
+    lento só limita a vazão, sem serializar os demais.
+
+    `ao_salvar`, se informado, recebe os chamadoIds de cada lote persistido, e
+    `ao_falhar` os que falharam na limpeza ou na gravação, com o motivo.
+    Retorna o resumo com `processados`, `enviados_previsao` e `falhas_previsao`.
+    Lança `estagios.Interrompido` se o desligamento drenar o grafo ou se `parar`
+    for marcado antes do fim.
+    """
     db = get_db()
-    chamados = []
     
     logger.info(f"Iniciando processamento detalhado de {len(ids)} IDs no MongoDB.")
     
-    items = list(db["interacoes"].find({"chamadoId": {"$in": ids}}))
-    
-    if not items:
-        logger.warning("Nenhum item encontrado no banco de dados para os IDs fornecidos.")
-        return
-    
-    for item in items:
-        try:
-            if not item:
-                continue
-            
-            chamado_id = item.get('chamadoId')
-            
-            processado = db["interacoes_processadas"].find_one({"chamadoId": chamado_id})
-            if processado and processado.get("emocao") and processado.get("tipoChamado"):
-                logger.info(f"ChamadoId {chamado_id} já foi processado anteriormente. Pulando...")
-                continue 
-
-            logger.info(f"Processando chamadoId: {chamado_id}")
-            
-            mensagem_limpa = limpar_mensagem(item.get("mensagem", ""))
-            descricao = extrair_descricao(mensagem_limpa)
-            descricao_limpa = limpar_descricao(descricao) if descricao else ""
-            
-            if descricao_limpa:
-                descricao_limpa = Anonimizador().anonimizar_texto(descricao_limpa)
-            
-            db["interacoes_processadas"].update_one(
-                {"chamadoId": chamado_id},
-                {"$set": {
-                    "mensagem_limpa": mensagem_limpa,
-                    "descricao_dataset": descricao_limpa
-                }},
-                upsert=True
-            )
-            
-            logger.info(f"ChamadoId {chamado_id} processado e salvo no banco de dados.")
-            
-            chamados.append({
-                "chamadoId": chamado_id,
-                "descricao": descricao_limpa
-            })
-            
-            if len(chamados) >= LOTE_TAMANHO:
-                enviar_para_previsao(chamados)
-                chamados.clear()
-            
-        except Exception as e:
-            logger.error(f"Erro processando item {item.get('chamadoId')}: {str(e)}")
-            continue
+    progresso = ProgressoLog("Processamento", total=len(ids), log=logger)
+    # A persistência tem várias threads; o progresso e o `ao_salvar` são chamados um lote por vez
+    lock = threading.Lock()
+
+    def limpar(lote: List[Dict]) -> Optional[list]:
+        preparados = executar_cpu(preparar_lote, lote)
+        if ao_falhar and len(preparados) < len(lote):
+            # `preparar_lote` registra e descarta os itens em que a limpeza falhou
+            preparados_ids = {item.get("chamadoId") for item, _, _ in preparados}
+            ao_falhar([item.get("chamadoId") for item in lote if item.get("chamadoId") not in preparados_ids],
+                      "falha na limpeza")
+        return preparados or None
+
+    def persistir(resultados: List[Dict]) -> Optional[List[Dict]]:
+        salvos = _salvar(db, resultados)
+        with lock:
+            if salvos and ao_salvar:
+                ao_salvar([resultado["chamadoId"] for resultado in resultados])
+            elif not salvos and ao_falhar:
+                ao_falhar([resultado["chamadoId"] for resultado in resultados], "falha ao gravar")
+            progresso.avancar(len(resultados))
+        chamados = [
+            {"chamadoId": resultado["chamadoId"], "descricao": resultado["descricao_dataset"]}
+            for resultado in resultados
+            if salvos and resultado.get("precisa_previsao", True)
+        ]
+        return chamados or None
+
+    # O envio ao /prever acontece em segundo plano, com até PREVISAO_MAX_EM_VOO lotes em voo
+    with EnviadorPrevisao() as enviador:
+        def enviar(chamados: List[Dict]):
+            for chamado in chamados:
+                enviador.adicionar(chamado)
+
+        grafo = GrafoEstagios("importacao", [
+            Estagio("limpeza", limpar, CONCORRENCIA_LIMPEZA, CAPACIDADE_FILA),
+            Estagio("anonimizacao", lambda preparados: executar_cpu(anonimizar_preparados, preparados),
+                    CONCORRENCIA_ANONIMIZACAO, CAPACIDADE_FILA),
+            Estagio("persistencia", persistir, CONCORRENCIA_PERSISTENCIA, CAPACIDADE_FILA),
+            # O EnviadorPrevisao não é thread-safe: uma thread só, que bloqueia quando o /prever atrasa
+            Estagio("previsao", enviar, 1, CAPACIDADE_FILA),
+        ], parar=parar)
+        # Chamados inalterados mas sem previsão vão direto para o envio, sem reprocessamento
+        pendentes = iterar_pendentes(db, ids, reenviar=lambda chamado: grafo.injetar("previsao", [chamado]))
+        grafo.executar(agrupar(pendentes, LOTE_ANONIMIZACAO))
+
+    progresso.finalizar(enviados_previsao=enviador.enviados, falhas_previsao=sum(len(lote) for lote in enviador.falhas))
 
-    if chamados:
-        enviar_para_previsao(chamados)
+    if not progresso.processados:
+        logger.warning("Nenhum item pendente encontrado no banco de dados para os IDs fornecidos.")
+
+    return {"processados": progresso.processados, **progresso.contadores}
+
+
+def _salvar(db, resultados: list) -> bool:
+    """Persiste os resultados em lote; False (e o erro contado) se a escrita falhar"""
+    try:
+        salvar_resultados(db, resultados)
+        logger.debug("%d chamados processados e salvos no banco de dados.", len(resultados))
+        metricas.contar("itens", "processado", len(resultados))
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao salvar lote de {len(resultados)} chamados: {str(e)}")
+        metricas.contar("itens", "erro", len(resultados))
+        return False
 
 
 def enviar_para_previsao(chamados: list):
     """Envia os chamados para o Flask para análise de sentimentos"""
+    logger.info(f"Enviando {len(chamados)} chamados para análise de emoções no Flask.")
+    enviar_lote(chamados)
+
+@router.post("/processar-stream")
+async def processar_stream(request: Request):
+    """Limpa e anonimiza `{"ids": [...]}` ou `{"textos": [...]}` e devolve os resultados em NDJSON.
+
+    Cada linha sai assim que o lote de LOTE_STREAM itens que a contém termina,
+    na ordem da entrada. Nada é gravado no banco. Se o cliente desconectar, o
+    Starlette cancela o gerador e nenhum lote novo é iniciado.
+    """
     try:
-        logger.info(f"Enviando {len(chamados)} chamados para análise de emoções no Flask.")
-        
-        response = requests.post(
-            "http://localhost:8080/prever",
-            json={"chamados": chamados},
-            headers={"Content-Type": "application/json"},
-            timeout=300
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Corpo da requisição não é um JSON válido.")
+
+    if isinstance(data, dict) and isinstance(data.get("ids"), list):
+        entradas, por_id = data["ids"], True
+        # Os IDs viram chaves de dicionário e vão para o $in: objetos e listas não são IDs
+        if not all(isinstance(chamado_id, (str, int, float)) for chamado_id in entradas):
+            raise HTTPException(status_code=422, detail="Formato inválido. Os IDs devem ser strings ou números")
+    elif isinstance(data, dict) and isinstance(data.get("textos"), list):
+        entradas, por_id = data["textos"], False
+    else:
+        raise HTTPException(status_code=422, detail="Formato inválido. Esperado {'ids': [...]} ou {'textos': [...]}")
+
+    if len(entradas) > MAX_ITENS_STREAM:
+        raise HTTPException(
+            status_code=413,
+            detail=f"No máximo {MAX_ITENS_STREAM} itens por requisição; use /process para volumes maiores."
         )
-        response.raise_for_status()
-        
-        logger.info(f"Lote enviado com sucesso! Resposta: {response.status_code}")
-    
+
+    logger.info(f"Stream de {len(entradas)} {'IDs' if por_id else 'textos'} iniciado.")
+    return StreamingResponse(_gerar_ndjson(entradas, por_id), media_type="application/x-ndjson")
+
+
+async def _processar_lote_stream(entradas: list, inicio: int, por_id: bool) -> List[Dict]:
+    """Linhas do NDJSON de um lote: resultado, ou `erro` para IDs ausentes e itens que falharam"""
+    # Sem a consulta ao MongoDB não se sabe quais IDs existem: todos saem como falha
+    encontrados = None
+    resultados = {}
+    try:
+        if por_id:
+            encontrados = await buscar_interacoes_async(get_db_async(), entradas)
+            itens = [encontrados[chamado_id] for chamado_id in dict.fromkeys(entradas) if chamado_id in encontrados]
+        else:
+            # O índice na requisição identifica o texto
+            itens = [{"chamadoId": inicio + i, "mensagem": texto} for i, texto in enumerate(entradas)]
+
+        if itens:
+            resultados = {r["chamadoId"]: r for r in await processar_lote_async(itens)}
     except Exception as e:
-        logger.error(f"Erro ao enviar lote para Flask: {str(e)}")
+        logger.error(f"Erro processando lote do stream a partir do item {inicio}: {str(e)}")
+
+    chave = "chamadoId" if por_id else "indice"
+    linhas = []
+    for i, entrada in enumerate(entradas):
+        identificador = entrada if por_id else inicio + i
+        resultado = resultados.get(identificador)
+        if resultado:
+            linhas.append({
+                chave: identificador,
+                "mensagem_limpa": resultado["mensagem_limpa"],
+                "descricao_dataset": resultado["descricao_dataset"]
+            })
+        elif encontrados is not None and identificador not in encontrados:
+            linhas.append({chave: identificador, "erro": "não encontrado"})
+        else:
+            linhas.append({chave: identificador, "erro": "falha no processamento"})
+    return linhas
+
+
+async def _gerar_ndjson(entradas: list, por_id: bool) -> AsyncIterator[bytes]:
+    """Um lote é processado enquanto o anterior é enviado; no máximo dois lotes em memória"""
+    inicios = range(0, len(entradas), LOTE_STREAM)
+
+    def iniciar(posicao: int) -> Optional[asyncio.Future]:
+        if posicao >= len(inicios):
+            return None
+        inicio = inicios[posicao]
+        return asyncio.ensure_future(_processar_lote_stream(entradas[inicio:inicio + LOTE_STREAM], inicio, por_id))
+
+    em_andamento = iniciar(0)
+    enviados = 0
+    try:
+        for posicao in range(len(inicios)):
+            linhas = await em_andamento
+            # O próximo lote só começa agora, para não disputar CPU com o atual
+            em_andamento = iniciar(posicao + 1)
+            yield "".join(json.dumps(linha, ensure_ascii=False) + "\n" for linha in linhas).encode("utf-8")
+            enviados += len(linhas)
+    finally:
+        if em_andamento is not None:
+            em_andamento.cancel()
+        if enviados < len(entradas):
+            logger.warning(f"Stream interrompido após {enviados} de {len(entradas)} itens.")
+
+
+@router.get("/anonimizador/estatisticas")
+async def estatisticas_anonimizador():
+    """Contadores do cache e da triagem do Anonimizador deste processo"""
+    if not Anonimizador.carregado():
+        return {"status": "success", "message": "Anonimizador ainda não foi inicializado."}
+    anonimizador = Anonimizador()
+    return {
+        "status": "success",
+        "cache": anonimizador.cache.estatisticas(),
+        "caminhos": dict(anonimizador.caminhos)
+    }
 
 @router.post("/processar-teste")
 async def processar_teste(request: Request):
@@ -136,13 +273,13 @@ async def processar_teste(request: Request):
         logger.info(f"Recebendo chamadoId {chamado_id} para teste.")
 
         # Processa o chamado individualmente
-        resultado = processar_individualmente(chamado_id)
+        resultado = await processar_individualmente(chamado_id)
         
         if not resultado:
             raise HTTPException(status_code=404, detail=f"ChamadoId {chamado_id} não encontrado no banco de dados.")
         
-        # Envia o chamado para análise
-        enviar_para_previsao([resultado])
+        # Envia o chamado para análise; o envio é síncrono e bloquearia o event loop
+        await run_in_threadpool(enviar_para_previsao, [resultado])
 
         return {
             "status": "success",
@@ -154,10 +291,27 @@ async def processar_teste(request: Request):
         return {"status": "error", "message": str(e)}
 
 
-def processar_individualmente(chamado_id: str):
-    """Processa um único chamado pelo chamadoId"""
-    db = get_db()
-    item = db["interacoes"].find_one({"chamadoId": chamado_id})
+def _tratar_mensagem(mensagem: str):
+    """Limpeza, extração e anonimização de uma mensagem; devolve (mensagem_limpa, descricao)"""
+    mensagem_limpa = metricas.executar_etapa("limpar_mensagem", limpar_mensagem, mensagem)
+    descricao = metricas.executar_etapa("extrair_descricao", extrair_descricao, mensagem_limpa)
+    descricao_limpa = metricas.executar_etapa("limpar_descricao", limpar_descricao, descricao) if descricao else ""
+
+    if descricao_limpa:
+        descricao_limpa = metricas.executar_etapa("anonimizar", Anonimizador().anonimizar_texto, descricao_limpa)
+        metricas.observar_entidades(descricao_limpa)
+    return mensagem_limpa, descricao_limpa
+
+
+async def processar_individualmente(chamado_id: str):
+    """Processa um único chamado pelo chamadoId.
+
+    A leitura e a gravação vão pelo Motor e o tratamento (CPU) roda no
+    threadpool, então o event loop continua atendendo as outras requisições.
+    """
+    db = get_db_async()
+    with metricas.medir("consulta_interacoes"):
+        item = await db["interacoes"].find_one({"chamadoId": chamado_id})
     
     if not item:
         logger.warning(f"ChamadoId {chamado_id} não encontrado no banco de dados.")
@@ -166,24 +320,18 @@ def processar_individualmente(chamado_id: str):
     try:
         logger.info(f"Processando chamadoId: {chamado_id}")
         
-        mensagem_limpa = limpar_mensagem(item.get("mensagem", ""))
-        descricao = extrair_descricao(mensagem_limpa)
-        descricao_limpa = limpar_descricao(descricao) if descricao else ""
-        
-        if descricao_limpa:
-            descricao_limpa = Anonimizador().anonimizar_texto(descricao_limpa)
+        mensagem_limpa, descricao_limpa = await run_in_threadpool(_tratar_mensagem, item.get("mensagem", ""))
         
         # Atualiza o MongoDB com o dado processado
-        db["interacoes_processadas"].update_one(
-            {"chamadoId": chamado_id},
-            {"$set": {
-                "mensagem_limpa": mensagem_limpa,
-                "descricao_dataset": descricao_limpa
-            }},
-            upsert=True
-        )
+        await salvar_resultados_async(db, [{
+            "chamadoId": chamado_id,
+            "mensagem_limpa": mensagem_limpa,
+            "descricao_dataset": descricao_limpa,
+            "hashMensagem": hash_mensagem(item.get("mensagem"))
+        }])
         
         logger.info(f"ChamadoId {chamado_id} processado e salvo no banco de dados.")
+        metricas.contar("itens", "processado")
 
         return {
             "chamadoId": chamado_id,
@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from modules.shared import database, metricas
+from modules.shared.logger import obter_logger
+from modules.shared.regras_limpeza import assinatura_regras
+from modules.tratamento_mensagem.service import REGRAS_MENSAGEM, limpar_mensagem
+from modules.nova_tabela_descricao_dataset.service import assinatura_extracao, extrair_descricao
+from modules.tratamento_descricao_dataset.service import REGRAS_DESCRICAO, REJEICAO, limpar_descricao
+from modules.anonimo.cache import CacheAnonimizacao
+from modules.anonimo.service import Anonimizador
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+LOTE_ANONIMIZACAO = int(os.getenv("IMPORTACAO_LOTE_ANONIMIZACAO", "50"))
+LOTE_ESCRITA = int(os.getenv("IMPORTACAO_LOTE_ESCRITA", "500"))
+# Quantidade de IDs por consulta $in e de documentos por round trip do cursor
+LOTE_CONSULTA = int(os.getenv("IMPORTACAO_LOTE_CONSULTA", "1000"))
+CURSOR_BATCH_SIZE = int(os.getenv("IMPORTACAO_CURSOR_BATCH_SIZE", "200"))
+# /processar-stream: itens por lote devolvido (menor = primeiros resultados mais cedo) e máximo por requisição
+LOTE_STREAM = int(os.getenv("IMPORTACAO_LOTE_STREAM", "20"))
+MAX_ITENS_STREAM = int(os.getenv("IMPORTACAO_MAX_ITENS_STREAM", "5000"))
+
+# "local" processa tudo na thread da BackgroundTask; "processos" distribui os lotes
+# entre IMPORTACAO_WORKERS processos, cada um com o seu próprio Anonimizador.
+MODO_EXECUCAO = os.getenv("IMPORTACAO_MODO_EXECUCAO", "local").lower()
+WORKERS = int(os.getenv("IMPORTACAO_WORKERS", str(os.cpu_count() or 1)))
+
+# Grafo do processamento em lote (busca → limpeza → anonimização → persistência → previsão):
+# lotes de LOTE_ANONIMIZACAO itens por fila de estágio e threads por estágio
+CAPACIDADE_FILA = int(os.getenv("IMPORTACAO_FILA_CAPACIDADE", "4"))
+CONCORRENCIA_LIMPEZA = int(os.getenv("IMPORTACAO_CONCORRENCIA_LIMPEZA", "1"))
+CONCORRENCIA_ANONIMIZACAO = int(os.getenv(
+    "IMPORTACAO_CONCORRENCIA_ANONIMIZACAO", str(WORKERS if MODO_EXECUCAO == "processos" else 1)
+))
+CONCORRENCIA_PERSISTENCIA = int(os.getenv("IMPORTACAO_CONCORRENCIA_PERSISTENCIA", "2"))
+# Prazo no desligamento para concluir os lotes que já estão nas filas
+DRENAGEM_S = float(os.getenv("IMPORTACAO_DRENAGEM_S", "30"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Campos gravados pelo serviço de previsão; ficam inválidos quando a descrição muda
+CAMPOS_PREVISAO = ("emocao", "tipoChamado")
+
+
+def versao_pipeline() -> str:
+    """Hash das regras de limpeza, da extração e da configuração do Anonimizador.
+
+    Muda sempre que algo que afeta `mensagem_limpa` ou `descricao_dataset` muda,
+    invalidando os documentos processados por uma versão anterior.
+    """
+    configuracao = {
+        "mensagem": assinatura_regras(REGRAS_MENSAGEM),
+        "descricao": [REJEICAO.pattern, REJEICAO.flags, assinatura_regras(REGRAS_DESCRICAO)],
+        "extracao": assinatura_extracao(),
+        "anonimizador": Anonimizador.versao_configuracao()
+    }
+    return hashlib.sha256(json.dumps(configuracao, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+VERSAO_PIPELINE = versao_pipeline()
+
+
+def hash_mensagem(mensagem: Optional[str]) -> str:
+    """Hash do conteúdo original da mensagem, para detectar edições no chamado"""
+    return hashlib.sha256((mensagem or "").encode("utf-8")).hexdigest()[:32]
+
+
+def inicializar_worker():
+    """Carrega o Anonimizador uma única vez em cada processo do pool"""
+    # O MongoClient herdado do processo pai não pode ser usado após o fork
+    database._client = None
+    if Anonimizador.carregado():
+        anonimizador = Anonimizador()
+        # Carregado antes do fork: o nível persistente (SQLite ou MongoDB) é reaberto, como em servidor.apos_fork
+        anonimizador.cache = CacheAnonimizacao(anonimizador.versao_configuracao())
+    else:
+        Anonimizador()
+    logger.info(f"Worker {os.getpid()} inicializado.")
+
+
+def obter_pool() -> ProcessPoolExecutor:
+    """Retorna o pool de processos compartilhado, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, initializer=inicializar_worker)
+        logger.info(f"Pool de pré-processamento criado com {WORKERS} workers.")
+    return _pool
+
+
+def encerrar_pool():
+    """Finaliza o pool de processos, se existir"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def processar_lote(itens: List[Dict]) -> List[Dict]:
+    """Executa limpeza, extração e anonimização sobre um lote de interações.
+
+    Cada item precisa de `chamadoId` e `mensagem` e pode trazer o estado
+    `anterior` devolvido por `iterar_pendentes`. Retorna um dicionário por item
+    processado com `chamadoId`, `mensagem_limpa`, `descricao_dataset`,
+    `hashMensagem` e `precisa_previsao`.
+    """
+    return anonimizar_preparados(preparar_lote(itens))
+
+
+def preparar_lote(itens: List[Dict]) -> List[Tuple[Dict, str, str]]:
+    """Limpeza da mensagem, extração e limpeza da descrição: `(item, mensagem_limpa, descricao_limpa)` por item"""
+    preparados = []
+    
+    for item in itens:
+        try:
+            logger.debug("Processando chamadoId: %s", item.get("chamadoId"))
+            
+            mensagem_limpa = metricas.executar_etapa("limpar_mensagem", limpar_mensagem, item.get("mensagem", ""))
+            descricao = metricas.executar_etapa("extrair_descricao", extrair_descricao, mensagem_limpa)
+            descricao_limpa = metricas.executar_etapa("limpar_descricao", limpar_descricao, descricao) if descricao else ""
+            
+            preparados.append((item, mensagem_limpa, descricao_limpa))
+            
+        except Exception as e:
+            logger.error(f"Erro processando item {item.get('chamadoId')}: {str(e)}")
+            metricas.contar("itens", "erro")
+            continue
+
+    return preparados
+
+
+def anonimizar_preparados(preparados: List[Tuple[Dict, str, str]]) -> List[Dict]:
+    """Anonimiza as descrições de `preparar_lote` e monta os resultados de `processar_lote`"""
+    if not preparados:
+        return []
+
+    # Anonimiza todas as descrições do lote de uma só vez
+    descricoes = [descricao_limpa for _, _, descricao_limpa in preparados]
+    with metricas.medir("anonimizar_lote"):
+        descricoes_anonimizadas = Anonimizador().anonimizar_lote(descricoes)
+
+    for descricao, anonimizada in zip(descricoes, descricoes_anonimizadas):
+        metricas.observar_bytes("anonimizar_lote", descricao, anonimizada)
+        metricas.observar_entidades(anonimizada)
+
+    resultados = []
+    for (item, mensagem_limpa, _), descricao_limpa in zip(preparados, descricoes_anonimizadas):
+        anterior = item.get("anterior")
+        # Só uma descrição diferente (ou ainda sem previsão) precisa voltar ao /prever
+        precisa_previsao = not (
+            anterior
+            and anterior.get("tem_previsao")
+            and anterior.get("descricao_dataset") == descricao_limpa
+        )
+        resultados.append({
+            "chamadoId": item.get("chamadoId"),
+            "mensagem_limpa": mensagem_limpa,
+            "descricao_dataset": descricao_limpa,
+            "hashMensagem": item.get("hashMensagem") or hash_mensagem(item.get("mensagem")),
+            "precisa_previsao": precisa_previsao
+        })
+    return resultados
+
+
+def _executar_no_worker(funcao: Callable, *args) -> Tuple[Any, list]:
+    """Executa `funcao` em um processo do pool, devolvendo também as métricas coletadas"""
+    with metricas.coletar() as observacoes:
+        resultado = funcao(*args)
+    return resultado, observacoes
+
+
+def _processar_lote_no_worker(itens: List[Dict]) -> Tuple[List[Dict], list]:
+    """Executa `processar_lote` em um processo do pool, devolvendo também as métricas coletadas"""
+    return _executar_no_worker(processar_lote, itens)
+
+
+def executar_cpu(funcao: Callable, *args):
+    """`funcao(*args)` em um processo do pool no modo "processos"; na thread que chamou no modo "local" """
+    if MODO_EXECUCAO != "processos":
+        return funcao(*args)
+    return _com_metricas(obter_pool().submit(_executar_no_worker, funcao, *args).result())
+
+
+def agrupar(itens: Iterable, tamanho: int) -> Iterator[List]:
+    """Agrupa um iterável em listas de até `tamanho` elementos, sem materializá-lo"""
+    iterador = iter(itens)
+    while True:
+        grupo = list(islice(iterador, tamanho))
+        if not grupo:
+            return
+        yield grupo
+
+
+def iterar_pendentes(db, ids: List[str], reenviar: Optional[Callable[[Dict], None]] = None) -> Iterator[Dict]:
+    """Percorre as interações que precisam ser (re)processadas, consultando os IDs em fatias de LOTE_CONSULTA.
+
+    Uma interação é pulada quando o documento processado tem o mesmo hash da
+    mensagem e a mesma VERSAO_PIPELINE. Se, além disso, ainda não tiver
+    previsão, `reenviar` recebe `{"chamadoId", "descricao"}` para que só o envio
+    ao /prever seja refeito. As demais são devolvidas com `chamadoId`,
+    `mensagem`, `hashMensagem` e `anterior` (estado gravado, se houver).
+    """
+    for fatia in agrupar(ids, LOTE_CONSULTA):
+        with metricas.medir("consulta_processados"):
+            processados = obter_processados(db, fatia)
+
+        cursor = db["interacoes"].find(
+            {"chamadoId": {"$in": fatia}},
+            {"_id": 0, "chamadoId": 1, "mensagem": 1}
+        ).batch_size(CURSOR_BATCH_SIZE)
+
+        atualizados = 0
+        reenviados = 0
+        # Quase todo `next` é local; os picos são as idas ao banco a cada CURSOR_BATCH_SIZE documentos
+        for item in metricas.medir_iterador("consulta_interacoes", cursor):
+            item["hashMensagem"] = hash_mensagem(item.get("mensagem"))
+            anterior = processados.get(item["chamadoId"])
+
+            if (anterior and anterior.get("hashMensagem") == item["hashMensagem"]
+                    and anterior.get("versaoPipeline") == VERSAO_PIPELINE):
+                if anterior["tem_previsao"]:
+                    atualizados += 1
+                elif reenviar:
+                    reenviados += 1
+                    reenviar({"chamadoId": item["chamadoId"], "descricao": anterior.get("descricao_dataset", "")})
+                continue
+
+            item["anterior"] = anterior
+            yield item
+
+        if atualizados or reenviados:
+            logger.info(
+                "%d chamados já estão atualizados e %d só serão reenviados para previsão.", atualizados, reenviados
+            )
+            metricas.contar("itens", "ja_processado", atualizados)
+            metricas.contar("itens", "apenas_reenviado", reenviados)
+
+
+async def processar_lote_async(itens: List[Dict]) -> List[Dict]:
+    """`processar_lote` fora do event loop: no pool de processos ou em uma thread, conforme MODO_EXECUCAO"""
+    if MODO_EXECUCAO == "processos":
+        resultado = await asyncio.get_running_loop().run_in_executor(obter_pool(), _processar_lote_no_worker, itens)
+        return _com_metricas(resultado)
+    return await asyncio.to_thread(processar_lote, itens)
+
+
+async def buscar_interacoes_async(db, ids: List[str]) -> Dict[str, Dict]:
+    """Mensagem de cada chamadoId encontrado, com uma única consulta pelo Motor"""
+    with metricas.medir("consulta_interacoes"):
+        cursor = db["interacoes"].find({"chamadoId": {"$in": ids}}, {"_id": 0, "chamadoId": 1, "mensagem": 1})
+        return {doc["chamadoId"]: doc async for doc in cursor}
+
+
+def executar_em_janela(pool: Executor, funcao: Callable, lotes: Iterable, janela: int) -> Iterator:
+    """Submete `funcao(lote)` ao pool com no máximo `janela` lotes em voo, devolvendo na ordem de entrada"""
+    em_voo = deque()
+    for lote in lotes:
+        em_voo.append(pool.submit(funcao, lote))
+        if len(em_voo) >= janela:
+            yield em_voo.popleft().result()
+
+    while em_voo:
+        yield em_voo.popleft().result()
+
+
+def _com_metricas(resultado: Tuple[Any, list]):
+    resultados, observacoes = resultado
+    metricas.reproduzir(observacoes)
+    return resultados
+
+
+def obter_processados(db, ids: List[str]) -> Dict[str, Dict]:
+    """Estado já gravado de cada chamadoId, obtido com uma única consulta"""
+    cursor = db["interacoes_processadas"].find(
+        {"chamadoId": {"$in": ids}},
+        {"_id": 0, "chamadoId": 1, "hashMensagem": 1, "versaoPipeline": 1, "descricao_dataset": 1,
+         **{campo: 1 for campo in CAMPOS_PREVISAO}}
+    )
+    return {
+        doc["chamadoId"]: {
+            "hashMensagem": doc.get("hashMensagem"),
+            "versaoPipeline": doc.get("versaoPipeline"),
+            "descricao_dataset": doc.get("descricao_dataset"),
+            "tem_previsao": all(doc.get(campo) for campo in CAMPOS_PREVISAO)
+        }
+        for doc in cursor
+    }
+
+
+def _operacao_salvar(resultado: Dict) -> UpdateOne:
+    atualizacao = {"$set": {
+        "mensagem_limpa": resultado["mensagem_limpa"],
+        "descricao_dataset": resultado["descricao_dataset"],
+        "hashMensagem": resultado["hashMensagem"],
+        "versaoPipeline": VERSAO_PIPELINE
+    }}
+    if resultado.get("precisa_previsao", True):
+        # A previsão anterior era de outra descrição; o /prever grava a nova
+        atualizacao["$unset"] = {campo: "" for campo in CAMPOS_PREVISAO}
+    return UpdateOne({"chamadoId": resultado["chamadoId"]}, atualizacao, upsert=True)
+
+
+def _upserts_repetir(erro: BulkWriteError, operacoes: List[UpdateOne]) -> List[UpdateOne]:
+    """Upserts que perderam a corrida para outro processo no índice único de chamadoId.
+
+    Repetidos, encontram o documento que o outro processo inseriu e viram updates.
+    Outros erros são repassados.
+    """
+    erros = erro.details.get("writeErrors", [])
+    if not erros or any(e.get("code") != 11000 for e in erros):
+        raise erro
+    return [operacoes[e["index"]] for e in erros]
+
+
+def salvar_resultados(db, resultados: List[Dict]):
+    """Persiste os resultados com bulk_write não ordenado, em lotes de LOTE_ESCRITA operações"""
+    with metricas.medir("gravacao_mongo"):
+        for inicio in range(0, len(resultados), LOTE_ESCRITA):
+            operacoes = [
+                _operacao_salvar(resultado)
+                for resultado in resultados[inicio:inicio + LOTE_ESCRITA]
+            ]
+            try:
+                db["interacoes_processadas"].bulk_write(operacoes, ordered=False)
+            except BulkWriteError as e:
+                db["interacoes_processadas"].bulk_write(_upserts_repetir(e, operacoes), ordered=False)
+
+
+async def salvar_resultados_async(db, resultados: List[Dict]):
+    """`salvar_resultados` com um banco do Motor (`database.get_db_async`)"""
+    with metricas.medir("gravacao_mongo"):
+        for inicio in range(0, len(resultados), LOTE_ESCRITA):
+            operacoes = [
+                _operacao_salvar(resultado)
+                for resultado in resultados[inicio:inicio + LOTE_ESCRITA]
+            ]
+            try:
+                await db["interacoes_processadas"].bulk_write(operacoes, ordered=False)
+            except BulkWriteError as e:
+                await db["interacoes_processadas"].bulk_write(_upserts_repetir(e, operacoes), ordered=False)
@@ -0,0 +1,259 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+from modules.shared import metricas
+from modules.shared.batimento import Batimento
+from modules.shared.database import get_db
+from modules.shared.estagios import Interrompido
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# "desligado" mantém só o processamento por /process; "change_stream" exige replica set;
+# "polling" consulta novos _id periodicamente; "auto" tenta o change stream e cai para o polling.
+MODO = os.getenv("INGESTAO_MODO", "desligado").lower()
+LOTE = int(os.getenv("INGESTAO_LOTE", "200"))
+# Tempo máximo que um micro-lote espera para encher antes de ser processado
+ESPERA_S = float(os.getenv("INGESTAO_ESPERA_S", "2"))
+PAUSA_MAX_S = float(os.getenv("INGESTAO_PAUSA_MAX_S", "60"))
+# Só o processo com o lease acompanha as interações (um entre os workers do gunicorn e as réplicas);
+# ele é renovado a cada LEASE_S / 3 e os demais assumem quando expira
+LEASE_S = float(os.getenv("INGESTAO_LEASE_S", "30"))
+
+COLECAO_ESTADO = "ingestao_estado"
+ID_ESTADO = "interacoes"
+
+# Códigos do servidor quando não há change stream (standalone) ou o token saiu do oplog
+_SEM_CHANGE_STREAM = {40573}
+_HISTORICO_PERDIDO = {280, 286}
+
+# Inserções e edições da mensagem; a projeção mantém o _id do evento, que é o resume token
+PIPELINE_EVENTOS = [
+    {"$match": {"$or": [
+        {"operationType": {"$in": ["insert", "replace"]}},
+        {"operationType": "update", "updateDescription.updatedFields.mensagem": {"$exists": True}}
+    ]}},
+    {"$project": {"operationType": 1, "fullDocument.chamadoId": 1}}
+]
+
+
+def carregar_estado() -> Dict:
+    """Posição salva da ingestão: `resumeToken` (change stream) e `ultimoId` (polling)"""
+    return get_db()[COLECAO_ESTADO].find_one({"_id": ID_ESTADO}) or {}
+
+
+def reivindicar_lease(dono: str) -> bool:
+    """Assume ou renova o lease da ingestão; False se outro processo o detém"""
+    agora = datetime.now(timezone.utc)
+    try:
+        # Sem documento que case o filtro o upsert tenta inserir o mesmo _id e falha
+        get_db()[COLECAO_ESTADO].update_one(
+            {"_id": ID_ESTADO, "$or": [
+                {"lease": None}, {"lease.dono": dono}, {"lease.expiraEm": {"$lt": agora}}
+            ]},
+            {"$set": {"lease": {"dono": dono, "expiraEm": agora + timedelta(seconds=LEASE_S)}}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def liberar_lease(dono: str):
+    get_db()[COLECAO_ESTADO].update_one({"_id": ID_ESTADO, "lease.dono": dono}, {"$set": {"lease": None}})
+
+
+def salvar_estado(**campos):
+    get_db()[COLECAO_ESTADO].update_one(
+        {"_id": ID_ESTADO},
+        {"$set": {**campos, "atualizadoEm": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+class IngestaoContinua:
+    """Acompanha novas interações e as processa em micro-lotes com `processar(ids)`.
+
+    `processar` deve retornar o resumo de `processar_e_obter_descricoes`. A
+    posição (resume token ou último _id) só é gravada depois que o micro-lote
+    foi persistido e enviado ao /prever, então uma queda reprocessa no máximo o
+    último micro-lote. Se o /prever falhar, o mesmo micro-lote é repetido com
+    pausa crescente até PAUSA_MAX_S, e nada novo é lido enquanto isso: o
+    atraso se propaga até o change stream/consulta em vez de acumular em memória.
+    Entre vários processos só o que detém o lease (renovado por um Batimento,
+    sem depender do progresso) acompanha as interações; os demais esperam.
+    """
+
+    def __init__(self, processar: Callable[[List[str]], Dict], modo: str = None):
+        self.processar = processar
+        self.modo = (modo or MODO).lower()
+        self.dono: Optional[str] = None
+        self._parar = threading.Event()
+        self._lider = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._batimento: Optional[Batimento] = None
+
+    @property
+    def ativo(self) -> bool:
+        return self.modo != "desligado"
+
+    def iniciar(self):
+        if not self.ativo:
+            return
+        # Calculado aqui, já no worker: com o preload do gunicorn o objeto é criado no mestre
+        self.dono = f"{socket.gethostname()}:{os.getpid()}"
+        self._batimento = Batimento(self._renovar_lease, LEASE_S / 3, nome="ingestao-lease")
+        self._batimento.iniciar()
+        self._thread = threading.Thread(target=self._executar, name="ingestao-continua", daemon=True)
+        self._thread.start()
+
+    def solicitar_parada(self):
+        """Não inicia novos micro-lotes; o que estiver em andamento termina ou é interrompido pelo grafo"""
+        self._parar.set()
+
+    def parar(self, timeout: float = None):
+        self.solicitar_parada()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._batimento:
+            self._batimento.parar()
+        if self._lider.is_set() and not (self._thread and self._thread.is_alive()):
+            # Outro processo assume sem esperar o lease expirar
+            try:
+                liberar_lease(self.dono)
+            except PyMongoError as e:
+                logger.warning(f"Falha ao liberar o lease da ingestão: {str(e)}")
+            self._lider.clear()
+
+    def _renovar_lease(self):
+        try:
+            lider = reivindicar_lease(self.dono)
+        except PyMongoError:
+            # Sem confirmar a renovação o lease pode expirar e ser assumido por outro processo
+            self._lider.clear()
+            raise
+        if lider and not self._lider.is_set():
+            logger.info(f"Ingestão contínua assumida por {self.dono}.")
+            self._lider.set()
+        elif not lider and self._lider.is_set():
+            logger.warning("Lease da ingestão contínua perdido para outro processo.")
+            self._lider.clear()
+
+    def _ativo(self) -> bool:
+        return self._lider.is_set() and not self._parar.is_set()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            if not self._lider.wait(ESPERA_S):
+                continue
+            try:
+                if self.modo in ("change_stream", "auto"):
+                    try:
+                        self._acompanhar_change_stream()
+                    except OperationFailure as e:
+                        if self.modo != "auto" or e.code not in _SEM_CHANGE_STREAM:
+                            raise
+                        logger.warning("Change stream indisponível (servidor sem replica set). Usando polling.")
+                        self.modo = "polling"
+                else:
+                    self._acompanhar_polling()
+            except Interrompido:
+                # A posição só é gravada depois do micro-lote, então ele é reprocessado no próximo início
+                logger.info("Micro-lote da ingestão interrompido pelo desligamento.")
+            except Exception as e:
+                logger.error(f"Erro na ingestão contínua: {str(e)}. Reiniciando em {ESPERA_S}s.")
+                self._parar.wait(ESPERA_S)
+
+    def _processar_micro_lote(self, ids: List[str]) -> bool:
+        """Processa o micro-lote até que tudo tenha sido enviado ao /prever; False se foi interrompido"""
+        pausa = ESPERA_S
+        while self._ativo():
+            with metricas.medir("ingestao_micro_lote"):
+                resumo = self.processar(ids) or {}
+            if not resumo.get("falhas_previsao"):
+                metricas.contar("itens", "ingerido", len(ids))
+                return True
+            logger.warning(
+                f"{resumo['falhas_previsao']} chamados do micro-lote não chegaram ao /prever. "
+                f"Nova tentativa em {pausa:.0f}s."
+            )
+            self._parar.wait(pausa)
+            pausa = min(pausa * 2, PAUSA_MAX_S)
+        return False
+
+    def _acompanhar_change_stream(self):
+        colecao = get_db()["interacoes"]
+        token = carregar_estado().get("resumeToken")
+        try:
+            stream = colecao.watch(
+                PIPELINE_EVENTOS,
+                full_document="updateLookup",
+                resume_after=token,
+                max_await_time_ms=int(ESPERA_S * 1000),
+                batch_size=LOTE
+            )
+        except OperationFailure as e:
+            if token is None or e.code not in _HISTORICO_PERDIDO:
+                raise
+            logger.critical("Resume token fora do oplog; eventos perdidos. Recomeçando do momento atual.")
+            salvar_estado(resumeToken=None)
+            stream = colecao.watch(
+                PIPELINE_EVENTOS, full_document="updateLookup",
+                max_await_time_ms=int(ESPERA_S * 1000), batch_size=LOTE
+            )
+
+        logger.info(f"Ingestão contínua via change stream iniciada{' (retomada)' if token else ''}.")
+        with stream:
+            while self._ativo():
+                ids = []
+                limite = time.monotonic() + ESPERA_S
+                while len(ids) < LOTE and time.monotonic() < limite and self._ativo():
+                    evento = stream.try_next()
+                    chamado_id = ((evento or {}).get("fullDocument") or {}).get("chamadoId")
+                    if chamado_id is not None:
+                        ids.append(chamado_id)
+
+                if ids and not self._processar_micro_lote(list(dict.fromkeys(ids))):
+                    return
+                if stream.resume_token and stream.resume_token != token:
+                    token = stream.resume_token
+                    salvar_estado(resumeToken=token)
+
+    def _acompanhar_polling(self):
+        colecao = get_db()["interacoes"]
+        ultimo_id = carregar_estado().get("ultimoId")
+        if ultimo_id is None:
+            # Sem posição salva começa do momento atual, como o change stream
+            ultimo_id = ObjectId.from_datetime(datetime.now(timezone.utc))
+            salvar_estado(ultimoId=ultimo_id)
+
+        logger.info("Ingestão contínua via polling iniciada.")
+        while self._ativo():
+            try:
+                documentos = list(
+                    colecao.find({"_id": {"$gt": ultimo_id}}, {"_id": 1, "chamadoId": 1})
+                    .sort("_id", 1)
+                    .limit(LOTE)
+                )
+            except PyMongoError as e:
+                logger.error(f"Erro ao consultar novas interações: {str(e)}")
+                self._parar.wait(ESPERA_S)
+                continue
+
+            if not documentos:
+                self._parar.wait(ESPERA_S)
+                continue
+
+            ids = list(dict.fromkeys(doc["chamadoId"] for doc in documentos if doc.get("chamadoId") is not None))
+            if ids and not self._processar_micro_lote(ids):
+                return
+            ultimo_id = documentos[-1]["_id"]
+            salvar_estado(ultimoId=ultimo_id)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from modules.jobs.service import cancelar_job_async, obter_job_async
+from modules.shared.logger import obter_logger
+
+logger = obter_logger(__name__)
+
+router = APIRouter(prefix="/api/v1/jobs")
+
+@router.get("/{job_id}")
+async def status_job(job_id: str):
+    """Retorna o progresso e a vazão de um job"""
+    job = await obter_job_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado.")
+    return {"status": "success", "job": job}
+
+@router.delete("/{job_id}")
+async def cancelar(job_id: str):
+    """Cancela um job pendente ou em execução"""
+    if not await cancelar_job_async(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} não existe ou já foi finalizado.")
+    logger.info(f"Cancelamento solicitado para o job {job_id}.")
+    return {"status": "success", "message": f"Job {job_id} cancelado."}
@@ -0,0 +1,449 @@
+import os
+import random
+import socket
+import threading
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+from modules.shared import metricas
+from modules.shared.batimento import Batimento
+from modules.shared.database import get_db, get_db_async
+from modules.shared.estagios import Interrompido
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+LEASE_S = int(os.getenv("JOBS_LEASE_S", "300"))
+INTERVALO_CONSULTA_S = float(os.getenv("JOBS_INTERVALO_CONSULTA_S", "2"))
+
+def identificar_dono() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Identifica este processo como dono dos jobs que ele reivindicar; recalculado após o fork (servidor.apos_fork)
+DONO = identificar_dono()
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+CANCELADO = "cancelado"
+FALHOU = "falhou"
+
+# Status dos itens, além de PENDENTE
+PROCESSADO = "processado"
+IGNORADO = "ignorado"
+ERRO = "erro"
+
+
+class JobCancelado(Exception):
+    """Interrompe a execução de um job cancelado pelo usuário"""
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def garantir_indices_jobs():
+    """Cria os índices usados na fila de jobs"""
+    db = get_db()
+    db["jobs"].create_index([("status", 1), ("lease.expiraEm", 1)])
+    db["jobs_itens"].create_index([("jobId", 1), ("status", 1)])
+    # Um chamadoId só pode estar ativo (pendente) em um job por vez
+    db["jobs_itens"].create_index(
+        "chamadoId",
+        unique=True,
+        partialFilterExpression={"ativo": True},
+        name="chamadoId_ativo_unico"
+    )
+
+
+def _itens_job(job_id: str, ids: List[str]) -> List[Dict]:
+    return [
+        {"jobId": job_id, "chamadoId": chamado_id, "status": PENDENTE, "ativo": True}
+        for chamado_id in ids
+    ]
+
+
+def _duplicados(erro: BulkWriteError, itens: List[Dict]) -> List[str]:
+    """chamadoIds recusados pelo índice de item ativo único; outros erros são repassados"""
+    erros = erro.details.get("writeErrors", [])
+    if any(e.get("code") != 11000 for e in erros):
+        raise erro
+    return [itens[e["index"]]["chamadoId"] for e in erros]
+
+
+def _documento_job(job_id: str, total: int, duplicados: List[str], perfilar: bool) -> Dict:
+    agora = _agora()
+    return {
+        "_id": job_id,
+        "status": PENDENTE if total else CONCLUIDO,
+        "total": total,
+        "processados": 0,
+        "ignorados": 0,
+        "falhas": 0,
+        "duplicados": len(duplicados),
+        "perfilar": perfilar,
+        "criadoEm": agora,
+        "atualizadoEm": agora,
+        "lease": None
+    }
+
+
+def _job_criado(job_id: str, total: int, duplicados: List[str]) -> Dict:
+    if duplicados:
+        logger.info(f"Job {job_id}: {len(duplicados)} IDs já estão em outro job e foram ignorados.")
+    return {"jobId": job_id, "total": total, "duplicados": duplicados}
+
+
+def criar_job(ids: List[str], perfilar: bool = False) -> Dict:
+    """Enfileira um job com os IDs que ainda não estão pendentes em outro job.
+
+    Com `perfilar` a execução do job roda sob o cProfile (ver `metricas.perfilar`).
+    """
+    db = get_db()
+    job_id = uuid.uuid4().hex
+    ids_unicos = list(dict.fromkeys(ids))
+
+    itens = _itens_job(job_id, ids_unicos)
+    duplicados = []
+    if itens:
+        try:
+            db["jobs_itens"].insert_many(itens, ordered=False)
+        except BulkWriteError as e:
+            duplicados = _duplicados(e, itens)
+
+    total = len(ids_unicos) - len(duplicados)
+    db["jobs"].insert_one(_documento_job(job_id, total, duplicados, perfilar))
+    return _job_criado(job_id, total, duplicados)
+
+
+async def criar_job_async(ids: List[str], perfilar: bool = False) -> Dict:
+    """`criar_job` pelo Motor, para os handlers da API"""
+    db = get_db_async()
+    job_id = uuid.uuid4().hex
+    ids_unicos = list(dict.fromkeys(ids))
+
+    itens = _itens_job(job_id, ids_unicos)
+    duplicados = []
+    if itens:
+        try:
+            await db["jobs_itens"].insert_many(itens, ordered=False)
+        except BulkWriteError as e:
+            duplicados = _duplicados(e, itens)
+
+    total = len(ids_unicos) - len(duplicados)
+    await db["jobs"].insert_one(_documento_job(job_id, total, duplicados, perfilar))
+    return _job_criado(job_id, total, duplicados)
+
+
+def reivindicar_job() -> Optional[Dict]:
+    """Reivindica o próximo job pendente ou cujo lease expirou (dono anterior caiu)"""
+    agora = _agora()
+    return get_db()["jobs"].find_one_and_update(
+        {
+            "status": {"$in": [PENDENTE, EXECUTANDO]},
+            "$or": [{"lease": None}, {"lease.expiraEm": {"$lt": agora}}]
+        },
+        {
+            "$set": {
+                "status": EXECUTANDO,
+                "lease": {"dono": DONO, "expiraEm": agora + timedelta(seconds=LEASE_S)},
+                "atualizadoEm": agora
+            },
+            "$min": {"iniciadoEm": agora}
+        },
+        sort=[("criadoEm", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def ids_pendentes(job_id: str) -> List[str]:
+    """chamadoIds do job que ainda não foram concluídos"""
+    cursor = get_db()["jobs_itens"].find(
+        {"jobId": job_id, "status": PENDENTE},
+        {"_id": 0, "chamadoId": 1}
+    )
+    return [doc["chamadoId"] for doc in cursor]
+
+
+def renovar_lease(job_id: str) -> bool:
+    """Estende o lease do job enquanto este processo o executa; False se o lease passou a outro dono"""
+    agora = _agora()
+    resultado = get_db()["jobs"].update_one(
+        {"_id": job_id, "lease.dono": DONO},
+        {"$set": {"lease.expiraEm": agora + timedelta(seconds=LEASE_S)}}
+    )
+    return resultado.matched_count > 0
+
+
+def registrar_progresso(job_id: str, chamado_ids: List[str]):
+    """Marca os IDs como processados e interrompe se o job foi cancelado ou reivindicado por outro processo"""
+    db = get_db()
+    agora = _agora()
+    if chamado_ids:
+        db["jobs_itens"].update_many(
+            {"jobId": job_id, "chamadoId": {"$in": chamado_ids}},
+            {"$set": {"status": PROCESSADO, "atualizadoEm": agora}, "$unset": {"ativo": ""}}
+        )
+
+    job = db["jobs"].find_one_and_update(
+        {"_id": job_id, "lease.dono": DONO},
+        {
+            "$inc": {"processados": len(chamado_ids)},
+            "$set": {"atualizadoEm": agora}
+        },
+        projection={"status": 1}
+    )
+    if job is None or job["status"] == CANCELADO:
+        raise JobCancelado(job_id)
+
+
+def registrar_falhas(job_id: str, chamado_ids: List[str], motivo: str):
+    """Marca os IDs como erro, com o motivo; eles deixam de estar pendentes e não são refeitos na retomada"""
+    db = get_db()
+    agora = _agora()
+    falhas = db["jobs_itens"].update_many(
+        {"jobId": job_id, "chamadoId": {"$in": chamado_ids}, "status": PENDENTE},
+        {"$set": {"status": ERRO, "erro": motivo, "atualizadoEm": agora}, "$unset": {"ativo": ""}}
+    ).modified_count
+    db["jobs"].update_one({"_id": job_id}, {"$inc": {"falhas": falhas}, "$set": {"atualizadoEm": agora}})
+
+
+def liberar_lease(job_id: str):
+    """Devolve o job à fila sem esperar o lease expirar; os itens pendentes continuam pendentes"""
+    get_db()["jobs"].update_one(
+        {"_id": job_id, "lease.dono": DONO},
+        {"$set": {"lease": None, "atualizadoEm": _agora()}}
+    )
+
+
+def _filtro_pendentes(job_id: str) -> Dict:
+    return {"jobId": job_id, "status": PENDENTE}
+
+
+def _encerramento_itens(status: str, agora: datetime) -> Dict:
+    return {"$set": {"status": IGNORADO if status == CONCLUIDO else status, "atualizadoEm": agora},
+            "$unset": {"ativo": ""}}
+
+
+def _encerramento_job(job_id: str, status: str, ignorados: int, agora: datetime):
+    """Filtro e atualização do documento do job ao encerrá-lo"""
+    filtro = {"_id": job_id}
+    if status != CANCELADO:
+        filtro["status"] = {"$ne": CANCELADO}
+    atualizacao = {
+        "$set": {"status": status, "lease": None, "atualizadoEm": agora, "concluidoEm": agora},
+        "$inc": {"ignorados": ignorados if status == CONCLUIDO else 0}
+    }
+    return filtro, atualizacao
+
+
+def finalizar_job(job_id: str, status: str):
+    """Encerra o job; itens ainda pendentes (já processados antes ou ausentes) ficam como ignorados.
+
+    Itens que falharam já saíram de pendente com status ERRO, em `registrar_falhas`.
+    """
+    db = get_db()
+    agora = _agora()
+    ignorados = db["jobs_itens"].update_many(
+        _filtro_pendentes(job_id), _encerramento_itens(status, agora)
+    ).modified_count
+    db["jobs"].update_one(*_encerramento_job(job_id, status, ignorados, agora))
+
+
+async def finalizar_job_async(job_id: str, status: str):
+    db = get_db_async()
+    agora = _agora()
+    resultado = await db["jobs_itens"].update_many(
+        _filtro_pendentes(job_id), _encerramento_itens(status, agora)
+    )
+    await db["jobs"].update_one(*_encerramento_job(job_id, status, resultado.modified_count, agora))
+
+
+def _cancelamento(job_id: str):
+    return (
+        {"_id": job_id, "status": {"$in": [PENDENTE, EXECUTANDO]}},
+        {"$set": {"status": CANCELADO, "atualizadoEm": _agora()}}
+    )
+
+
+def cancelar_job(job_id: str) -> bool:
+    """Solicita o cancelamento; o executor para no próximo registro de progresso"""
+    resultado = get_db()["jobs"].update_one(*_cancelamento(job_id))
+    if resultado.modified_count:
+        finalizar_job(job_id, CANCELADO)
+    return bool(resultado.modified_count)
+
+
+async def cancelar_job_async(job_id: str) -> bool:
+    resultado = await get_db_async()["jobs"].update_one(*_cancelamento(job_id))
+    if resultado.modified_count:
+        await finalizar_job_async(job_id, CANCELADO)
+    return bool(resultado.modified_count)
+
+
+def _pipeline_por_status(job_id: str) -> List[Dict]:
+    return [
+        {"$match": {"jobId": job_id}},
+        {"$group": {"_id": "$status", "quantidade": {"$sum": 1}}}
+    ]
+
+
+def _resumo_job(job: Dict, por_status: Dict) -> Dict:
+    """Estado do job com progresso e vazão"""
+    vazao = None
+    if job.get("iniciadoEm") and job["processados"]:
+        fim = job.get("concluidoEm") or _agora()
+        inicio = job["iniciadoEm"]
+        if inicio.tzinfo is None:
+            inicio = inicio.replace(tzinfo=timezone.utc)
+        if fim.tzinfo is None:
+            fim = fim.replace(tzinfo=timezone.utc)
+        segundos = (fim - inicio).total_seconds()
+        vazao = job["processados"] / segundos if segundos > 0 else None
+
+    return {
+        "jobId": job["_id"],
+        "status": job["status"],
+        "total": job["total"],
+        "processados": job["processados"],
+        "ignorados": job.get("ignorados", 0),
+        "falhas": job.get("falhas", 0),
+        "duplicados": job.get("duplicados", 0),
+        "itens_por_status": por_status,
+        "progresso": (
+            (job["processados"] + job.get("ignorados", 0) + job.get("falhas", 0)) / job["total"]
+            if job["total"] else 1.0
+        ),
+        "itens_por_segundo": vazao,
+        "criadoEm": job["criadoEm"],
+        "iniciadoEm": job.get("iniciadoEm"),
+        "concluidoEm": job.get("concluidoEm"),
+        "dono": (job.get("lease") or {}).get("dono"),
+        "perfil": job.get("perfil")
+    }
+
+
+def obter_job(job_id: str) -> Optional[Dict]:
+    """Retorna o estado do job com progresso e vazão"""
+    db = get_db()
+    job = db["jobs"].find_one({"_id": job_id})
+    if not job:
+        return None
+    por_status = {
+        doc["_id"]: doc["quantidade"]
+        for doc in db["jobs_itens"].aggregate(_pipeline_por_status(job_id))
+    }
+    return _resumo_job(job, por_status)
+
+
+async def obter_job_async(job_id: str) -> Optional[Dict]:
+    db = get_db_async()
+    job = await db["jobs"].find_one({"_id": job_id})
+    if not job:
+        return None
+    por_status = {
+        doc["_id"]: doc["quantidade"]
+        async for doc in db["jobs_itens"].aggregate(_pipeline_por_status(job_id))
+    }
+    return _resumo_job(job, por_status)
+
+
+def executar_job(job: Dict, processar):
+    """Executa um job reivindicado com a função `processar(ids, ao_salvar, ao_falhar, parar)`.
+
+    `ao_salvar(chamado_ids)` e `ao_falhar(chamado_ids, motivo)` registram o
+    andamento de cada lote; `parar` é um Event marcado quando o lease passa a
+    outro processo, e `processar` deve então parar de ler a entrada e lançar
+    `estagios.Interrompido`.
+    """
+    job_id = job["_id"]
+    ids = ids_pendentes(job_id)
+    logger.info(f"Executando job {job_id} com {len(ids)} IDs pendentes.")
+
+    perfilar = job.get("perfilar") or random.random() < metricas.PERFIL_AMOSTRAGEM
+    if perfilar:
+        get_db()["jobs"].update_one(
+            {"_id": job_id}, {"$set": {"perfil": os.path.join(metricas.PERFIL_DIR, f"job_{job_id}.prof")}}
+        )
+
+    lease_perdido = threading.Event()
+
+    def renovar():
+        # O lease é renovado pelo tempo, não pelo progresso: um lote lento não o deixa expirar
+        if not renovar_lease(job_id) and not lease_perdido.is_set():
+            logger.warning(f"Lease do job {job_id} assumido por outro processo. Interrompendo.")
+            lease_perdido.set()
+
+    batimento = Batimento(renovar, LEASE_S / 3, f"lease-job-{job_id}")
+    try:
+        with batimento, metricas.perfilar(f"job_{job_id}") if perfilar else nullcontext():
+            processar(
+                ids,
+                ao_salvar=lambda chamado_ids: registrar_progresso(job_id, chamado_ids),
+                ao_falhar=lambda chamado_ids, motivo: registrar_falhas(job_id, chamado_ids, motivo),
+                parar=lease_perdido
+            )
+    except JobCancelado:
+        logger.info(f"Job {job_id} cancelado ou reivindicado por outro processo. Interrompendo.")
+        return
+    except Interrompido:
+        if lease_perdido.is_set():
+            return
+        # Sem finalizar: os itens não processados continuam pendentes, e o lease é liberado
+        # para que outro processo retome o job sem esperar LEASE_S
+        logger.info(f"Job {job_id} interrompido pelo desligamento. Será retomado.")
+        try:
+            liberar_lease(job_id)
+        except PyMongoError as e:
+            logger.warning(f"Falha ao liberar o lease do job {job_id}: {str(e)}")
+        return
+    except Exception as e:
+        logger.error(f"Job {job_id} falhou: {str(e)}")
+        finalizar_job(job_id, FALHOU)
+        return
+
+    finalizar_job(job_id, CONCLUIDO)
+    logger.info(f"Job {job_id} concluído.")
+
+
+class ConsumidorJobs:
+    """Thread que reivindica e executa jobs da fila, incluindo os abandonados por processos que caíram"""
+
+    def __init__(self, processar):
+        self.processar = processar
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name="consumidor-jobs", daemon=True)
+        self._thread.start()
+
+    def solicitar_parada(self):
+        """Não reivindica novos jobs; o que estiver em execução termina ou é interrompido pelo grafo"""
+        self._parar.set()
+
+    def parar(self, timeout: float = None):
+        self.solicitar_parada()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                job = reivindicar_job()
+            except Exception as e:
+                logger.error(f"Erro ao consultar fila de jobs: {str(e)}")
+                job = None
+
+            if job is None:
+                self._parar.wait(INTERVALO_CONSULTA_S)
+                continue
+
+            executar_job(job, self.processar)
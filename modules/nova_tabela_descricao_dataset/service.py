@@ -1,10 +1,29 @@
 import re
-from typing import Optional
-from modules.shared.logger import logger
+from typing import TYPE_CHECKING, Optional
+from modules.shared.logger import obter_logger
+from modules.shared.regras_limpeza import ESPACO_RE2, aplicar_em_serie, remover_espacos_borda
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = obter_logger(__name__)
+
+# Padrões e limite da extração, que entram na versão do pipeline (ver `assinatura_extracao`).
+# Incremente VERSAO_EXTRACAO ao mudar a lógica de `extrair_descricao` sem mudar os padrões.
+VERSAO_EXTRACAO = 1
+PADRAO_TAREFA = r'Tarefa:\s*(.*?)(?=\n|$)'
+PADRAO_SAUDACAO = r'^(Bom dia|Boa tarde|Gentileza|Identificado|Olá|Ola|Prezados|Solicito|Prezado|Gostaria)'
+LIMITE_RESUMO = 200
+
+
+def assinatura_extracao() -> list:
+    """O que define a saída de `extrair_descricao`, para compor a versão do pipeline"""
+    return [VERSAO_EXTRACAO, PADRAO_TAREFA, PADRAO_SAUDACAO, LIMITE_RESUMO]
+
 
 def extrair_descricao(mensagem: Optional[str]) -> str:
     """Extrai a descrição formatada para o dataset"""
-    if not mensagem:
+    if not isinstance(mensagem, str) or not mensagem:
         return ""
     
     try:
@@ -12,23 +31,51 @@ def extrair_descricao(mensagem: Optional[str]) -> str:
         mensagem = ' '.join(mensagem.split())
         
         # 1. Tenta extrair conteúdo após "Tarefa:"
-        tarefa_match = re.search(r'Tarefa:\s*(.*?)(?=\n|$)', mensagem, re.IGNORECASE)
+        tarefa_match = re.search(PADRAO_TAREFA, mensagem, re.IGNORECASE)
         if tarefa_match:
             return tarefa_match.group(1).strip()
         
         # 2. Verifica padrões de início
-        padroes_inicio = [
-            r'^(Bom dia|Boa tarde|Gentileza|Identificado|Olá|Ola|Prezados|Solicito|Prezado|Gostaria)'
-        ]
-        
-        for padrao in padroes_inicio:
-            match = re.search(padrao, mensagem, re.IGNORECASE)
-            if match:
-                return mensagem.strip()
+        if re.search(PADRAO_SAUDACAO, mensagem, re.IGNORECASE):
+            return mensagem.strip()
                 
-        # 3. Se não encontrar padrões, retorna os primeiros 200 caracteres
-        return mensagem[:200].strip() + "..." if len(mensagem) > 200 else mensagem.strip()
+        # 3. Se não encontrar padrões, retorna os primeiros LIMITE_RESUMO caracteres
+        return mensagem[:LIMITE_RESUMO].strip() + "..." if len(mensagem) > LIMITE_RESUMO else mensagem.strip()
         
     except Exception as e:
         logger.error(f"Erro ao extrair descrição: {str(e)}")
-        return mensagem[:200].strip() if mensagem else ""
\ No newline at end of file
+        return mensagem[:LIMITE_RESUMO].strip() if mensagem else ""
+
+
+# Equivalentes RE2 das regex de `extrair_descricao`. Depois de juntar as
+# palavras o texto não tem quebras de linha, então o "até \\n ou o fim" do
+# `Tarefa:` é simplesmente o resto do texto.
+_ESPACOS_RE2 = f'{ESPACO_RE2}{{2,}}|' + ESPACO_RE2.replace('\\x{20}', '')  # o que não é um espaço simples
+_TAREFA_RE2 = f'(?i)Tarefa:{ESPACO_RE2}*(?P<tarefa>.*)'
+_SAUDACAO_RE2 = '(?i)' + PADRAO_SAUDACAO
+
+
+def _extrair_arrow(mensagens):
+    import pyarrow.compute as pc
+
+    mensagens = remover_espacos_borda(pc.replace_substring_regex(mensagens, _ESPACOS_RE2, ' '))
+    resumo = pc.binary_join_element_wise(
+        remover_espacos_borda(pc.utf8_slice_codeunits(mensagens, 0, LIMITE_RESUMO)), '...', ''
+    )
+    truncar = pc.and_not(
+        pc.greater(pc.utf8_length(mensagens), LIMITE_RESUMO),
+        pc.match_substring_regex(mensagens, _SAUDACAO_RE2)
+    )
+    descricoes = pc.if_else(truncar, resumo, mensagens)
+
+    # A extração só roda nas linhas que têm o marcador
+    com_tarefa = pc.fill_null(pc.match_substring(mensagens, 'Tarefa:', ignore_case=True), False)
+    if pc.any(com_tarefa).as_py():
+        tarefas = pc.extract_regex(pc.filter(mensagens, com_tarefa), _TAREFA_RE2)
+        descricoes = pc.replace_with_mask(descricoes, com_tarefa, pc.struct_field(tarefas, [0]))
+    return descricoes
+
+
+def extrair_serie(mensagens: "pd.Series") -> "pd.Series":
+    """Versão vetorizada de `extrair_descricao` para uma coluna inteira, com o mesmo resultado"""
+    return aplicar_em_serie(mensagens, _extrair_arrow, extrair_descricao)
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from modules.shared import metricas
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+PREVISAO_URL = os.getenv("PREVISAO_URL", "http://localhost:8080/prever")
+LOTE_TAMANHO = int(os.getenv("PREVISAO_LOTE_TAMANHO", "10"))
+MAX_EM_VOO = int(os.getenv("PREVISAO_MAX_EM_VOO", "4"))
+TENTATIVAS = int(os.getenv("PREVISAO_TENTATIVAS", "3"))
+BACKOFF_S = float(os.getenv("PREVISAO_BACKOFF_S", "1"))
+TIMEOUT_S = float(os.getenv("PREVISAO_TIMEOUT_S", "300"))
+
+_sessao: Optional[requests.Session] = None
+_sessao_lock = threading.Lock()
+
+
+def get_sessao() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada, mantendo as conexões com o /prever abertas"""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            _sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(MAX_EM_VOO, 1))
+            _sessao.mount("http://", adaptador)
+            _sessao.mount("https://", adaptador)
+            _sessao.headers.update({"Content-Type": "application/json"})
+    return _sessao
+
+
+def _pode_repetir(erro: Exception) -> bool:
+    """Só falhas de conexão e respostas 5xx são repetidas.
+
+    Um 4xx se repetiria igual, e depois de um ReadTimeout o /prever pode já ter
+    processado o lote, que seria classificado duas vezes.
+    """
+    if isinstance(erro, requests.exceptions.ReadTimeout):
+        return False
+    if isinstance(erro, requests.exceptions.ConnectionError):
+        return True
+    if isinstance(erro, requests.exceptions.HTTPError):
+        return erro.response is not None and erro.response.status_code >= 500
+    return False
+
+
+def enviar_lote(chamados: List[Dict], url: str = None, tentativas: int = None, backoff_s: float = None) -> bool:
+    """Envia um lote ao serviço de previsão, com novas tentativas e backoff exponencial para falhas transitórias"""
+    url = url or PREVISAO_URL
+    tentativas = TENTATIVAS if tentativas is None else tentativas
+    backoff_s = BACKOFF_S if backoff_s is None else backoff_s
+
+    for tentativa in range(1, tentativas + 1):
+        try:
+            with metricas.medir("previsao"):
+                response = get_sessao().post(url, json={"chamados": chamados}, timeout=TIMEOUT_S)
+                response.raise_for_status()
+            logger.debug("Lote de %d chamados enviado com sucesso! Resposta: %s", len(chamados), response.status_code)
+            metricas.contar("itens", "enviado_previsao", len(chamados))
+            return True
+        except Exception as e:
+            if tentativa == tentativas or not _pode_repetir(e):
+                logger.error(f"Erro ao enviar lote para Flask após {tentativa} tentativa(s): {str(e)}")
+                metricas.contar("itens", "falha_previsao", len(chamados))
+                return False
+            espera = backoff_s * 2 ** (tentativa - 1)
+            logger.warning(f"Falha ao enviar lote (tentativa {tentativa}/{tentativas}): {str(e)}. Nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+    return False
+
+
+class EnviadorPrevisao:
+    """Agrupa chamados em lotes e os envia ao /prever em segundo plano.
+
+    No máximo `max_em_voo` lotes ficam pendentes ao mesmo tempo; `adicionar`
+    bloqueia quando esse limite é atingido, aplicando contrapressão ao
+    pré-processamento. Lotes que falham após todas as tentativas ficam em
+    `falhas` para que o chamador possa registrá-los.
+    """
+
+    def __init__(self, url: str = None, lote_tamanho: int = None, max_em_voo: int = None):
+        self.url = url or PREVISAO_URL
+        self.lote_tamanho = lote_tamanho or LOTE_TAMANHO
+        self.max_em_voo = max_em_voo or MAX_EM_VOO
+        self.falhas: List[List[Dict]] = []
+        self.enviados = 0
+        self._buffer: List[Dict] = []
+        self._vagas = threading.BoundedSemaphore(self.max_em_voo)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_em_voo, thread_name_prefix="previsao")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finalizar()
+
+    def adicionar(self, chamado: Dict):
+        """Adiciona um chamado ao lote corrente, enviando-o quando estiver completo"""
+        self._buffer.append(chamado)
+        if len(self._buffer) >= self.lote_tamanho:
+            self._submeter()
+
+    def _submeter(self):
+        lote, self._buffer = self._buffer, []
+        self._vagas.acquire()
+        futuro: Future = self._executor.submit(enviar_lote, lote, self.url)
+        futuro.add_done_callback(lambda f, lote=lote: self._concluir(f, lote))
+
+    def _concluir(self, futuro: Future, lote: List[Dict]):
+        try:
+            sucesso = futuro.exception() is None and futuro.result()
+            with self._lock:
+                if sucesso:
+                    self.enviados += len(lote)
+                else:
+                    self.falhas.append(lote)
+        finally:
+            self._vagas.release()
+
+    def finalizar(self) -> Dict:
+        """Envia o lote parcial, aguarda os envios pendentes e retorna um resumo"""
+        if self._buffer:
+            self._submeter()
+        self._executor.shutdown(wait=True)
+
+        nao_enviados = [chamado["chamadoId"] for lote in self.falhas for chamado in lote]
+        if nao_enviados:
+            logger.error(f"{len(nao_enviados)} chamados não foram enviados para previsão: {nao_enviados}")
+
+        return {"enviados": self.enviados, "falhas": len(nao_enviados)}
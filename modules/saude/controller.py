@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from modules.saude.service import Prontidao
+
+router = APIRouter(prefix="/health")
+
+prontidao = Prontidao()
+
+@router.get("/live")
+def vivo():
+    """O processo está no ar; não consulta dependências"""
+    return {"status": "ok"}
+
+@router.get("/ready")
+def pronto():
+    """200 quando o modelo está carregado e o MongoDB responde, 503 caso contrário"""
+    estado = prontidao.estado()
+    return JSONResponse(
+        status_code=200 if estado["pronto"] else 503,
+        content={"status": "ok" if estado["pronto"] else "indisponivel", **estado}
+    )
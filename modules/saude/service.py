@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from modules.anonimo.service import Anonimizador
+from modules.shared import metricas
+from modules.shared.database import get_db
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# "segundo_plano" carrega o modelo em uma thread sem atrasar o início da API;
+# "sincrono" só libera a API depois do carregamento; "desligado" mantém o
+# carregamento sob demanda, no primeiro texto anonimizado.
+AQUECIMENTO = os.getenv("SAUDE_AQUECIMENTO", "segundo_plano").lower()
+# Validade do último ping ao MongoDB para o /health/ready
+INTERVALO_PING_S = float(os.getenv("SAUDE_INTERVALO_PING_S", "10"))
+
+
+class Prontidao:
+    """Aquecimento do Anonimizador e estado das dependências para as sondas de saúde.
+
+    O serviço está pronto quando o MongoDB responde ao ping e, com o
+    aquecimento ligado, o modelo já foi carregado. O ping é refeito no máximo
+    a cada INTERVALO_PING_S para que as sondas não sobrecarreguem o banco.
+    """
+
+    def __init__(self, aquecimento: str = None):
+        self.aquecimento = (aquecimento or AQUECIMENTO).lower()
+        self.erro_modelo: Optional[str] = None
+        self.mongo_ok = False
+        self.erro_mongo: Optional[str] = None
+        self._ultimo_ping: Optional[float] = None
+        self._ping_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        self.verificar_mongo()
+        if self.aquecimento == "sincrono":
+            self.aquecer()
+        elif self.aquecimento == "segundo_plano":
+            self._thread = threading.Thread(target=self.aquecer, name="aquecimento-anonimizador", daemon=True)
+            self._thread.start()
+
+    def aquecer(self):
+        """Carrega o modelo spaCy e o Presidio deste processo"""
+        inicio = time.perf_counter()
+        try:
+            Anonimizador()
+        except Exception as e:
+            self.erro_modelo = str(e)
+            logger.error(f"Falha no aquecimento do Anonimizador: {str(e)}")
+            return
+        duracao = time.perf_counter() - inicio
+        metricas.observar_duracao("aquecimento_anonimizador", duracao)
+        logger.info(f"Anonimizador aquecido em {duracao:.1f}s.")
+
+    def verificar_mongo(self) -> bool:
+        """Envia um ping pelo cliente compartilhado e guarda o resultado"""
+        with self._ping_lock:
+            try:
+                get_db().client.admin.command("ping")
+                self.mongo_ok, self.erro_mongo = True, None
+            except Exception as e:
+                if self.mongo_ok or self._ultimo_ping is None:
+                    logger.error(f"MongoDB indisponível: {str(e)}")
+                self.mongo_ok, self.erro_mongo = False, str(e)
+            self._ultimo_ping = time.monotonic()
+            return self.mongo_ok
+
+    def estado_modelo(self) -> str:
+        if Anonimizador.carregado():
+            return "pronto"
+        if self.erro_modelo:
+            return "falhou"
+        if self.aquecimento == "desligado":
+            return "sob_demanda"
+        return "carregando"
+
+    def estado(self) -> Dict:
+        """Situação de cada dependência e se o serviço pode receber tráfego"""
+        if self._ultimo_ping is None or time.monotonic() - self._ultimo_ping >= INTERVALO_PING_S:
+            self.verificar_mongo()
+
+        modelo = self.estado_modelo()
+        return {
+            "pronto": self.mongo_ok and modelo in ("pronto", "sob_demanda"),
+            "modelo": {"estado": modelo, "erro": self.erro_modelo},
+            "mongo": {"estado": "ok" if self.mongo_ok else "indisponivel", "erro": self.erro_mongo},
+        }
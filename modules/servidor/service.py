@@ -0,0 +1,71 @@
+import gc
+import os
+import time
+from dotenv import load_dotenv
+from modules.anonimo.cache import CacheAnonimizacao
+from modules.anonimo.service import Anonimizador
+from modules.jobs import service as jobs
+from modules.shared import database, metricas
+from modules.shared.logger import obter_logger, somente_console
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+WORKERS = int(os.getenv("SERVIDOR_WORKERS", str(os.cpu_count() or 1)))
+# Carrega o modelo no processo mestre antes do fork; os workers herdam as páginas (copy-on-write)
+PRELOAD = os.getenv("SERVIDOR_PRELOAD", "true").lower() == "true"
+# Move os objetos carregados para a geração permanente do GC, que as coletas dos workers não percorrem
+CONGELAR_GC = os.getenv("SERVIDOR_CONGELAR_GC", "true").lower() == "true"
+
+
+def _mb(memoria: dict, tipo: str) -> str:
+    return f"{memoria[tipo] / 2 ** 20:.0f} MB" if tipo in memoria else "n/d"
+
+
+def preparar_mestre():
+    """Carrega o Anonimizador no processo mestre e congela o GC antes do fork dos workers.
+
+    Sem o congelamento, a primeira coleta de cada worker escreveria no cabeçalho
+    de todos os objetos herdados e copiaria as páginas que os contêm.
+    """
+    if not PRELOAD:
+        logger.info("SERVIDOR_PRELOAD desligado: cada worker carrega o próprio modelo.")
+        return
+
+    inicio = time.perf_counter()
+    try:
+        Anonimizador()
+    except Exception as e:
+        # Os workers tentam de novo no aquecimento e o /health/ready reporta a falha
+        logger.error(f"Falha ao carregar o Anonimizador no processo mestre: {str(e)}")
+        return
+    logger.info(f"Anonimizador carregado no processo mestre em {time.perf_counter() - inicio:.1f}s.")
+
+    if CONGELAR_GC:
+        gc.collect()
+        gc.freeze()
+        logger.info(f"GC congelado com {gc.get_freeze_count()} objetos.")
+
+    memoria = metricas.memoria_processo()
+    logger.info(f"Memória do mestre antes do fork: RSS {_mb(memoria, 'rss')}.")
+
+
+def apos_fork():
+    """Descarta no worker os recursos do mestre que não podem ser compartilhados entre processos"""
+    # O LOG_FILE fica só com o mestre: vários processos rotacionando o mesmo arquivo o corrompem
+    somente_console()
+    # Conexões herdadas não podem ser usadas pelo worker; o cliente é recriado no primeiro acesso
+    database._client = database._client_async = database._loop_async = None
+    # Importado no mestre, o DONO dos jobs seria o mesmo em todos os workers
+    jobs.DONO = jobs.identificar_dono()
+
+    if Anonimizador.carregado():
+        anonimizador = Anonimizador()
+        # O nível persistente (conexão SQLite ou MongoDB) é reaberto no worker
+        anonimizador.cache = CacheAnonimizacao(anonimizador.versao_configuracao())
+
+
+def worker_encerrado(pid: int):
+    """Chamado no mestre quando um worker sai"""
+    metricas.processo_encerrado(pid)
@@ -0,0 +1,45 @@
+import threading
+from typing import Callable, Optional
+from modules.shared.logger import obter_logger
+
+logger = obter_logger(__name__)
+
+
+class Batimento:
+    """Chama `bater()` logo ao iniciar e depois a cada `intervalo_s` segundos, em uma thread, até `parar`.
+
+    Serve para manter vivos os leases no MongoDB independentemente do progresso
+    de quem os detém. Uma falha em `bater` é registrada e tentada de novo no
+    intervalo seguinte.
+    """
+
+    def __init__(self, bater: Callable[[], None], intervalo_s: float, nome: str = "batimento"):
+        self.bater = bater
+        self.intervalo_s = intervalo_s
+        self.nome = nome
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name=self.nome, daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = None):
+        self._parar.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.bater()
+            except Exception as e:
+                logger.error(f"Falha no batimento {self.nome}: {str(e)}")
+            self._parar.wait(self.intervalo_s)
@@ -1,18 +1,93 @@
+import asyncio
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+# Pool de conexões compartilhado por todo o processo (threads do consumidor de
+# jobs, ingestão e API). Cada processo do pool de workers tem o seu.
+POOL_MAX = int(os.getenv("MONGODB_POOL_MAX", "50"))
+POOL_MIN = int(os.getenv("MONGODB_POOL_MIN", "0"))
+POOL_OCIOSO_MS = int(os.getenv("MONGODB_POOL_OCIOSO_MS", "300000"))
+# Espera máxima por uma conexão livre antes de falhar (0 = sem limite)
+POOL_ESPERA_MS = int(os.getenv("MONGODB_POOL_ESPERA_MS", "10000"))
+READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+# "majority", "0" ou o número de nós que confirmam a escrita
+WRITE_CONCERN = os.getenv("MONGODB_WRITE_CONCERN", "1")
+
 _client = None
+_client_async = None
+_loop_async = None
+
+
+def opcoes_cliente() -> dict:
+    """Opções comuns aos clientes síncrono e assíncrono"""
+    return {
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 30000,
+        "retryWrites": True,
+        "maxPoolSize": POOL_MAX,
+        "minPoolSize": POOL_MIN,
+        "maxIdleTimeMS": POOL_OCIOSO_MS,
+        "waitQueueTimeoutMS": POOL_ESPERA_MS or None,
+        "readPreference": READ_PREFERENCE,
+        "w": int(WRITE_CONCERN) if WRITE_CONCERN.isdigit() else WRITE_CONCERN,
+    }
+
 
 def get_db():
     global _client
     if not _client:
-        _client = MongoClient(
-            os.getenv("MONGO_URI"),
-            connectTimeoutMS=5000,
-            socketTimeoutMS=30000,
-            retryWrites=True
+        _client = MongoClient(os.getenv("MONGO_URI"), **opcoes_cliente())
+    return _client[os.getenv("MONGODB_DBNAME")]
+
+
+def get_db_async():
+    """Banco acessado pelo Motor, para os handlers async da API não bloquearem o event loop.
+
+    O cliente do Motor fica preso ao event loop em que foi criado; um loop
+    diferente (outro `asyncio.run`, por exemplo) ganha um cliente novo.
+    """
+    global _client_async, _loop_async
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    loop = asyncio.get_running_loop()
+    if _client_async is None or _loop_async is not loop:
+        _client_async = AsyncIOMotorClient(os.getenv("MONGO_URI"), io_loop=loop, **opcoes_cliente())
+        _loop_async = loop
+    return _client_async[os.getenv("MONGODB_DBNAME")]
+
+
+def fechar_conexoes():
+    """Fecha os clientes deste processo, devolvendo as conexões do pool"""
+    global _client, _client_async, _loop_async
+    for cliente in (_client, _client_async):
+        if cliente is not None:
+            cliente.close()
+    _client = _client_async = _loop_async = None
+
+
+def garantir_indices():
+    """Cria, se ainda não existirem, os índices de chamadoId usados pelo importador.
+
+    Em `interacoes_processadas` o índice é único: sem ele, dois processos que fazem o
+    upsert do mesmo chamado ao mesmo tempo podem inserir dois documentos. O índice
+    simples criado por versões anteriores é substituído.
+    """
+    db = get_db()
+    db["interacoes"].create_index("chamadoId")
+
+    processadas = db["interacoes_processadas"]
+    anterior = processadas.index_information().get("chamadoId_1")
+    if anterior is not None and not anterior.get("unique"):
+        processadas.drop_index("chamadoId_1")
+    try:
+        processadas.create_index("chamadoId", unique=True)
+    except DuplicateKeyError:
+        # Mantém o índice simples para as consultas e deixa a duplicação para ser resolvida à mão
+        processadas.create_index("chamadoId")
+        raise RuntimeError(
+            "interacoes_processadas tem chamadoIds duplicados; remova as duplicatas para criar o índice único."
         )
-    return _client[os.getenv("MONGODB_DBNAME")]
\ No newline at end of file
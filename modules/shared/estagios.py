@@ -0,0 +1,205 @@
+import queue
+import threading
+import time
+import weakref
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+from dotenv import load_dotenv
+from modules.shared import metricas
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+# Intervalo com que as threads bloqueadas em uma fila verificam se o grafo foi abortado
+_INTERVALO_S = 0.1
+_FIM = object()
+
+_ativos = weakref.WeakSet()
+_ativos_lock = threading.Lock()
+
+
+class Estagio(NamedTuple):
+    """Etapa do grafo: `funcao(item)` roda em `concorrencia` threads que consomem a fila de entrada.
+
+    O retorno segue para o estágio seguinte (None não é repassado). Trabalho de
+    CPU deve ser submetido a um pool de processos de dentro de `funcao`, para
+    que a thread só aguarde o resultado.
+    """
+    nome: str
+    funcao: Callable[[Any], Any]
+    concorrencia: int = 1
+    capacidade: int = 4
+
+
+class Interrompido(Exception):
+    """`parar` foi chamado antes do fim da entrada; o que já estava nas filas foi concluído"""
+
+
+class GrafoEstagios:
+    """Estágios em sequência ligados por filas limitadas a `capacidade` itens.
+
+    A entrada é consumida pela thread que chama `executar` e cada estágio tem
+    as suas próprias threads, então leitura, CPU e escrita se sobrepõem. Com a
+    fila seguinte cheia um estágio bloqueia, propagando a contrapressão até a
+    entrada: a memória fica limitada pela soma das capacidades mais os itens em
+    processamento. Uma exceção em qualquer estágio aborta o grafo, descarta o
+    que estiver nas filas e é relançada por `executar`. Marcar o Event `parar`
+    equivale a chamar `parar()`.
+    """
+
+    def __init__(self, nome: str, estagios: List[Estagio], parar: Optional[threading.Event] = None):
+        self.nome = nome
+        self.estagios = estagios
+        self._filas = {estagio.nome: queue.Queue(maxsize=max(estagio.capacidade, 1)) for estagio in estagios}
+        self._seguinte = {atual.nome: seguinte.nome for atual, seguinte in zip(estagios, estagios[1:])}
+        self._parar = parar or threading.Event()
+        self._abortar = threading.Event()
+        self._concluido = threading.Event()
+        self._erro: Optional[Exception] = None
+        self._lock = threading.Lock()
+
+    def parar(self):
+        """Para de consumir a entrada; `executar` conclui o que já está nas filas e lança Interrompido"""
+        self._parar.set()
+
+    def aguardar(self, timeout: float = None) -> bool:
+        return self._concluido.wait(timeout)
+
+    def injetar(self, estagio: str, item):
+        """Coloca `item` direto na fila de `estagio`, sem passar pelos anteriores.
+
+        Só é seguro enquanto a entrada está sendo consumida, por exemplo em um
+        callback chamado pelo próprio iterável de `executar`.
+        """
+        self._colocar(estagio, item)
+
+    def executar(self, entrada: Iterable):
+        """Passa cada item de `entrada` pelos estágios e retorna quando todos terminarem"""
+        # Dentro de `metricas.perfilar` as threads dos estágios entram no mesmo perfil
+        sessao = metricas.sessao_perfil()
+        threads = [
+            [
+                threading.Thread(target=self._trabalhar, args=(estagio, sessao), name=f"{self.nome}-{estagio.nome}-{i}",
+                                 daemon=True)
+                for i in range(max(estagio.concorrencia, 1))
+            ]
+            for estagio in self.estagios
+        ]
+        with _ativos_lock:
+            _ativos.add(self)
+        for grupo in threads:
+            for thread in grupo:
+                thread.start()
+
+        interrompido = False
+        try:
+            iterador = iter(entrada)
+            while not self._abortar.is_set():
+                if self._parar.is_set():
+                    interrompido = True
+                    break
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    break
+                self._colocar(self.estagios[0].nome, item)
+        except Exception as e:
+            self._falhar("entrada", e)
+        finally:
+            # Um estágio só recebe o fim depois que todas as threads do anterior terminaram
+            for estagio, grupo in zip(self.estagios, threads):
+                for _ in grupo:
+                    self._colocar(estagio.nome, _FIM)
+                for thread in grupo:
+                    thread.join()
+            self._descartar()
+            with _ativos_lock:
+                _ativos.discard(self)
+            self._concluido.set()
+
+        if self._erro is not None:
+            raise self._erro
+        if interrompido:
+            raise Interrompido(f"{self.nome} interrompido antes do fim da entrada")
+
+    def _trabalhar(self, estagio: Estagio, sessao=None):
+        with metricas.perfilar_thread(sessao):
+            self._consumir(estagio)
+
+    def _consumir(self, estagio: Estagio):
+        fila = self._filas[estagio.nome]
+        seguinte = self._seguinte.get(estagio.nome)
+        while not self._abortar.is_set():
+            try:
+                item = fila.get(timeout=_INTERVALO_S)
+            except queue.Empty:
+                continue
+            if item is _FIM:
+                return
+            metricas.ajustar_fila(estagio.nome, -1)
+
+            try:
+                with metricas.medir(f"estagio_{estagio.nome}"):
+                    saida = estagio.funcao(item)
+            except Exception as e:
+                self._falhar(estagio.nome, e)
+                return
+
+            if saida is not None and seguinte:
+                self._colocar(seguinte, saida)
+
+    def _colocar(self, nome: str, item):
+        fila = self._filas[nome]
+        contar = item is not _FIM
+        if contar:
+            metricas.ajustar_fila(nome, 1)
+        inicio = time.perf_counter()
+        bloqueado = False
+        while not self._abortar.is_set():
+            try:
+                fila.put(item, timeout=_INTERVALO_S)
+            except queue.Full:
+                bloqueado = True
+                continue
+            if bloqueado:
+                # Tempo que o produtor esperou pelo estágio `nome`, o gargalo naquele momento
+                metricas.observar_duracao(f"contrapressao_{nome}", time.perf_counter() - inicio)
+            return
+        if contar:
+            metricas.ajustar_fila(nome, -1)
+
+    def _falhar(self, origem: str, erro: Exception):
+        with self._lock:
+            if self._erro is None:
+                self._erro = erro
+                logger.debug("Estágio %s de %s falhou: %s. Abortando.", origem, self.nome, erro)
+        self._abortar.set()
+
+    def _descartar(self):
+        for nome, fila in self._filas.items():
+            descartados = 0
+            while True:
+                try:
+                    item = fila.get_nowait()
+                except queue.Empty:
+                    break
+                descartados += item is not _FIM
+            if descartados:
+                metricas.ajustar_fila(nome, -descartados)
+
+
+def parar_todos(timeout: float = None) -> bool:
+    """Para todos os grafos em execução e aguarda a drenagem; False se algum não terminou a tempo"""
+    with _ativos_lock:
+        grafos = list(_ativos)
+    for grafo in grafos:
+        grafo.parar()
+
+    limite = None if timeout is None else time.monotonic() + timeout
+    for grafo in grafos:
+        restante = None if limite is None else max(limite - time.monotonic(), 0)
+        if not grafo.aguardar(restante):
+            logger.warning(f"{grafo.nome} não terminou de drenar as filas em {timeout}s.")
+            return False
+    return True
@@ -1,23 +1,33 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Configuração básica do logger
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+# Níveis por módulo, relativos ao pacote `modules`: "importacao=WARNING,anonimo.cache=DEBUG"
+NIVEIS_MODULOS = os.getenv("LOG_NIVEIS_MODULOS", "")
+# Resumos de progresso a cada tantos itens ou segundos, o que vier primeiro
+PROGRESSO_ITENS = int(os.getenv("LOG_PROGRESSO_ITENS", "1000"))
+PROGRESSO_S = float(os.getenv("LOG_PROGRESSO_S", "10"))
+
+# Logger base: os módulos usam `obter_logger(__name__)`, que herda os handlers daqui
+logger = logging.getLogger("modules")
+logger.setLevel(NIVEL)
 
 # Formato das mensagens
 formatter = logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(message)s'
+    '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
 )
 
 # Handler para console
 ch = logging.StreamHandler()
 ch.setFormatter(formatter)
-logger.addHandler(ch)
 
 # Handler para arquivo (opcional)
 log_file = os.getenv("LOG_FILE", "app.log")
@@ -27,7 +37,133 @@ fh = RotatingFileHandler(
     backupCount=5
 )
 fh.setFormatter(formatter)
-logger.addHandler(fh)
+
+# A thread que chama o logger só enfileira o registro; a escrita no console e
+# no arquivo (inclusive a rotação) acontece na thread do QueueListener.
+_fila: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler = QueueHandler(_fila)
+logger.addHandler(_queue_handler)
+# Handlers do listener; os workers do gunicorn ficam só com o console (ver `somente_console`)
+_handlers = (ch, fh)
+_listener: QueueListener
+
+
+def _iniciar_listener():
+    global _listener
+    _listener = QueueListener(_fila, *_handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+_iniciar_listener()
+
+
+def _reiniciar_apos_fork():
+    """Processos filhos (pool de workers) não herdam a thread do listener: cria uma nova"""
+    global _fila
+    _fila = queue.SimpleQueue()
+    _queue_handler.queue = _fila
+    _iniciar_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+def somente_console():
+    """Deixa de gravar o LOG_FILE neste processo e nos que ele criar depois.
+
+    Chamado nos workers do gunicorn: eles herdam do mestre o RotatingFileHandler, e a
+    rotação não é segura entre processos (cada um renomearia o arquivo por conta
+    própria). O log do worker vai só para o stderr, que o gunicorn repassa; o arquivo
+    fica com um único escritor, o mestre.
+    """
+    global _handlers
+    if fh not in _handlers:
+        return
+    atexit.unregister(_listener.stop)
+    _listener.stop()
+    _handlers = (ch,)
+    fh.close()
+    _iniciar_listener()
+
+
+def configurar_niveis(niveis: str):
+    """Aplica níveis por módulo no formato "modulo=NIVEL,outro.modulo=NIVEL" """
+    for item in filter(None, (parte.strip() for parte in niveis.split(","))):
+        nome, _, nivel = item.partition("=")
+        nome = nome.strip()
+        if not nome.startswith("modules"):
+            nome = f"modules.{nome}"
+        logging.getLogger(nome).setLevel(nivel.strip().upper())
+
+
+configurar_niveis(NIVEIS_MODULOS)
+
+
+def obter_logger(nome: str) -> logging.Logger:
+    """Logger de um módulo, sujeito ao nível definido em LOG_NIVEIS_MODULOS"""
+    return logging.getLogger(nome)
+
+
+class ProgressoLog:
+    """Resume o andamento de um laço em uma linha a cada `a_cada_itens` itens ou `a_cada_s` segundos.
+
+    Substitui as mensagens por item: `avancar` só formata e emite quando um dos
+    limites é atingido. Os contadores extras (ex.: `falhas=2`) são acumulados e
+    aparecem como pares chave=valor, também disponíveis em `record.progresso`.
+    """
+
+    def __init__(self, descricao: str, total: Optional[int] = None, log: logging.Logger = None,
+                 a_cada_itens: int = None, a_cada_s: float = None):
+        self.descricao = descricao
+        self.total = total
+        self.log = log or logger
+        self.a_cada_itens = PROGRESSO_ITENS if a_cada_itens is None else a_cada_itens
+        self.a_cada_s = PROGRESSO_S if a_cada_s is None else a_cada_s
+        self.processados = 0
+        self.contadores = {}
+        self._inicio = time.monotonic()
+        self._ultimo_log = self._inicio
+        self._processados_no_ultimo_log = 0
+
+    def avancar(self, quantidade: int = 1, **contadores):
+        self.processados += quantidade
+        for nome, valor in contadores.items():
+            self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+        agora = time.monotonic()
+        if (self.processados - self._processados_no_ultimo_log >= self.a_cada_itens
+                or agora - self._ultimo_log >= self.a_cada_s):
+            self._emitir(agora)
+
+    def finalizar(self, **contadores):
+        for nome, valor in contadores.items():
+            self.contadores[nome] = self.contadores.get(nome, 0) + valor
+        self._emitir(time.monotonic(), final=True)
+
+    def _emitir(self, agora: float, final: bool = False):
+        self._ultimo_log = agora
+        self._processados_no_ultimo_log = self.processados
+        if not self.log.isEnabledFor(logging.INFO):
+            return
+
+        decorrido = agora - self._inicio
+        campos = {
+            "processados": self.processados,
+            "total": self.total,
+            "itens_por_s": round(self.processados / decorrido, 1) if decorrido > 0 else None,
+            "decorrido_s": round(decorrido, 1),
+            **self.contadores,
+        }
+        self.log.info(
+            "%s %s: %s",
+            self.descricao,
+            "concluído" if final else "em andamento",
+            " ".join(f"{chave}={valor}" for chave, valor in campos.items() if valor is not None),
+            extra={"progresso": campos}
+        )
+
 
 # Exporta o logger para uso em outros módulos
-__all__ = ['logger']
\ No newline at end of file
+__all__ = ['logger', 'obter_logger', 'somente_console', 'ProgressoLog']
@@ -0,0 +1,295 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from modules.shared.logger import obter_logger
+
+load_dotenv()
+
+logger = obter_logger(__name__)
+
+PERFIL_DIR = os.getenv("METRICAS_PERFIL_DIR", "perfis")
+# Fração dos jobs perfilados automaticamente, além dos que pedem `perfilar`
+PERFIL_AMOSTRAGEM = float(os.getenv("METRICAS_PERFIL_AMOSTRAGEM", "0"))
+PERFIL_LINHAS = 30
+# Definido pelo gunicorn.conf.py: cada worker grava os valores em arquivos nesta pasta e o
+# /metrics de qualquer um deles soma os de todos (modo multiprocesso do prometheus_client)
+MULTIPROCESSO_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+DURACAO = Histogram(
+    "apolo_etapa_duracao_segundos",
+    "Duração de cada etapa do pipeline",
+    ["etapa"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120)
+)
+BYTES = Histogram(
+    "apolo_etapa_bytes",
+    "Tamanho em bytes (UTF-8) da entrada e da saída de cada etapa",
+    ["etapa", "sentido"],
+    buckets=(0, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+ENTIDADES_POR_TEXTO = Histogram(
+    "apolo_entidades_por_texto",
+    "Quantidade de entidades substituídas em cada texto anonimizado",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21)
+)
+ENTIDADES = Counter("apolo_entidades", "Entidades substituídas por tipo", ["tipo"])
+ITENS = Counter("apolo_itens", "Itens do pipeline por desfecho", ["desfecho"])
+ANONIMIZACAO = Counter("apolo_anonimizacao_textos", "Textos anonimizados por caminho", ["caminho"])
+# No modo multiprocesso cada worker vira uma série com o rótulo pid; as filas são somadas
+MEMORIA = Gauge(
+    "apolo_memoria_processo_bytes", "Memória do processo (rss, pss, compartilhada, privada)", ["tipo"],
+    multiprocess_mode="all"
+)
+FILA = Gauge(
+    "apolo_fila_estagio_itens", "Itens aguardando na fila de entrada de cada estágio", ["estagio"],
+    multiprocess_mode="livesum"
+)
+
+_METRICAS = {
+    "duracao": DURACAO,
+    "bytes": BYTES,
+    "entidades_por_texto": ENTIDADES_POR_TEXTO,
+    "entidades": ENTIDADES,
+    "itens": ITENS,
+    "anonimizacao": ANONIMIZACAO,
+}
+
+# Marcadores como <PERSON> e <CPF> deixados pelo Anonimizador no lugar das entidades
+_MARCADOR_ENTIDADE = re.compile(r'<([A-Z_]+)>')
+
+# Nos processos do pool as observações são acumuladas aqui e devolvidas ao
+# processo principal junto com os resultados, já que cada processo tem o seu registro.
+_coleta: Optional[List[Tuple[str, tuple, float]]] = None
+
+
+def _registrar(metrica: str, rotulos: tuple, valor: float):
+    if _coleta is not None:
+        _coleta.append((metrica, rotulos, valor))
+        return
+    alvo = _METRICAS[metrica]
+    if rotulos:
+        alvo = alvo.labels(*rotulos)
+    if isinstance(alvo, Counter):
+        alvo.inc(valor)
+    else:
+        alvo.observe(valor)
+
+
+def _tamanho(texto) -> int:
+    return len(texto.encode("utf-8")) if isinstance(texto, str) else 0
+
+
+def observar_duracao(etapa: str, segundos: float):
+    _registrar("duracao", (etapa,), segundos)
+
+
+def observar_bytes(etapa: str, entrada=None, saida=None):
+    _registrar("bytes", (etapa, "entrada"), _tamanho(entrada))
+    _registrar("bytes", (etapa, "saida"), _tamanho(saida))
+
+
+def contar(metrica: str, rotulo: str, quantidade: int = 1):
+    """Incrementa um contador (`itens`, `anonimizacao` ou `entidades`)"""
+    if quantidade:
+        _registrar(metrica, (rotulo,), quantidade)
+
+
+def ajustar_fila(estagio: str, quantidade: int):
+    """Soma `quantidade` (negativa ao retirar) à profundidade da fila do estágio"""
+    FILA.labels(estagio).inc(quantidade)
+
+
+def observar_entidades(texto_anonimizado: str):
+    """Registra as entidades substituídas em um texto, pelos marcadores que ficaram no lugar delas"""
+    tipos = _MARCADOR_ENTIDADE.findall(texto_anonimizado)
+    _registrar("entidades_por_texto", (), len(tipos))
+    for tipo in tipos:
+        _registrar("entidades", (tipo,), 1)
+
+
+def executar_etapa(etapa: str, funcao: Callable[[str], str], entrada: str) -> str:
+    """Executa uma etapa de texto para texto registrando duração e bytes"""
+    inicio = time.perf_counter()
+    saida = funcao(entrada)
+    observar_duracao(etapa, time.perf_counter() - inicio)
+    observar_bytes(etapa, entrada, saida)
+    return saida
+
+
+@contextmanager
+def medir(etapa: str):
+    """Registra a duração do bloco como uma observação da etapa"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar_duracao(etapa, time.perf_counter() - inicio)
+
+
+def medir_iterador(etapa: str, iteravel: Iterable) -> Iterator:
+    """Registra o tempo gasto em cada `next` do iterável, como as idas ao banco de um cursor"""
+    iterador = iter(iteravel)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            item = next(iterador)
+        except StopIteration:
+            return
+        observar_duracao(etapa, time.perf_counter() - inicio)
+        yield item
+
+
+@contextmanager
+def coletar() -> Iterator[List[Tuple[str, tuple, float]]]:
+    """Acumula as observações do bloco em uma lista em vez de registrá-las"""
+    global _coleta
+    anterior, _coleta = _coleta, []
+    try:
+        yield _coleta
+    finally:
+        _coleta = anterior
+
+
+def reproduzir(observacoes: List[Tuple[str, tuple, float]]):
+    """Registra observações acumuladas por `coletar` em outro processo"""
+    for metrica, rotulos, valor in observacoes:
+        _registrar(metrica, rotulos, valor)
+
+
+# Campos do /proc/<pid>/smaps_rollup, em kB
+_CAMPOS_SMAPS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "compartilhada",
+    "Shared_Dirty": "compartilhada",
+    "Private_Clean": "privada",
+    "Private_Dirty": "privada",
+}
+
+
+def memoria_processo(pid="self") -> Dict[str, int]:
+    """RSS, PSS e memória compartilhada/privada do processo, em bytes.
+
+    O PSS divide cada página compartilhada entre os processos que a mapeiam,
+    então a soma do PSS dos workers é a memória que eles realmente ocupam.
+    Sem smaps_rollup (Linux < 4.14 ou fora do Linux) só o RSS é informado.
+    """
+    memoria = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as arquivo:
+            for linha in arquivo:
+                campo, _, valor = linha.partition(":")
+                if campo in _CAMPOS_SMAPS:
+                    tipo = _CAMPOS_SMAPS[campo]
+                    memoria[tipo] = memoria.get(tipo, 0) + int(valor.split()[0]) * 1024
+    except OSError:
+        if pid == "self":
+            import resource
+
+            # ru_maxrss é o pico, em kB no Linux
+            memoria["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memoria
+
+
+def exportar() -> Tuple[bytes, str]:
+    """Métricas no formato texto do Prometheus e o respectivo content type.
+
+    No modo multiprocesso junta os arquivos de todos os workers, não só os do
+    processo que atendeu o scrape.
+    """
+    for tipo, valor in memoria_processo().items():
+        MEMORIA.labels(tipo).set(valor)
+    if not MULTIPROCESSO_DIR:
+        return generate_latest(), CONTENT_TYPE_LATEST
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro, path=MULTIPROCESSO_DIR)
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def processo_encerrado(pid: int):
+    """Descarta as séries do worker que saiu (gauges `livesum`) no modo multiprocesso"""
+    if MULTIPROCESSO_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROCESSO_DIR)
+
+
+class _SessaoPerfil:
+    """Perfis das threads que trabalham para um mesmo `perfilar`, somados ao da thread que o abriu"""
+
+    def __init__(self):
+        self.perfis: List[cProfile.Profile] = []
+        self.lock = threading.Lock()
+
+
+_perfil_local = threading.local()
+
+
+def sessao_perfil() -> Optional[_SessaoPerfil]:
+    """Sessão de `perfilar` aberta na thread atual, para repassar às threads que ela criar"""
+    return getattr(_perfil_local, "sessao", None)
+
+
+@contextmanager
+def perfilar_thread(sessao: Optional[_SessaoPerfil]):
+    """Perfila a thread atual como parte de `sessao`; sem sessão não faz nada"""
+    if sessao is None:
+        yield
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError as e:
+        # A partir do Python 3.12 só um cProfile pode estar ativo por processo
+        logger.debug(f"Thread fora do perfil: {str(e)}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        perfil.disable()
+        with sessao.lock:
+            sessao.perfis.append(perfil)
+
+
+@contextmanager
+def perfilar(nome: str):
+    """Executa o bloco sob o cProfile e grava o resultado em PERFIL_DIR.
+
+    Gera `<nome>.prof` (para o snakeviz/pstats) e `<nome>.txt` com as funções de
+    maior tempo acumulado. Além da thread atual entram as threads dos grafos de
+    estágios iniciados dentro do bloco (ver `perfilar_thread`), com os tempos
+    somados; os processos do pool de anonimização ficam de fora.
+    """
+    sessao = _SessaoPerfil()
+    anterior = sessao_perfil()
+    _perfil_local.sessao = sessao
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        _perfil_local.sessao = anterior
+        try:
+            os.makedirs(PERFIL_DIR, exist_ok=True)
+            caminho = os.path.join(PERFIL_DIR, nome)
+            resumo = io.StringIO()
+            estatisticas = pstats.Stats(perfil, stream=resumo)
+            with sessao.lock:
+                for perfil_thread in sessao.perfis:
+                    estatisticas.add(perfil_thread)
+            estatisticas.dump_stats(f"{caminho}.prof")
+            estatisticas.sort_stats("cumulative").print_stats(PERFIL_LINHAS)
+            with open(f"{caminho}.txt", "w", encoding="utf-8") as arquivo:
+                arquivo.write(resumo.getvalue())
+            logger.info(f"Perfil gravado em {caminho}.prof")
+        except Exception as e:
+            logger.error(f"Erro ao gravar perfil {nome}: {str(e)}")
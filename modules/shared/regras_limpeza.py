@@ -0,0 +1,221 @@
+import re
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Pattern
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+class RegraCompilada(NamedTuple):
+    nome: str
+    regex: Pattern
+    substituicao: str
+    gatilhos: tuple
+    ignorar_caixa: bool
+    padrao_re2: Optional[str] = None
+
+
+def compilar_regras(regras: List[Dict], substituicao: str = '', flags: int = 0) -> List[RegraCompilada]:
+    """Compila uma lista declarativa de regras de limpeza.
+
+    Cada regra é um dicionário com:
+      - "nome": identificação da regra
+      - "padroes": lista de regex; mais de um padrão vira uma única alternação,
+        aplicada em uma só passada (a ordem da lista define a prioridade)
+      - "substituicao" (opcional): texto de substituição, padrão `substituicao`
+      - "flags" (opcional): flags do `re`, padrão `flags`
+      - "gatilhos" (opcional): trechos literais sem os quais a regra não pode
+        casar; se nenhum estiver presente no texto a passada é pulada. Com
+        IGNORECASE a busca é feita em minúsculas, então evite letras com
+        variantes Unicode especiais (i, s, k) nos gatilhos
+    """
+    compiladas = []
+    for regra in regras:
+        flags_regra = regra.get("flags", flags)
+        ignorar_caixa = bool(flags_regra & re.IGNORECASE)
+        padrao = '|'.join(f'(?:{p})' for p in regra["padroes"])
+        gatilhos = tuple(
+            g.lower() if ignorar_caixa else g
+            for g in regra.get("gatilhos", ())
+        )
+        regex = re.compile(padrao, flags_regra)
+        compiladas.append(RegraCompilada(
+            nome=regra["nome"],
+            regex=regex,
+            substituicao=regra.get("substituicao", substituicao),
+            gatilhos=gatilhos,
+            ignorar_caixa=ignorar_caixa,
+            padrao_re2=traduzir_para_re2(regex)
+        ))
+    return compiladas
+
+
+def compilar_alternativa(padroes: List[str], flags: int = 0) -> Pattern:
+    """Une padrões de verificação em uma única regex para um só `search`"""
+    return re.compile('|'.join(f'(?:{p})' for p in padroes), flags)
+
+
+def assinatura_regras(regras: List[RegraCompilada]) -> List:
+    """Representação serializável das regras, usada para versionar o pipeline"""
+    return [[r.nome, r.regex.pattern, r.regex.flags, r.substituicao] for r in regras]
+
+
+def aplicar_regras(texto: str, regras: List[RegraCompilada]) -> str:
+    """Aplica as regras compiladas em sequência, pulando as que não têm gatilho no texto"""
+    minusculo: Optional[str] = None
+    for regra in regras:
+        if regra.gatilhos:
+            if regra.ignorar_caixa:
+                if minusculo is None:
+                    minusculo = texto.lower()
+                alvo = minusculo
+            else:
+                alvo = texto
+            if not any(gatilho in alvo for gatilho in regra.gatilhos):
+                continue
+
+        texto, substituicoes = regra.regex.subn(regra.substituicao, texto)
+        if substituicoes:
+            minusculo = None
+    return texto
+
+
+# Caminho vetorizado: as mesmas regras aplicadas a uma coluna inteira pelo
+# Arrow (pyarrow.compute), que usa o RE2 em vez do `re`. As classes do `re`
+# (\s, \w, \d) são traduzidas para classes explícitas do RE2 com o mesmo
+# conjunto de caracteres no BMP; textos com caracteres em que os motores
+# divergem (İ/ı com IGNORECASE e planos astrais, onde as versões do Unicode
+# diferem) são refeitos pelo caminho escalar. O pandas e o pyarrow só são
+# importados quando uma coluna é processada.
+
+ESPACOS = ''.join(chr(c) for c in range(0x10000) if chr(c).isspace())
+_CLASSE_ESPACO = ''.join(f'\\x{{{ord(c):x}}}' for c in ESPACOS)
+ESPACO_RE2 = f'[{_CLASSE_ESPACO}]'
+_CLASSES_RE2 = {
+    's': ESPACO_RE2,
+    'S': f'[^{_CLASSE_ESPACO}]',
+    'w': r'[\p{L}\p{N}_]',
+    'W': r'[^\p{L}\p{N}_]',
+    'd': r'\p{Nd}',
+    'D': r'\P{Nd}',
+}
+_FLAGS_RE2 = {re.IGNORECASE: 'i', re.DOTALL: 's', re.MULTILINE: 'm'}
+# Escapes de letra que o RE2 interpreta igual; os demais (\b é só ASCII lá,
+# \Z tem outro sentido, \u não existe) e as referências tornam a regra intraduzível
+_ESCAPES_EQUIVALENTES = set('nrtfv')
+INSEGURO_RE2 = r'[\x{130}\x{131}\x{10000}-\x{10ffff}]'
+
+
+def traduzir_para_re2(regex: Pattern) -> Optional[str]:
+    """Padrão equivalente para o RE2, ou None se a regex usa algo que ele não reproduz.
+
+    Recusa lookarounds, referências e `$` (que no `re` também casa antes de um
+    `\\n` final) e classes como \\s dentro de colchetes.
+    """
+    flags = ''
+    restantes = regex.flags & ~(re.UNICODE | re.IGNORECASE | re.DOTALL | re.MULTILINE)
+    if restantes:
+        return None
+    for flag, letra in _FLAGS_RE2.items():
+        if regex.flags & flag:
+            flags += letra
+
+    padrao = regex.pattern
+    saida = []
+    em_classe = False
+    i = 0
+    while i < len(padrao):
+        c = padrao[i]
+        if c == '\\':
+            proximo = padrao[i + 1:i + 2]
+            if proximo in _CLASSES_RE2:
+                if em_classe:
+                    return None
+                saida.append(_CLASSES_RE2[proximo])
+            elif proximo.isalnum() and proximo not in _ESCAPES_EQUIVALENTES:
+                return None
+            else:
+                saida.append(c + proximo)
+            i += 2
+            continue
+        if em_classe:
+            if c == ']':
+                em_classe = False
+        elif c == '[':
+            em_classe = True
+            # "]" logo após "[" ou "[^" é literal
+            inicio = i + 2 if padrao[i + 1:i + 2] == '^' else i + 1
+            if padrao[inicio:inicio + 1] == ']':
+                saida.append(padrao[i:inicio + 1])
+                i = inicio + 1
+                continue
+        elif c == '$' or padrao.startswith(('(?=', '(?!', '(?<=', '(?<!', '(?#'), i):
+            return None
+        saida.append(c)
+        i += 1
+    return (f'(?{flags})' if flags else '') + ''.join(saida)
+
+
+def pyarrow_compute():
+    """O módulo `pyarrow.compute`, ou None se o pyarrow não estiver instalado"""
+    try:
+        import pyarrow.compute as pc
+    except ImportError:
+        return None
+    return pc
+
+
+def remover_espacos_borda(textos: "pa.Array") -> "pa.Array":
+    """Equivalente vetorizado de `str.strip()`"""
+    import pyarrow.compute as pc
+
+    return pc.replace_substring_regex(textos, f'^{ESPACO_RE2}+|{ESPACO_RE2}+$', '')
+
+
+def aplicar_regras_arrow(textos: "pa.Array", regras: List[RegraCompilada]) -> "pa.Array":
+    """Aplica as regras a um array de strings, pulando as que não têm gatilho em nenhum texto"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for regra in regras:
+        if regra.gatilhos and not any(
+            pc.any(pc.match_substring(textos, gatilho, ignore_case=regra.ignorar_caixa)).as_py()
+            for gatilho in regra.gatilhos
+        ):
+            continue
+        if regra.padrao_re2 is None:
+            textos = pa.array(
+                [None if t is None else regra.regex.sub(regra.substituicao, t) for t in textos.to_pylist()],
+                type=pa.string()
+            )
+        else:
+            textos = pc.replace_substring_regex(textos, regra.padrao_re2, regra.substituicao)
+    return textos
+
+
+def aplicar_em_serie(
+    serie: "pd.Series",
+    funcao_arrow: Callable[["pa.Array"], "pa.Array"],
+    funcao_escalar: Callable[[Optional[str]], str]
+) -> "pd.Series":
+    """Aplica `funcao_arrow` à coluna, com `funcao_escalar` nos valores que o RE2 não reproduz.
+
+    Valores que não são texto (None, NaN) e textos com caracteres inseguros
+    para o RE2 passam pela função escalar, então o resultado é idêntico ao de
+    `serie.map(funcao_escalar)`. Sem pyarrow, é exatamente isso que acontece.
+    """
+    import pandas as pd
+
+    valores = serie.tolist()
+    pc = pyarrow_compute()
+    if pc is None:
+        return pd.Series([funcao_escalar(v) for v in valores], index=serie.index, dtype=object)
+
+    import pyarrow as pa
+
+    textos = pa.array([v if isinstance(v, str) else None for v in valores], type=pa.string())
+    resultado = funcao_arrow(textos).to_pylist()
+    escalares = pc.or_kleene(pc.is_null(textos), pc.match_substring_regex(textos, INSEGURO_RE2))
+    for indice in pc.indices_nonzero(pc.fill_null(escalares, True)).to_pylist():
+        resultado[indice] = funcao_escalar(valores[indice])
+    return pd.Series(resultado, index=serie.index, dtype=object)
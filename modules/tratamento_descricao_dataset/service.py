@@ -1,6 +1,49 @@
 import re
-from typing import Optional
-from modules.shared.logger import logger
+from typing import TYPE_CHECKING, List, Optional
+from modules.shared.logger import obter_logger
+from modules.shared.regras_limpeza import (
+    aplicar_em_serie, aplicar_regras, aplicar_regras_arrow, compilar_alternativa, compilar_regras,
+    remover_espacos_borda, traduzir_para_re2
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = obter_logger(__name__)
+
+# 1. e 2. Padrões de rejeição imediata, verificados em um único search
+REJEICAO = compilar_alternativa([
+    r'take\s+\d+\s+min\s+today\s+to\s+see\s+your\s+monitors',  # Mensagens do Postman
+    r'^<\[ ',  # Padrão técnico no início
+    r'postman\s+inc',  # Mensagens do Postman
+    r'avoid\s+suspension\s+of\s+your\s+postman\s+account'
+], re.IGNORECASE)
+REJEICAO_RE2 = traduzir_para_re2(REJEICAO)
+
+# 3. Lista hierárquica de padrões de limpeza
+REGRAS_DESCRICAO = compilar_regras([
+    # Remoção de padrões complexos primeiro
+    {"nome": "color", "padroes": [r'\{color[^}]*\}'], "gatilhos": ["{color"]},  # {color...}
+    {"nome": "gccode", "padroes": [r'#gccode#\d+:\d+:\d+:[A-Za-z]+:\d+#'], "gatilhos": ["#gccode#"]},  # #gccode#3:40748:374288:S:1201#
+    {"nome": "gccode_bloco", "padroes": [r'<\[ #gccode#[^\]]+#!'], "gatilhos": ["<[ #gccode#"]},  # <[ #gccode#...#!
+    {"nome": "adf", "padroes": [r'\{adf\}.*?\{adf\}'], "flags": re.DOTALL, "gatilhos": ["{adf}"]},  # {adf}...{adf}
+    
+    # Padrões de formatação
+    {"nome": "numero_inicial", "padroes": [r'^\d+\s*']},  # Números no início
+    {"nome": "chave_inicial", "padroes": [r'^\[\d+-'], "gatilhos": ["["]},  # [número-
+    {"nome": "titulo", "padroes": [r'h\d+\.\s*\w+'], "gatilhos": ["."]},  # h1., h2., etc
+    
+    # Padrões de anexos
+    {"nome": "anexos", "padroes": [r'\*\s*\d+\s*anexos?\s*\*'], "gatilhos": ["anexo"]},  # *2 anexos*
+    {"nome": "arquivo", "padroes": [r'\[[^\]]+\.(pdf|jpe?g|png|docx?|xlsx?)\]'], "gatilhos": ["["]},  # [ARQUIVO.pdf]
+    
+    # Limpeza de caracteres especiais
+    {"nome": "colchetes", "padroes": [r'(\s*\[){2,}', r'(\s*\]){2,}'], "substituicao": ' ', "gatilhos": ["[", "]"]},  # [[[ e ]]]
+    {"nome": "residuais", "padroes": [r'[\]\},]+']},  # Caracteres residuais
+    {"nome": "nao_alfanumerico_inicial", "padroes": [r'^\W+']},  # Caracteres não-alfanuméricos no início
+    {"nome": "espacos", "padroes": [r'\s+'], "substituicao": ' '}  # Espaços múltiplos
+], flags=re.IGNORECASE)
+
 
 def limpar_descricao(descricao: Optional[str]) -> str:
     """Limpa a descrição do dataset com regras rigorosas de sanitização"""
@@ -12,56 +55,11 @@ def limpar_descricao(descricao: Optional[str]) -> str:
         return ''
     
     try:
-        # 1. Verificação rigorosa para mensagens do Postman (case insensitive)
-        postman_pattern = re.compile(
-            r'take\s+\d+\s+min\s+today\s+to\s+see\s+your\s+monitors', 
-            re.IGNORECASE
-        )
-        if postman_pattern.search(descricao):
+        if REJEICAO.search(descricao):
             return ''
 
-        # 2. Verificação para outros padrões de rejeição imediata
-        rejection_patterns = [
-            r'^<\[ ',  # Padrão técnico no início
-            r'postman\s+inc',  # Mensagens do Postman
-            r'avoid\s+suspension\s+of\s+your\s+postman\s+account'
-        ]
-        
-        for pattern in rejection_patterns:
-            if re.search(pattern, descricao, re.IGNORECASE):
-                return ''
-
-        # 3. Lista hierárquica de padrões de limpeza
-        cleaning_patterns = [
-            # Remoção de padrões complexos primeiro
-            (r'\{color[^}]*\}', ''),  # {color...}
-            (r'#gccode#\d+:\d+:\d+:[A-Za-z]+:\d+#', ''),  # #gccode#3:40748:374288:S:1201#
-            (r'<\[ #gccode#[^\]]+#!', ''),  # <[ #gccode#...#!
-            (r'\{adf\}.*?\{adf\}', '', re.DOTALL),  # {adf}...{adf}
-            
-            # Padrões de formatação
-            (r'^\d+\s*', ''),  # Números no início
-            (r'^\[\d+-', ''),  # [número-
-            (r'h\d+\.\s*\w+', ''),  # h1., h2., etc
-            
-            # Padrões de anexos
-            (r'\*\s*\d+\s*anexos?\s*\*', ''),  # *2 anexos*
-            (r'\[[^\]]+\.(pdf|jpe?g|png|docx?|xlsx?)\]', '', re.IGNORECASE),  # [ARQUIVO.pdf]
-            
-            # Limpeza de caracteres especiais
-            (r'(\s*\[){2,}', ' '),  # [[[
-            (r'(\s*\]){2,}', ' '),  # ]]]
-            (r'[\]\},]+', ''),  # Caracteres residuais
-            (r'^\W+', ''),  # Caracteres não-alfanuméricos no início
-            (r'\s+', ' ')  # Espaços múltiplos
-        ]
-
         # 4. Aplicação dos padrões de limpeza
-        for pattern in cleaning_patterns:
-            if len(pattern) == 2:
-                descricao = re.sub(pattern[0], pattern[1], descricao, flags=re.IGNORECASE)
-            else:
-                descricao = re.sub(pattern[0], pattern[1], descricao, flags=pattern[2])
+        descricao = aplicar_regras(descricao, REGRAS_DESCRICAO)
 
         # 5. Validação final do resultado
         descricao = descricao.strip()
@@ -72,4 +70,27 @@ def limpar_descricao(descricao: Optional[str]) -> str:
     
     except Exception as e:
         logger.error(f"Erro ao limpar descrição: {str(e)}")
-        return ''
\ No newline at end of file
+        return ''
+
+
+def limpar_lote(descricoes: List[Optional[str]]) -> List[str]:
+    """Aplica `limpar_descricao` a uma lista de descrições"""
+    return [limpar_descricao(descricao) for descricao in descricoes]
+
+
+def _limpar_arrow(descricoes):
+    import pyarrow.compute as pc
+
+    descricoes = remover_espacos_borda(descricoes)
+    rejeitadas = pc.match_substring_regex(descricoes, REJEICAO_RE2)
+    descricoes = remover_espacos_borda(aplicar_regras_arrow(descricoes, REGRAS_DESCRICAO))
+    validas = pc.and_(
+        pc.greater_equal(pc.utf8_length(descricoes), 3),
+        pc.match_substring_regex(descricoes, r'[\p{L}\p{N}]')  # mesmo conjunto de str.isalnum no BMP
+    )
+    return pc.if_else(pc.and_not(validas, rejeitadas), descricoes, '')
+
+
+def limpar_serie(descricoes: "pd.Series") -> "pd.Series":
+    """Versão vetorizada de `limpar_descricao` para uma coluna inteira, com o mesmo resultado"""
+    return aplicar_em_serie(descricoes, _limpar_arrow, limpar_descricao)
@@ -1,30 +1,50 @@
-import re
-from typing import Optional
-from modules.shared.logger import logger
+from typing import TYPE_CHECKING, List, Optional
+from modules.shared.logger import obter_logger
+from modules.shared.regras_limpeza import (
+    aplicar_em_serie, aplicar_regras, aplicar_regras_arrow, compilar_regras, remover_espacos_borda
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = obter_logger(__name__)
+
+# Regras em ordem de prioridade, todas substituídas por espaço
+REGRAS_MENSAGEM = compilar_regras([
+    {"nome": "color", "padroes": [r'\{color:[^}]+\}'], "gatilhos": ["{color:"]},                # {color:#5b5b5b}
+    {"nome": "url", "padroes": [r'https?://\S+'], "gatilhos": ["://"]},                          # URLs
+    {"nome": "imagem", "padroes": [r'\|!https?://[^|]+\!\|'], "gatilhos": ["|!"]},              # |!http...!|
+    {"nome": "tabela_vazia", "padroes": [r'\|\s*\|'], "gatilhos": ["|"]},                        # | |
+    {"nome": "adf", "padroes": [r'\{adf\}.*?\{adf\}'], "gatilhos": ["{adf}"]},                   # {adf}...{adf}
+    {"nome": "gccode", "padroes": [r'<\[ #gccode#[^\]]+#!'], "gatilhos": ["<[ #gccode#"]},      # <[ #gccode#...#!
+    # Equivale a trocar quebras de linha por espaço e depois colapsar 2+ espaços:
+    # sequências com 2+ espaços viram um espaço, e uma quebra isolada também
+    {"nome": "espacos", "padroes": [r'\s{2,}', r'[\r\n]']},
+], substituicao=' ')
+
 
 def limpar_mensagem(mensagem: Optional[str]) -> str:
     """Limpa mensagens do Jira removendo padrões indesejados"""
-    if not mensagem:
+    if not isinstance(mensagem, str) or not mensagem:
         return ""
     
     try:
-        # Lista de padrões a serem removidos (em ordem de prioridade)
-        padroes = [
-            r'\{color:[^}]+\}',          # {color:#5b5b5b}
-            r'https?://\S+',              # URLs
-            r'\|!https?://[^|]+\!\|',     # |!http...!|
-            r'\|\s*\|',                   # | |
-            r'\{adf\}.*?\{adf\}',         # {adf}...{adf}
-            r'<\[ #gccode#[^\]]+#!',      # <[ #gccode#...#!
-            r'[\r\n]+',                   # Quebras de linha
-            r'\s{2,}'                     # Múltiplos espaços
-        ]
-        
-        for padrao in padroes:
-            mensagem = re.sub(padrao, ' ', mensagem)
-            
-        return mensagem.strip()
+        return aplicar_regras(mensagem, REGRAS_MENSAGEM).strip()
     
     except Exception as e:
         logger.error(f"Erro ao limpar mensagem: {str(e)}")
-        return mensagem  # Retorna original em caso de erro
\ No newline at end of file
+        return mensagem  # Retorna original em caso de erro
+
+
+def limpar_lote(mensagens: List[Optional[str]]) -> List[str]:
+    """Aplica `limpar_mensagem` a uma lista de mensagens"""
+    return [limpar_mensagem(mensagem) for mensagem in mensagens]
+
+
+def _limpar_arrow(mensagens):
+    return remover_espacos_borda(aplicar_regras_arrow(mensagens, REGRAS_MENSAGEM))
+
+
+def limpar_serie(mensagens: "pd.Series") -> "pd.Series":
+    """Versão vetorizada de `limpar_mensagem` para uma coluna inteira, com o mesmo resultado"""
+    return aplicar_em_serie(mensagens, _limpar_arrow, limpar_mensagem)
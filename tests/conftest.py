@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+# Antes de qualquer import de `modules`: o logger abre o LOG_FILE ao ser importado,
+# e o app.log do repositório não deve receber a saída dos testes (nem dos subprocessos)
+os.environ["LOG_FILE"] = os.path.join(tempfile.mkdtemp(prefix="apolo_testes_"), "app.log")
+
+import threading
+import time
+from typing import Optional
+
+import pytest
+
+from modules.exportacao import service as exportacao
+from modules.importacao import controller as importacao_controller
+from modules.importacao import service as importacao
+from modules.saude import service as saude
+from modules.servidor import service as servidor
+
+# Módulos que usam o Anonimizador pelo nome importado
+MODULOS_ANONIMIZADOR = (exportacao, importacao, importacao_controller, saude, servidor)
+
+
+class AnonimizadorFalso:
+    """Anonimizador sem modelo spaCy, singleton como o original.
+
+    A fixture `anonimizador_falso` entrega uma subclasse nova a cada teste, que
+    pode ajustar nela:
+      - `anonimizar`: saída de cada texto (por padrão, o texto em maiúsculas);
+      - `atraso_s`: tempo gasto em cada texto, simulando o NER;
+      - `carregamento`: Event aguardado na primeira construção, simulando o carregamento do modelo;
+      - `erro`: exceção lançada na construção.
+    """
+    instancia = None
+    anonimizar = staticmethod(str.upper)
+    atraso_s = 0.0
+    carregamento: Optional[threading.Event] = None
+    erro: Optional[Exception] = None
+
+    def __new__(cls):
+        if cls.instancia is None:
+            if cls.erro is not None:
+                raise cls.erro
+            if cls.carregamento is not None:
+                cls.carregamento.wait(5)
+            instancia = super().__new__(cls)
+            instancia.cache = "cache herdado"
+            cls.instancia = instancia
+        return cls.instancia
+
+    @classmethod
+    def carregado(cls) -> bool:
+        return cls.instancia is not None
+
+    @staticmethod
+    def versao_configuracao() -> str:
+        return "v1"
+
+    def anonimizar_texto(self, texto: Optional[str]) -> str:
+        time.sleep(self.atraso_s)
+        return type(self).anonimizar(texto) if texto else ""
+
+    def anonimizar_lote(self, textos):
+        return [self.anonimizar_texto(texto) for texto in textos]
+
+
+@pytest.fixture
+def anonimizador_falso(monkeypatch):
+    """Substitui o Anonimizador em todos os módulos que o importam"""
+    falso = type("AnonimizadorFalso", (AnonimizadorFalso,), {})
+    for modulo in MODULOS_ANONIMIZADOR:
+        monkeypatch.setattr(modulo, "Anonimizador", falso)
+    return falso
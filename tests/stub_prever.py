@@ -0,0 +1,43 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubPrever:
+    """Servidor /prever local que registra os chamados recebidos"""
+
+    def __init__(self, falhas_iniciais=0, atraso_s=0.0, status_falha=500):
+        self.recebidos = []
+        self.requisicoes = 0
+        self.falhas_iniciais = falhas_iniciais
+        self.status_falha = status_falha
+        self.atraso_s = atraso_s
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requisicoes += 1
+                    falhar = stub.requisicoes <= stub.falhas_iniciais
+                    if not falhar:
+                        stub.recebidos.extend(corpo["chamados"])
+                time.sleep(stub.atraso_s)
+                self.send_response(stub.status_falha if falhar else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}/prever"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
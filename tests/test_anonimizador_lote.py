@@ -0,0 +1,95 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+pytest.importorskip("presidio_analyzer")
+
+from spacy.language import Language
+from spacy.tokens import Span
+
+from modules.anonimo import cache, modelo
+from modules.anonimo import service as anonimo
+from modules.anonimo.service import Anonimizador
+
+GATILHOS = {"colaborador", "cliente"}
+
+TEXTOS = [
+    "O colaborador João Silva pediu acesso. João Silva não recebeu a senha.",
+    "Cliente Maria Souza, CPF 529.982.247-25, e-mail maria@empresa.com.br",
+    "",
+    None,
+    "Solicito acesso ao sistema de vendas",
+    "Telefone (11) 98765-4321 para retorno",
+    "O colaborador Pedro Alves Costa saiu de férias",
+]
+
+
+@Language.component("nomes_apos_gatilho")
+def nomes_apos_gatilho(doc):
+    """NER determinístico: as duas palavras capitalizadas depois de "colaborador"/"cliente" são PER"""
+    entidades = []
+    for token in doc[:-2]:
+        seguintes = doc[token.i + 1:token.i + 3]
+        if token.lower_ in GATILHOS and all(t.is_title for t in seguintes):
+            entidades.append(Span(doc, token.i + 1, token.i + 3, label="PER"))
+    doc.ents = entidades
+    return doc
+
+
+@pytest.fixture(scope="module")
+def caminho_modelo(tmp_path_factory):
+    nlp = spacy.blank("pt")
+    nlp.add_pipe("nomes_apos_gatilho")
+    caminho = tmp_path_factory.mktemp("modelo") / "pt_nomes"
+    nlp.to_disk(caminho)
+    return str(caminho)
+
+
+@pytest.fixture
+def criar_anonimizador(caminho_modelo, monkeypatch):
+    """Anonimizador novo sobre o pipeline de teste, sem cache, no modo de pipeline pedido"""
+    monkeypatch.setattr(modelo, "MODELO_SPACY", caminho_modelo)
+    monkeypatch.setattr(cache, "BACKEND", "desligado")
+
+    def criar(compartilhado: bool) -> Anonimizador:
+        monkeypatch.setattr(anonimo, "PIPELINE_COMPARTILHADO", compartilhado)
+        monkeypatch.setattr(Anonimizador, "_instance", None)
+        return Anonimizador()
+
+    return criar
+
+
+def test_pipeline_compartilhado_busca_nomes_no_texto_original(criar_anonimizador):
+    """O NER só marca o primeiro "João Silva"; o compartilhado troca também a repetição"""
+    texto = TEXTOS[0]
+    compartilhado = criar_anonimizador(True)
+    esperado = "O colaborador <PERSON> pediu acesso. <PERSON> não recebeu a senha."
+    assert compartilhado.anonimizar_texto(texto) == esperado
+    assert compartilhado.anonimizar_lote([texto]) == [esperado]
+    assert compartilhado.analyzer.nlp_engine.nlp["pt"] is compartilhado.nlp
+
+    # Na segunda passada o NER vê "<PERSON>" no lugar do gatilho e não acha a repetição
+    separado = criar_anonimizador(False)
+    assert separado.anonimizar_texto(texto) == "O colaborador <PERSON> pediu acesso. João Silva não recebeu a senha."
+    assert separado.analyzer.nlp_engine.nlp["pt"] is not separado.nlp
+
+
+@pytest.mark.parametrize("compartilhado", [True, False], ids=["compartilhado", "separado"])
+def test_lote_igual_a_textos_individuais(criar_anonimizador, compartilhado):
+    anonimizador = criar_anonimizador(compartilhado)
+    assert anonimizador.anonimizar_lote(TEXTOS) == [anonimizador.anonimizar_texto(t) for t in TEXTOS]
+    assert anonimizador.anonimizar_lote(["", None]) == ["", ""]
+
+
+def test_pipeline_compartilhado_repassa_batch_size_e_n_process(criar_anonimizador, monkeypatch):
+    anonimizador = criar_anonimizador(True)
+    pipe_original = anonimizador.nlp.pipe
+    chamadas = []
+
+    def pipe(textos, **kwargs):
+        chamadas.append(kwargs)
+        return pipe_original(textos, **kwargs)
+
+    monkeypatch.setattr(anonimizador.nlp, "pipe", pipe)
+    anonimizador.anonimizar_lote(TEXTOS, batch_size=7, n_process=1)
+
+    assert [(c["batch_size"], c["n_process"]) for c in chamadas] == [(7, 1)]
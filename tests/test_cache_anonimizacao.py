@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+import mongomock
+from modules.anonimo import cache as cache_modulo
+from modules.anonimo import service as anonimo
+from modules.anonimo import triagem
+from modules.anonimo.cache import CacheAnonimizacao
+from modules.anonimo.service import Anonimizador
+from modules.importacao import service as importacao
+from modules.shared import database
+
+
+def test_lru_descarta_a_entrada_menos_usada():
+    cache = CacheAnonimizacao("v1", backend="memoria", tamanho_memoria=2)
+    cache.guardar("a", "A")
+    cache.guardar("b", "B")
+    assert cache.obter("a") == "A"
+    cache.guardar("c", "C")
+
+    assert cache.obter("b") is None
+    assert cache.obter("a") == "A"
+    assert cache.obter("c") == "C"
+    assert cache.estatisticas()["hits_memoria"] == 3
+    assert cache.estatisticas()["misses"] == 1
+
+
+def test_nivel_em_disco_sobrevive_entre_instancias_e_invalida_por_versao(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_modulo, "ARQUIVO", str(tmp_path / "cache.sqlite3"))
+
+    CacheAnonimizacao("v1", backend="disco").guardar("Olá João Silva", "Olá <PERSON>")
+
+    mesma_versao = CacheAnonimizacao("v1", backend="disco")
+    assert mesma_versao.obter("Olá João Silva") == "Olá <PERSON>"
+    assert mesma_versao.estatisticas()["hits_persistente"] == 1
+
+    nova_versao = CacheAnonimizacao("v2", backend="disco")
+    assert nova_versao.obter("Olá João Silva") is None
+
+
+def test_nivel_em_disco_respeita_limite_de_entradas(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_modulo, "ARQUIVO", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(cache_modulo, "MAX_PERSISTENTE", 10)
+    monkeypatch.setattr(cache_modulo, "_INTERVALO_EVICCAO", 5)
+
+    cache = CacheAnonimizacao("v1", backend="disco", tamanho_memoria=0)
+    for i in range(30):
+        cache.guardar(f"texto {i}", f"resultado {i}")
+
+    total = cache._persistente._conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    assert total == 10
+    assert cache.obter("texto 29") == "resultado 29"
+    assert cache.obter("texto 0") is None
+
+
+def test_cache_desligado_nao_armazena():
+    cache = CacheAnonimizacao("v1", backend="desligado")
+    cache.guardar("a", "A")
+    assert cache.obter("a") is None
+
+
+def test_worker_do_pool_reabre_o_nivel_persistente_herdado(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_modulo, "ARQUIVO", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(cache_modulo, "BACKEND", "disco")
+    herdado = CacheAnonimizacao("v1")
+    anonimizador = object.__new__(Anonimizador)
+    anonimizador._inicializado = True
+    anonimizador.cache = herdado
+    monkeypatch.setattr(Anonimizador, "_instance", anonimizador)
+    monkeypatch.setattr(database, "_client", object())
+
+    importacao.inicializar_worker()
+
+    assert database._client is None
+    assert anonimizador.cache is not herdado
+    assert anonimizador.cache.versao == Anonimizador.versao_configuracao()
+
+
+def test_nivel_mongo_so_atualiza_o_acesso_quando_ele_envelhece(monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(cache_modulo, "get_db", lambda: banco)
+    cache = CacheAnonimizacao("v1", backend="mongo", tamanho_memoria=0)
+    cache.guardar("Olá João Silva", "Olá <PERSON>")
+    colecao = banco[cache_modulo.COLECAO]
+    gravado = colecao.find_one()["acessado"]
+
+    assert cache.obter("Olá João Silva") == "Olá <PERSON>"
+    assert colecao.find_one()["acessado"] == gravado
+
+    antigo = datetime.now(timezone.utc) - timedelta(hours=2)
+    colecao.update_one({}, {"$set": {"acessado": antigo}})
+    assert cache.obter("Olá João Silva") == "Olá <PERSON>"
+    assert colecao.find_one()["acessado"] > antigo.replace(tzinfo=None)
+
+
+def test_nivel_em_disco_so_atualiza_o_acesso_quando_ele_envelhece(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_modulo, "ARQUIVO", str(tmp_path / "cache.sqlite3"))
+    cache = CacheAnonimizacao("v1", backend="disco", tamanho_memoria=0)
+    cache.guardar("Olá João Silva", "Olá <PERSON>")
+    conexao = cache._persistente._conexao
+    gravado = conexao.execute("SELECT acessado FROM cache").fetchone()[0]
+
+    assert cache.obter("Olá João Silva") == "Olá <PERSON>"
+    assert conexao.execute("SELECT acessado FROM cache").fetchone()[0] == gravado
+
+    antigo = gravado - timedelta(hours=2).total_seconds()
+    conexao.execute("UPDATE cache SET acessado = ?", (antigo,))
+    assert cache.obter("Olá João Silva") == "Olá <PERSON>"
+    assert conexao.execute("SELECT acessado FROM cache").fetchone()[0] > antigo
+
+
+def test_nivel_em_disco_mantem_outra_versao_ate_ela_expirar(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_modulo, "ARQUIVO", str(tmp_path / "cache.sqlite3"))
+    anterior = CacheAnonimizacao("v1", backend="disco", tamanho_memoria=0)
+    anterior.guardar("Olá João Silva", "Olá <PERSON>")
+
+    # Deploy gradual: a versão nova sobe enquanto a anterior ainda atende
+    CacheAnonimizacao("v2", backend="disco")
+    assert anterior.obter("Olá João Silva") == "Olá <PERSON>"
+
+    expirado = (datetime.now() - timedelta(hours=25)).timestamp()
+    anterior._persistente._conexao.execute("UPDATE cache SET acessado = ?", (expirado,))
+    CacheAnonimizacao("v2", backend="disco")
+    assert anterior.obter("Olá João Silva") is None
+
+
+def test_nivel_mongo_mantem_outra_versao_ate_ela_expirar(monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(cache_modulo, "get_db", lambda: banco)
+    anterior = CacheAnonimizacao("v1", backend="mongo", tamanho_memoria=0)
+    anterior.guardar("Olá João Silva", "Olá <PERSON>")
+
+    CacheAnonimizacao("v2", backend="mongo")
+    assert anterior.obter("Olá João Silva") == "Olá <PERSON>"
+
+    banco[cache_modulo.COLECAO].update_one(
+        {}, {"$set": {"acessado": datetime.now(timezone.utc) - timedelta(hours=25)}}
+    )
+    CacheAnonimizacao("v2", backend="mongo")
+    assert anterior.obter("Olá João Silva") is None
+
+
+def test_versao_muda_com_as_correcoes_e_as_palavras_da_triagem(monkeypatch):
+    original = Anonimizador.versao_configuracao()
+
+    monkeypatch.setattr(anonimo, "CORRECOES", {**anonimo.CORRECOES, "<LOCATION> e": "e"})
+    com_correcao = Anonimizador.versao_configuracao()
+    monkeypatch.setattr(triagem, "PALAVRAS_COMUNS", triagem.PALAVRAS_COMUNS | {"Chamado"})
+    com_palavra = Anonimizador.versao_configuracao()
+
+    assert len({original, com_correcao, com_palavra}) == 3
@@ -0,0 +1,19 @@
+from benchmarks.corpus import gerar_chamados
+from modules.tratamento_mensagem.service import limpar_mensagem
+
+
+def test_corpus_e_deterministico_pela_semente():
+    assert gerar_chamados(50, semente=7) == gerar_chamados(50, semente=7)
+    assert gerar_chamados(50, semente=7) != gerar_chamados(50, semente=8)
+
+
+def test_corpus_cobre_marcacao_do_jira_e_dados_pessoais():
+    mensagens = "\n".join(c["mensagem"] for c in gerar_chamados(300))
+    for trecho in ("{color:", "{adf}", "#gccode#", "|!https://", "anexos", "CPF ", "@", "telefone ("):
+        assert trecho in mensagens
+
+
+def test_limpeza_remove_a_marcacao_do_corpus():
+    for chamado in gerar_chamados(300):
+        limpa = limpar_mensagem(chamado["mensagem"])
+        assert "{color:" not in limpa and "{adf}" not in limpa and "\n" not in limpa
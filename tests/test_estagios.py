@@ -0,0 +1,161 @@
+import pstats
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from modules.shared import estagios, metricas
+from modules.shared.estagios import Estagio, GrafoEstagios, Interrompido
+
+
+def _profundidade(estagio):
+    return REGISTRY.get_sample_value("apolo_fila_estagio_itens", {"estagio": estagio}) or 0
+
+
+def test_itens_passam_por_todos_os_estagios():
+    saida = []
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_dobro", lambda x: x * 2, concorrencia=3),
+        Estagio("t_impar", lambda x: x + 1 if x % 4 else None),
+        Estagio("t_coleta", saida.append, concorrencia=2),
+    ])
+    grafo.executar(range(100))
+
+    assert sorted(saida) == [x * 2 + 1 for x in range(100) if (x * 2) % 4]
+    assert all(_profundidade(nome) == 0 for nome in ("t_dobro", "t_impar", "t_coleta"))
+
+
+def test_estagios_se_sobrepoem():
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_io", lambda x: time.sleep(0.02) or x),
+        Estagio("t_cpu", lambda x: time.sleep(0.02)),
+    ])
+    inicio = time.perf_counter()
+    grafo.executar(range(20))
+
+    # Em série seriam 0,8 s; com os dois estágios em paralelo, perto de 0,42 s
+    assert time.perf_counter() - inicio < 0.65
+
+
+def test_fila_limitada_aplica_contrapressao_na_entrada():
+    lidos, concluidos = [], []
+    em_memoria = []
+
+    def entrada():
+        for i in range(30):
+            lidos.append(i)
+            em_memoria.append(len(lidos) - len(concluidos))
+            yield i
+
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_rapido", lambda x: x, capacidade=2),
+        Estagio("t_lento", lambda x: time.sleep(0.005) or concluidos.append(x), capacidade=2),
+    ])
+    grafo.executar(entrada())
+
+    assert len(concluidos) == 30
+    # Filas de 2 itens, um em cada thread e um bloqueado no put: nunca mais que isso à frente
+    assert max(em_memoria) <= 2 + 2 + 2 + 1 + 1
+
+
+def test_erro_em_um_estagio_aborta_e_e_relancado():
+    def falhar(x):
+        if x == 5:
+            raise ValueError("lote inválido")
+        return x
+
+    lidos = []
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_falha", falhar, capacidade=2),
+        Estagio("t_fim", lambda x: time.sleep(0.01), capacidade=2),
+    ])
+
+    def entrada():
+        for i in range(1000):
+            lidos.append(i)
+            yield i
+
+    with pytest.raises(ValueError, match="lote inválido"):
+        grafo.executar(entrada())
+    assert len(lidos) < 1000
+    assert _profundidade("t_falha") == 0 and _profundidade("t_fim") == 0
+
+
+def test_erro_na_entrada_e_relancado():
+    def entrada():
+        yield 1
+        raise ConnectionError("cursor perdido")
+
+    with pytest.raises(ConnectionError):
+        GrafoEstagios("teste", [Estagio("t_unico", lambda x: x)]).executar(entrada())
+
+
+def test_parar_drena_o_que_ja_foi_lido():
+    lidos, concluidos = [], []
+
+    def entrada():
+        for i in range(1000):
+            lidos.append(i)
+            yield i
+
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_lento", lambda x: time.sleep(0.005) or x),
+        Estagio("t_final", concluidos.append),
+    ])
+    executor = threading.Thread(target=lambda: pytest.raises(Interrompido, grafo.executar, entrada()))
+    executor.start()
+    time.sleep(0.05)
+    assert estagios.parar_todos(timeout=5)
+    executor.join()
+
+    assert 0 < len(lidos) < 1000
+    assert sorted(concluidos) == lidos
+
+
+def test_event_externo_para_o_grafo():
+    parar, concluidos = threading.Event(), []
+
+    def entrada():
+        for i in range(1000):
+            if i == 10:
+                parar.set()
+            yield i
+
+    grafo = GrafoEstagios("teste", [Estagio("t_final", concluidos.append)], parar=parar)
+    with pytest.raises(Interrompido):
+        grafo.executar(entrada())
+
+    assert sorted(concluidos) == list(range(11))
+
+
+def test_injetar_pula_os_estagios_anteriores():
+    saida = []
+    grafo = GrafoEstagios("teste", [
+        Estagio("t_marca", lambda x: f"processado {x}"),
+        Estagio("t_saida", saida.append),
+    ])
+
+    def entrada():
+        yield 1
+        grafo.injetar("t_saida", "direto")
+        yield 2
+
+    grafo.executar(entrada())
+
+    assert sorted(saida) == ["direto", "processado 1", "processado 2"]
+
+
+def test_perfilar_inclui_as_threads_dos_estagios(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, "PERFIL_DIR", str(tmp_path))
+
+    def limpar_no_estagio(item):
+        return sum(range(item))
+
+    grafo = GrafoEstagios("perfil", [Estagio("limpeza", limpar_no_estagio, concorrencia=2)])
+    with metricas.perfilar("job_estagios"):
+        grafo.executar(range(100, 110))
+
+    funcoes = {funcao for _, _, funcao in pstats.Stats(str(tmp_path / "job_estagios.prof")).stats}
+    assert "limpar_no_estagio" in funcoes
+    assert metricas.sessao_perfil() is None
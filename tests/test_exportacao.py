@@ -0,0 +1,105 @@
+import json
+import os
+
+import mongomock
+import pandas as pd
+import pytest
+
+from modules.exportacao import service as exportacao
+from modules.importacao import service as importacao
+
+
+@pytest.fixture(autouse=True)
+def anonimizar_nomes(anonimizador_falso):
+    anonimizador_falso.anonimizar = lambda texto: texto.replace("João Silva", "<PERSON>")
+
+
+def _chamados(quantidade):
+    return [{"chamadoId": f"SUP-{i}", "mensagem": f"Tarefa: João Silva relatou o erro {i}"} for i in range(quantidade)]
+
+
+def _ler_saida(saida):
+    return pd.concat(pd.read_parquet(caminho) for caminho in sorted(saida.glob("parte-*.parquet")))
+
+
+def test_jsonl_exportado_em_shards_e_retomado_apos_interrupcao(tmp_path, monkeypatch):
+    entrada = tmp_path / "interacoes.jsonl"
+    entrada.write_text("\n".join(json.dumps(c) for c in _chamados(25)), encoding="utf-8")
+    saida = tmp_path / "dataset"
+
+    gravar_shard = exportacao.gravar_shard
+
+    def interromper_no_terceiro(saida_, numero, tabela):
+        if numero == 2:
+            raise KeyboardInterrupt
+        return gravar_shard(saida_, numero, tabela)
+
+    monkeypatch.setattr(exportacao, "gravar_shard", interromper_no_terceiro)
+    with pytest.raises(KeyboardInterrupt):
+        exportacao.exportar(str(entrada), str(saida), workers=1, tamanho_shard=10)
+    monkeypatch.setattr(exportacao, "gravar_shard", gravar_shard)
+
+    resumo = exportacao.exportar(str(entrada), str(saida), workers=1, tamanho_shard=10)
+
+    assert resumo["shards"] == 3 and resumo["lidos"] == 25
+    tabela = _ler_saida(saida)
+    assert list(tabela.columns) == exportacao.COLUNAS
+    assert tabela["chamadoId"].tolist() == [f"SUP-{i}" for i in range(25)]
+    assert tabela["descricao_dataset"].iloc[0] == "<PERSON> relatou o erro 0"
+
+
+def test_shards_preparados_e_gravados_nos_workers(tmp_path, monkeypatch):
+    entrada = tmp_path / "interacoes.jsonl"
+    entrada.write_text("\n".join(json.dumps(c) for c in _chamados(25)), encoding="utf-8")
+    pids = tmp_path / "pids"
+    preparar_shard = exportacao.preparar_shard
+
+    def registrar_pid(shard):
+        with open(pids, "a") as arquivo:
+            arquivo.write(f"{os.getpid()}\n")
+        return preparar_shard(shard)
+
+    monkeypatch.setattr(exportacao, "preparar_shard", registrar_pid)
+    resumo = exportacao.exportar(str(entrada), str(tmp_path / "dataset"), workers=2, tamanho_shard=10)
+
+    assert resumo["shards"] == 3 and resumo["lidos"] == 25
+    assert str(os.getpid()) not in pids.read_text().split()
+    tabela = _ler_saida(tmp_path / "dataset")
+    assert tabela["chamadoId"].tolist() == [f"SUP-{i}" for i in range(25)]
+    assert tabela["descricao_dataset"].iloc[24] == "<PERSON> relatou o erro 24"
+
+
+def test_mongo_retoma_pelo_ultimo_id(tmp_path, monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    banco["interacoes"].insert_many(_chamados(12))
+    monkeypatch.setattr(exportacao, "get_db", lambda: banco)
+    saida = tmp_path / "dataset"
+
+    exportacao.exportar("mongo", str(saida), workers=1, tamanho_shard=5)
+    banco["interacoes"].insert_many([{"chamadoId": "SUP-novo", "mensagem": "Tarefa: novo"}])
+    resumo = exportacao.exportar("mongo", str(saida), workers=1, tamanho_shard=5)
+
+    assert resumo["lidos"] == 13
+    assert _ler_saida(saida)["chamadoId"].tolist()[-1] == "SUP-novo"
+
+
+def test_checkpoint_de_outra_entrada_e_rejeitado(tmp_path):
+    entrada = tmp_path / "a.jsonl"
+    entrada.write_text(json.dumps(_chamados(1)[0]), encoding="utf-8")
+    exportacao.exportar(str(entrada), str(tmp_path / "saida"), workers=1)
+
+    with pytest.raises(exportacao.CheckpointIncompativel):
+        exportacao.exportar("mongo", str(tmp_path / "saida"), workers=1)
+
+
+def test_shard_vetorizado_equivale_ao_processar_lote():
+    from benchmarks.corpus import gerar_chamados
+
+    shard = gerar_chamados(300) + [{"chamadoId": "SUP-vazio", "mensagem": None}]
+    tabela = exportacao.preparar_shard(shard)
+    tabela["descricao_dataset"] = exportacao.anonimizar_lote(tabela["descricao_dataset"].tolist())
+
+    esperado = importacao.processar_lote(shard)
+    assert tabela[exportacao.COLUNAS].to_dict("records") == [
+        {coluna: r[coluna] for coluna in exportacao.COLUNAS} for r in esperado
+    ]
@@ -0,0 +1,131 @@
+import mongomock
+import pytest
+from pymongo.errors import BulkWriteError
+
+from modules.importacao import service
+from modules.shared import database
+from modules.nova_tabela_descricao_dataset import service as extracao
+
+
+@pytest.fixture
+def db(anonimizador_falso):
+    anonimizador_falso.anonimizar = str
+    banco = mongomock.MongoClient()["teste"]
+    banco["interacoes"].insert_many([
+        {"chamadoId": str(i), "mensagem": f"Tarefa: Erro ao emitir a nota {i}"} for i in range(4)
+    ])
+    return banco
+
+
+def _executar(db, ids=("0", "1", "2", "3")):
+    reenviados = []
+    itens = list(service.iterar_pendentes(db, list(ids), reenviar=reenviados.append))
+    resultados = service.processar_lote(itens) if itens else []
+    service.salvar_resultados(db, resultados)
+    return resultados, reenviados
+
+
+def _prever(db, *ids):
+    db["interacoes_processadas"].update_many(
+        {"chamadoId": {"$in": list(ids)}}, {"$set": {"emocao": "neutro", "tipoChamado": "erro"}}
+    )
+
+
+def test_reexecucao_sem_mudancas_nao_reprocessa(db):
+    resultados, _ = _executar(db)
+    assert len(resultados) == 4
+    assert all(r["precisa_previsao"] for r in resultados)
+
+    _prever(db, "0", "1")
+    resultados, reenviados = _executar(db)
+
+    assert resultados == []
+    assert sorted(r["chamadoId"] for r in reenviados) == ["2", "3"]
+    assert reenviados[0]["descricao"].startswith("Erro ao emitir")
+
+
+def test_mensagem_editada_e_reprocessada_e_perde_a_previsao(db):
+    _executar(db)
+    _prever(db, "0", "1", "2", "3")
+    db["interacoes"].update_one({"chamadoId": "1"}, {"$set": {"mensagem": "Tarefa: Outro problema"}})
+
+    resultados, reenviados = _executar(db)
+
+    assert [r["chamadoId"] for r in resultados] == ["1"]
+    assert resultados[0]["precisa_previsao"]
+    assert reenviados == []
+    assert "emocao" not in db["interacoes_processadas"].find_one({"chamadoId": "1"})
+
+
+def test_nova_versao_com_mesma_descricao_mantem_a_previsao(db, monkeypatch):
+    _executar(db)
+    _prever(db, "0", "1", "2", "3")
+    monkeypatch.setattr(service, "VERSAO_PIPELINE", "outra")
+
+    resultados, _ = _executar(db)
+
+    assert len(resultados) == 4
+    assert not any(r["precisa_previsao"] for r in resultados)
+    documento = db["interacoes_processadas"].find_one({"chamadoId": "0"})
+    assert documento["versaoPipeline"] == "outra"
+    assert documento["emocao"] == "neutro"
+
+
+def test_versao_do_pipeline_muda_com_os_padroes_da_extracao(monkeypatch):
+    original = service.versao_pipeline()
+    monkeypatch.setattr(extracao, "LIMITE_RESUMO", 300)
+    assert service.versao_pipeline() != original
+
+
+def test_indice_de_chamado_processado_vira_unico(db, monkeypatch):
+    monkeypatch.setattr(database, "get_db", lambda: db)
+    db["interacoes_processadas"].create_index("chamadoId")
+
+    database.garantir_indices()
+
+    assert db["interacoes_processadas"].index_information()["chamadoId_1"].get("unique")
+
+
+def test_indice_unico_com_duplicatas_mantem_o_simples(db, monkeypatch):
+    monkeypatch.setattr(database, "get_db", lambda: db)
+    db["interacoes_processadas"].insert_many([{"chamadoId": "0"}, {"chamadoId": "0"}])
+
+    with pytest.raises(RuntimeError, match="duplicados"):
+        database.garantir_indices()
+
+    assert "chamadoId_1" in db["interacoes_processadas"].index_information()
+
+
+class _ColecaoComCorrida:
+    """Na primeira escrita, o upsert do chamado "0" perde a corrida para outro processo"""
+
+    def __init__(self, colecao):
+        self.colecao = colecao
+        self.escritas = []
+
+    def bulk_write(self, operacoes, ordered):
+        self.escritas.append(len(operacoes))
+        if len(self.escritas) == 1:
+            self.colecao.insert_one({"chamadoId": "0"})
+            self.colecao.bulk_write(operacoes[1:], ordered=ordered)
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000"}]})
+        return self.colecao.bulk_write(operacoes, ordered=ordered)
+
+
+def test_upsert_que_perde_a_corrida_e_repetido(db):
+    db["interacoes_processadas"].create_index("chamadoId", unique=True)
+    itens = list(service.iterar_pendentes(db, ["0", "1"]))
+    colecao = _ColecaoComCorrida(db["interacoes_processadas"])
+
+    service.salvar_resultados({"interacoes_processadas": colecao}, service.processar_lote(itens))
+
+    assert colecao.escritas == [2, 1]
+    documentos = list(db["interacoes_processadas"].find({}, {"_id": 0, "chamadoId": 1, "versaoPipeline": 1}))
+    assert sorted(d["chamadoId"] for d in documentos) == ["0", "1"]
+    assert all(d["versaoPipeline"] == service.VERSAO_PIPELINE for d in documentos)
+
+
+def test_outros_erros_de_escrita_sao_repassados():
+    erro = BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "validação"}]})
+    with pytest.raises(BulkWriteError):
+        service._upserts_repetir(erro, [])
@@ -0,0 +1,167 @@
+import logging
+import time
+from datetime import datetime
+
+import mongomock
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from modules.ingestao import service as ingestao
+from modules.shared.estagios import Interrompido
+
+
+@pytest.fixture
+def db(monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(ingestao, "get_db", lambda: banco)
+    monkeypatch.setattr(ingestao, "ESPERA_S", 0.01)
+    monkeypatch.setattr(ingestao, "PAUSA_MAX_S", 0.02)
+    return banco
+
+
+def _aguardar(condicao, timeout=3):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert condicao()
+
+
+def test_polling_processa_inserts_novos_e_grava_a_posicao(db, monkeypatch):
+    monkeypatch.setattr(ingestao, "LOTE", 3)
+    db["interacoes"].insert_one({"_id": ObjectId.from_datetime(datetime(2020, 1, 1)), "chamadoId": "antigo"})
+    lotes = []
+    consumidor = ingestao.IngestaoContinua(lambda ids: lotes.append(ids) or {}, modo="polling")
+    consumidor.iniciar()
+    _aguardar(lambda: ingestao.carregar_estado().get("ultimoId") is not None)
+
+    db["interacoes"].insert_many([{"chamadoId": str(i)} for i in range(5)])
+    _aguardar(lambda: sum(map(len, lotes)) == 5)
+    consumidor.parar(timeout=1)
+
+    assert lotes == [["0", "1", "2"], ["3", "4"]]
+    assert ingestao.carregar_estado()["ultimoId"] == db["interacoes"].find_one({"chamadoId": "4"})["_id"]
+
+
+def test_micro_lote_e_repetido_enquanto_o_prever_falha(db):
+    resumos = iter([{"falhas_previsao": 2}, {"falhas_previsao": 1}, {"falhas_previsao": 0}])
+    chamadas = []
+
+    def processar(ids):
+        chamadas.append(ids)
+        return next(resumos)
+
+    consumidor = ingestao.IngestaoContinua(processar, modo="polling")
+    consumidor._lider.set()
+    assert consumidor._processar_micro_lote(["1", "2"]) is True
+    assert chamadas == [["1", "2"]] * 3
+
+
+class StreamFalso:
+    def __init__(self, eventos):
+        self.eventos = list(eventos)
+        self.resume_token = None
+
+    def try_next(self):
+        if not self.eventos:
+            time.sleep(0.005)
+            return None
+        evento = self.eventos.pop(0)
+        self.resume_token = evento["_id"]
+        return evento
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def test_change_stream_grava_o_resume_token_depois_do_micro_lote(db, monkeypatch):
+    eventos = [{"_id": {"_data": str(i)}, "fullDocument": {"chamadoId": str(i)}} for i in range(4)]
+    retomadas = []
+
+    def watch(*args, resume_after=None, **kwargs):
+        retomadas.append(resume_after)
+        return StreamFalso(eventos)
+
+    colecao = db["interacoes"]
+    monkeypatch.setattr(type(colecao), "watch", lambda self, *a, **k: watch(*a, **k), raising=False)
+    processados = []
+    consumidor = ingestao.IngestaoContinua(lambda ids: processados.extend(ids) or {}, modo="change_stream")
+    consumidor.iniciar()
+    _aguardar(lambda: (ingestao.carregar_estado().get("resumeToken") or {}).get("_data") == "3")
+    consumidor.parar(timeout=1)
+
+    assert processados == ["0", "1", "2", "3"]
+    assert retomadas[0] is None
+
+
+def test_modo_auto_cai_para_polling_sem_replica_set(db, monkeypatch):
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    monkeypatch.setattr(type(db["interacoes"]), "watch", watch, raising=False)
+    consumidor = ingestao.IngestaoContinua(lambda ids: {}, modo="auto")
+    consumidor.iniciar()
+    _aguardar(lambda: consumidor.modo == "polling")
+    consumidor.parar(timeout=1)
+
+
+def test_so_o_processo_com_o_lease_acompanha_as_interacoes(db, monkeypatch):
+    # Os dois consumidores rodam neste processo; cada um se identifica com um host diferente
+    monkeypatch.setattr(ingestao.socket, "gethostname", iter(["host-a", "host-b"]).__next__)
+    lotes = {"a": [], "b": []}
+    primeiro = ingestao.IngestaoContinua(lambda ids: lotes["a"].append(ids) or {}, modo="polling")
+    segundo = ingestao.IngestaoContinua(lambda ids: lotes["b"].append(ids) or {}, modo="polling")
+    primeiro.iniciar()
+    _aguardar(lambda: ingestao.carregar_estado().get("ultimoId") is not None)
+    segundo.iniciar()
+
+    db["interacoes"].insert_many([{"chamadoId": str(i)} for i in range(3)])
+    _aguardar(lambda: sum(map(len, lotes["a"])) == 3)
+    time.sleep(0.05)
+    assert lotes["b"] == []
+
+    # Ao parar, o lease é liberado e o outro processo assume sem esperar a expiração
+    primeiro.parar(timeout=1)
+    segundo._batimento.bater()
+    db["interacoes"].insert_one({"chamadoId": "novo"})
+    _aguardar(lambda: lotes["b"] == [["novo"]])
+    segundo.parar(timeout=1)
+
+
+def test_lease_expirado_pode_ser_assumido(db):
+    assert ingestao.reivindicar_lease("worker-1")
+    assert not ingestao.reivindicar_lease("worker-2")
+    db[ingestao.COLECAO_ESTADO].update_one(
+        {"_id": ingestao.ID_ESTADO}, {"$set": {"lease.expiraEm": datetime(2020, 1, 1)}}
+    )
+    assert ingestao.reivindicar_lease("worker-2")
+    assert not ingestao.reivindicar_lease("worker-1")
+
+
+def test_micro_lote_interrompido_no_desligamento_nao_e_tratado_como_erro(db, caplog):
+    chamadas = []
+    consumidor = ingestao.IngestaoContinua(lambda ids: None, modo="polling")
+
+    def processar(ids):
+        # Como no shutdown: a parada é pedida antes de parar_todos interromper o grafo
+        chamadas.append(ids)
+        consumidor.solicitar_parada()
+        raise Interrompido("importacao interrompido antes do fim da entrada")
+
+    consumidor.processar = processar
+    consumidor.iniciar()
+    _aguardar(lambda: ingestao.carregar_estado().get("ultimoId") is not None)
+    posicao = ingestao.carregar_estado()["ultimoId"]
+
+    with caplog.at_level(logging.INFO, logger="modules.ingestao"):
+        db["interacoes"].insert_many([{"chamadoId": "1"}, {"chamadoId": "2"}])
+        _aguardar(lambda: not consumidor._thread.is_alive())
+    consumidor.parar(timeout=1)
+
+    assert chamadas == [["1", "2"]]
+    # O micro-lote é reprocessado no próximo início
+    assert ingestao.carregar_estado()["ultimoId"] == posicao
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
@@ -0,0 +1,145 @@
+import time
+from datetime import timedelta
+import mongomock
+import pytest
+from modules.jobs import service as jobs
+
+
+@pytest.fixture
+def db(monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(jobs, "get_db", lambda: banco)
+    jobs.garantir_indices_jobs()
+    return banco
+
+
+def test_ids_ja_enfileirados_em_outro_job_sao_ignorados(db):
+    primeiro = jobs.criar_job(["1", "2", "3", "3"])
+    segundo = jobs.criar_job(["3", "4"])
+
+    assert primeiro["total"] == 3
+    assert segundo["total"] == 1
+    assert segundo["duplicados"] == ["3"]
+
+
+def test_job_abandonado_e_retomado_apos_expirar_o_lease(db):
+    job_id = jobs.criar_job(["1", "2"])["jobId"]
+    job = jobs.reivindicar_job()
+    assert job["_id"] == job_id
+    assert jobs.reivindicar_job() is None
+
+    db["jobs"].update_one({"_id": job_id}, {"$set": {"lease.dono": "outro", "lease.expiraEm": jobs._agora() - timedelta(seconds=1)}})
+    retomado = jobs.reivindicar_job()
+    assert retomado["_id"] == job_id
+    assert retomado["lease"]["dono"] == jobs.DONO
+
+
+def test_execucao_registra_progresso_e_libera_ids(db):
+    job_id = jobs.criar_job(["1", "2", "3"])["jobId"]
+
+    def processar(ids, ao_salvar, **_):
+        ao_salvar(ids[:2])
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+    estado = jobs.obter_job(job_id)
+
+    assert estado["status"] == jobs.CONCLUIDO
+    assert estado["processados"] == 2
+    assert estado["ignorados"] == 1
+    assert estado["progresso"] == 1.0
+    assert jobs.criar_job(["1"])["total"] == 1
+
+
+def test_cancelamento_interrompe_a_execucao(db):
+    job_id = jobs.criar_job(["1", "2"])["jobId"]
+    chamadas = []
+
+    def processar(ids, ao_salvar, **_):
+        jobs.cancelar_job(job_id)
+        for chamado_id in ids:
+            chamadas.append(chamado_id)
+            ao_salvar([chamado_id])
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+
+    assert chamadas == ["1"]
+    assert jobs.obter_job(job_id)["status"] == jobs.CANCELADO
+    assert jobs.cancelar_job(job_id) is False
+
+
+def test_interrupcao_no_desligamento_deixa_o_job_para_ser_retomado(db):
+    job_id = jobs.criar_job(["1", "2"])["jobId"]
+
+    def processar(ids, ao_salvar, **_):
+        ao_salvar(ids[:1])
+        raise jobs.Interrompido("desligamento")
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+    estado = jobs.obter_job(job_id)
+
+    assert estado["status"] == jobs.EXECUTANDO
+    assert estado["processados"] == 1
+    assert jobs.ids_pendentes(job_id) == ["2"]
+    # O lease é liberado: outro processo retoma o job sem esperar ele expirar
+    assert jobs.reivindicar_job()["_id"] == job_id
+
+
+def test_itens_com_erro_ficam_separados_dos_ignorados(db):
+    job_id = jobs.criar_job(["1", "2", "3"])["jobId"]
+
+    def processar(ids, ao_salvar, ao_falhar, **_):
+        ao_salvar(["1"])
+        ao_falhar(["2"], "falha ao gravar")
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+    estado = jobs.obter_job(job_id)
+
+    assert estado["status"] == jobs.CONCLUIDO
+    assert (estado["processados"], estado["falhas"], estado["ignorados"]) == (1, 1, 1)
+    assert estado["itens_por_status"] == {jobs.PROCESSADO: 1, jobs.ERRO: 1, jobs.IGNORADO: 1}
+    assert estado["progresso"] == 1.0
+    assert db["jobs_itens"].find_one({"jobId": job_id, "chamadoId": "2"})["erro"] == "falha ao gravar"
+
+
+def test_lease_assumido_por_outro_processo_para_o_job(db, monkeypatch):
+    monkeypatch.setattr(jobs, "LEASE_S", 0.3)
+    job_id = jobs.criar_job(["1", "2"])["jobId"]
+
+    def processar(ids, ao_salvar, parar, **_):
+        db["jobs"].update_one({"_id": job_id}, {"$set": {"lease.dono": "outro"}})
+        assert parar.wait(2)
+        raise jobs.Interrompido("lease perdido")
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+
+    job = db["jobs"].find_one({"_id": job_id})
+    assert job["status"] == jobs.EXECUTANDO and job["lease"]["dono"] == "outro"
+    assert jobs.ids_pendentes(job_id) == ["1", "2"]
+
+
+def test_lease_renovado_durante_lote_longo_sem_progresso(db, monkeypatch):
+    monkeypatch.setattr(jobs, "LEASE_S", 0.3)
+    job_id = jobs.criar_job(["1"])["jobId"]
+    expiracoes = []
+
+    def processar(ids, ao_salvar, **_):
+        for _ in range(4):
+            expiracoes.append(db["jobs"].find_one({"_id": job_id})["lease"]["expiraEm"])
+            time.sleep(0.15)
+        ao_salvar(ids)
+
+    jobs.executar_job(jobs.reivindicar_job(), processar)
+
+    assert len(set(expiracoes)) > 1
+    assert expiracoes[-1] > expiracoes[0]
+    assert jobs.obter_job(job_id)["status"] == jobs.CONCLUIDO
+
+
+def test_consumidor_nao_reivindica_jobs_depois_de_pedida_a_parada(db):
+    job_id = jobs.criar_job(["1"])["jobId"]
+    consumidor = jobs.ConsumidorJobs(lambda ids, ao_salvar, **_: ao_salvar(ids))
+    consumidor.solicitar_parada()
+    consumidor.iniciar()
+    consumidor.parar(timeout=1)
+
+    assert jobs.obter_job(job_id)["status"] == jobs.PENDENTE
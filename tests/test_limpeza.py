@@ -0,0 +1,28 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from modules.tratamento_mensagem.service import limpar_mensagem, limpar_lote as limpar_mensagens
+from modules.nova_tabela_descricao_dataset.service import extrair_descricao
+from modules.tratamento_descricao_dataset.service import limpar_descricao, limpar_lote as limpar_descricoes
+
+# Saídas geradas pelas versões de limpar_mensagem/limpar_descricao anteriores ao motor de regras
+CORPUS = json.loads((Path(__file__).parent / "dados" / "golden_limpeza.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("caso", CORPUS)
+def test_saida_identica_ao_corpus(caso):
+    mensagem_limpa = limpar_mensagem(caso["mensagem"])
+    assert mensagem_limpa == caso["mensagem_limpa"]
+
+    descricao = extrair_descricao(mensagem_limpa)
+    assert descricao == caso["descricao"]
+    assert (limpar_descricao(descricao) if descricao else "") == caso["descricao_dataset"]
+    assert limpar_descricao(caso["mensagem"]) == caso["descricao_limpa"]
+
+
+def test_limpar_lote_equivale_a_chamadas_individuais():
+    mensagens = [caso["mensagem"] for caso in CORPUS] + [None]
+    assert limpar_mensagens(mensagens) == [limpar_mensagem(m) for m in mensagens]
+    assert limpar_descricoes(mensagens) == [limpar_descricao(m) for m in mensagens]
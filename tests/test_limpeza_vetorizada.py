@@ -0,0 +1,113 @@
+import json
+import random
+import re
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks.corpus import gerar_chamados
+from modules.shared import regras_limpeza
+from modules.shared.regras_limpeza import traduzir_para_re2
+from modules.tratamento_mensagem.service import limpar_mensagem, limpar_serie as limpar_mensagens
+from modules.nova_tabela_descricao_dataset.service import extrair_descricao, extrair_serie
+from modules.tratamento_descricao_dataset.service import limpar_descricao, limpar_serie as limpar_descricoes
+
+CORPUS = json.loads((Path(__file__).parent / "dados" / "golden_limpeza.json").read_text(encoding="utf-8"))
+
+# Casos em que o `re` e o RE2 costumam divergir: espaços Unicode, acentos com
+# IGNORECASE, İ/ı (que o `re` iguala a i/I), caracteres fora do BMP e limites do resumo
+CASOS_UNICODE = [
+    "Tarefa:  corrigir　o login",
+    "TAREFA: ação pendente\x1c\x1dfim",
+    "OLÁ, " + "x" * 300,
+    "olá " + "y" * 300,
+    "Prezados, " + "ç" * 250,
+    "İdentificado erro no módulo " + "z" * 250,
+    "ıdentificado erro no módulo " + "z" * 250,
+    "POSTMAN İNC",
+    "take 5 mın today to see your monitors",
+    "😀 " + "a" * 199 + "  b",
+    "a" * 199 + "  b",
+    "h1. título ²³ ① ٣",
+    "١٢٣ [[ ]] ,,, ²²",
+    "{adf}\nbloco\n{adf} resto",
+    "#gccode#1:2:3:K:4# Kelvin K",
+    "\u0085   ",
+    "",
+]
+
+
+def _textos_aleatorios(quantidade, semente=7):
+    aleatorio = random.Random(semente)
+    alfabeto = [chr(c) for c in range(0x20, 0x3100) if not 0xd800 <= c < 0xe000]
+    pecas = ["Tarefa:", "bom dia", "{color:#fff}", "{adf}x{adf}", "h2. ", "[[", "]]", "*3 anexos*",
+             "[A.PDF]", "https://a.b/c", " | | ", "\n", "  ", " ", "<[ #gccode#1:2#!", "123 ", "İ", "ı", "😀"]
+    return [
+        "".join(aleatorio.choice(pecas) if aleatorio.random() < 0.4 else aleatorio.choice(alfabeto)
+                for _ in range(aleatorio.randint(0, 260)))
+        for _ in range(quantidade)
+    ]
+
+
+@pytest.fixture(scope="module")
+def textos():
+    return (
+        [caso["mensagem"] for caso in CORPUS]
+        + [c["mensagem"] for c in gerar_chamados(500)]
+        + CASOS_UNICODE
+        + _textos_aleatorios(1000)
+        + [None, float("nan"), "   "]
+    )
+
+
+@pytest.mark.parametrize("escalar, vetorizada", [
+    (limpar_mensagem, limpar_mensagens),
+    (extrair_descricao, extrair_serie),
+    (limpar_descricao, limpar_descricoes),
+])
+def test_serie_equivale_ao_caminho_escalar(textos, escalar, vetorizada):
+    serie = pd.Series(textos, index=range(10, 10 + len(textos)))
+    resultado = vetorizada(serie)
+
+    assert resultado.index.equals(serie.index)
+    assert resultado.tolist() == [escalar(t) for t in textos]
+
+
+def test_pipeline_vetorizado_equivale_ao_corpus():
+    mensagens = pd.Series([caso["mensagem"] for caso in CORPUS])
+    limpas = limpar_mensagens(mensagens)
+    descricoes = extrair_serie(limpas)
+
+    assert limpas.tolist() == [caso["mensagem_limpa"] for caso in CORPUS]
+    assert descricoes.tolist() == [caso["descricao"] for caso in CORPUS]
+    assert limpar_descricoes(descricoes).tolist() == [caso["descricao_dataset"] for caso in CORPUS]
+
+
+def test_sem_pyarrow_usa_caminho_escalar(textos, monkeypatch):
+    monkeypatch.setattr(regras_limpeza, "pyarrow_compute", lambda: None)
+    assert limpar_mensagens(pd.Series(textos)).tolist() == [limpar_mensagem(t) for t in textos]
+
+
+def test_traducao_para_re2():
+    assert traduzir_para_re2(re.compile(r'\d+', re.IGNORECASE)) == r'(?i)\p{Nd}+'
+    assert traduzir_para_re2(re.compile(r'[\]\},]+')) == r'[\]\},]+'
+    assert traduzir_para_re2(re.compile(r'[]a]\w')) == r'[]a][\p{L}\p{N}_]'
+    assert traduzir_para_re2(re.compile(r'a\n')) == r'a\n'
+    for intraduzivel in [r'a(?=\n|$)', r'a$', r'\bpalavra', r'(a)\1', r'[\s,]']:
+        assert traduzir_para_re2(re.compile(intraduzivel)) is None
+    assert traduzir_para_re2(re.compile('a b', re.VERBOSE)) is None
+
+
+def test_regra_intraduzivel_usa_o_re_na_coluna():
+    regras = regras_limpeza.compilar_regras([{"nome": "fim", "padroes": [r'\.$']}])
+    assert regras[0].padrao_re2 is None
+
+    def arrow(textos):
+        return regras_limpeza.aplicar_regras_arrow(textos, regras)
+
+    def escalar(texto):
+        return regras_limpeza.aplicar_regras(texto, regras) if isinstance(texto, str) else ""
+
+    serie = pd.Series(["fim.", "meio. fim", "linha.\n", None])
+    assert regras_limpeza.aplicar_em_serie(serie, arrow, escalar).tolist() == ["fim", "meio. fim", "linha\n", ""]
@@ -0,0 +1,51 @@
+import logging
+import os
+import subprocess
+import sys
+
+from modules.shared.logger import ProgressoLog, configurar_niveis, obter_logger
+
+
+def test_nivel_por_modulo():
+    configurar_niveis("teste_nivel=WARNING, modules.teste_outro=DEBUG")
+
+    assert obter_logger("modules.teste_nivel.service").getEffectiveLevel() == logging.WARNING
+    assert obter_logger("modules.teste_outro").getEffectiveLevel() == logging.DEBUG
+
+
+def test_progresso_resume_a_cada_n_itens(caplog):
+    log = obter_logger("modules.teste_progresso")
+    progresso = ProgressoLog("Teste", total=25, log=log, a_cada_itens=10, a_cada_s=3600)
+
+    with caplog.at_level(logging.INFO, logger="modules.teste_progresso"):
+        for _ in range(25):
+            progresso.avancar(falhas=0)
+        progresso.finalizar(enviados=25)
+
+    registros = [r for r in caplog.records if r.name == "modules.teste_progresso"]
+    assert [r.progresso["processados"] for r in registros] == [10, 20, 25]
+    assert registros[-1].progresso["enviados"] == 25
+    assert "concluído" in registros[-1].getMessage()
+
+
+_SCRIPT_WORKER = """
+import os
+import sys
+from modules.shared.logger import logger, somente_console
+logger.warning("mestre")
+if os.fork() == 0:
+    somente_console()
+    logger.warning("worker")
+    sys.exit(0)  # sai pelo atexit, que esvazia a fila do listener
+os.wait()
+"""
+
+
+def test_worker_deixa_o_arquivo_de_log_para_o_mestre(tmp_path):
+    arquivo = tmp_path / "app.log"
+    env = dict(os.environ, LOG_FILE=str(arquivo))
+    resultado = subprocess.run([sys.executable, "-c", _SCRIPT_WORKER], env=env, capture_output=True, text=True,
+                               timeout=60, check=True)
+
+    assert "mestre" in arquivo.read_text() and "worker" not in arquivo.read_text()
+    assert "worker" in resultado.stderr
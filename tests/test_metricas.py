@@ -0,0 +1,46 @@
+from prometheus_client import REGISTRY
+
+from modules.shared import metricas
+
+
+def _valor(nome, **rotulos):
+    return REGISTRY.get_sample_value(nome, rotulos) or 0
+
+
+def test_executar_etapa_registra_duracao_e_bytes():
+    antes = _valor("apolo_etapa_duracao_segundos_count", etapa="teste_etapa")
+    bytes_antes = _valor("apolo_etapa_bytes_sum", etapa="teste_etapa", sentido="entrada")
+
+    assert metricas.executar_etapa("teste_etapa", str.upper, "ação") == "AÇÃO"
+
+    assert _valor("apolo_etapa_duracao_segundos_count", etapa="teste_etapa") == antes + 1
+    assert _valor("apolo_etapa_bytes_sum", etapa="teste_etapa", sentido="entrada") == bytes_antes + len("ação".encode())
+
+
+def test_observacoes_coletadas_so_valem_quando_reproduzidas():
+    antes = _valor("apolo_entidades_total", tipo="CPF")
+
+    with metricas.coletar() as observacoes:
+        metricas.observar_entidades("CPF <CPF> e <CPF> de <PERSON>")
+    assert _valor("apolo_entidades_total", tipo="CPF") == antes
+
+    metricas.reproduzir(observacoes)
+    assert _valor("apolo_entidades_total", tipo="CPF") == antes + 2
+
+
+def test_exportar_no_formato_do_prometheus():
+    metricas.contar("itens", "processado")
+    conteudo, content_type = metricas.exportar()
+
+    assert content_type.startswith("text/plain")
+    assert b'apolo_itens_total{desfecho="processado"}' in conteudo
+
+
+def test_perfilar_grava_os_arquivos(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, "PERFIL_DIR", str(tmp_path))
+
+    with metricas.perfilar("job_teste"):
+        sum(range(1000))
+
+    assert (tmp_path / "job_teste.prof").exists()
+    assert "cumulative" in (tmp_path / "job_teste.txt").read_text(encoding="utf-8")
@@ -0,0 +1,63 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from modules.anonimo import modelo
+
+_NER_OUVINTE = {
+    "@architectures": "spacy.TransitionBasedParser.v2", "state_type": "ner", "extra_state_tokens": False,
+    "hidden_width": 16, "maxout_pieces": 2, "use_upper": True,
+    "tok2vec": {"@architectures": "spacy.Tok2VecListener.v1", "width": 96, "upstream": "*"},
+}
+
+
+@pytest.fixture(scope="module")
+def caminho_modelo(tmp_path_factory):
+    """Pipeline no formato dos pt_core_news: tok2vec compartilhado, morfologia, NER e lematizador"""
+    nlp = spacy.blank("pt")
+    nlp.add_pipe("tok2vec")
+    nlp.add_pipe("morphologizer").add_label("POS=NOUN")
+    nlp.add_pipe("ner", config={"model": _NER_OUVINTE}).add_label("PER")
+    nlp.add_pipe("attribute_ruler")
+    nlp.add_pipe("sentencizer", name="lemmatizer")
+    nlp.initialize()
+    caminho = tmp_path_factory.mktemp("modelo") / "pt_teste"
+    nlp.to_disk(caminho)
+    return str(caminho)
+
+
+def test_ner_mantem_apenas_o_tok2vec_que_ele_escuta(caminho_modelo):
+    nlp = modelo.carregar_modelo(caminho_modelo, "ner")
+
+    assert nlp.pipe_names == ["tok2vec", "ner", modelo.LEMA_MINUSCULO]
+    # Sem o lematizador, o Presidio recebe a forma minúscula como lema
+    assert [token.lemma_ for token in nlp("Cadastro do Colaborador")] == ["cadastro", "do", "colaborador"]
+
+
+def test_completo_mantem_o_comportamento_anterior(caminho_modelo):
+    nlp = modelo.carregar_modelo(caminho_modelo, "completo")
+    assert nlp.pipe_names == ["tok2vec", "morphologizer", "ner", "attribute_ruler", "lemmatizer"]
+
+
+def test_ner_com_tok2vec_proprio_dispensa_o_compartilhado():
+    config = {
+        "nlp": {"pipeline": ["tok2vec", "morphologizer", "ner"]},
+        "components": {
+            "tok2vec": {"factory": "tok2vec"},
+            "morphologizer": {
+                "factory": "morphologizer",
+                "model": {"tok2vec": {"@architectures": "spacy.Tok2VecListener.v1", "upstream": "tok2vec"}},
+            },
+            "ner": {"factory": "ner", "model": {"tok2vec": {"@architectures": "spacy.HashEmbedCNN.v2"}}},
+        },
+    }
+    assert modelo.componentes_necessarios(config) == ["ner"]
+
+
+def test_vetores_descartados_quando_nenhum_componente_usa(caminho_modelo):
+    nlp = modelo.carregar_modelo(caminho_modelo, "ner", "descartar")
+    assert nlp.vocab.vectors.shape[0] == 0
+
+
+def test_configuracao_padrao_nao_altera_a_versao():
+    assert modelo.configuracao() == {"modelo": "pt_core_news_lg"}
@@ -0,0 +1,111 @@
+import asyncio
+import mongomock
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from modules.importacao import controller as importacao
+from modules.jobs import controller as jobs_controller
+from modules.jobs import service as jobs
+from modules.shared import database
+
+
+@pytest.fixture
+def bancos(monkeypatch):
+    """Banco síncrono e assíncrono sobre o mesmo armazenamento"""
+    cliente = mongomock.MongoClient()
+    sincrono = cliente["teste"]
+    assincrono = AsyncMongoMockClient(mock_mongo_client=cliente)["teste"]
+    for modulo in (jobs, importacao):
+        monkeypatch.setattr(modulo, "get_db", lambda: sincrono)
+        monkeypatch.setattr(modulo, "get_db_async", lambda: assincrono)
+    jobs.garantir_indices_jobs()
+    return sincrono
+
+
+def test_opcoes_do_pool_vem_do_ambiente(monkeypatch):
+    monkeypatch.setattr(database, "POOL_MAX", 8)
+    monkeypatch.setattr(database, "READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setattr(database, "WRITE_CONCERN", "majority")
+    opcoes = database.opcoes_cliente()
+    assert opcoes["maxPoolSize"] == 8
+    assert opcoes["readPreference"] == "secondaryPreferred"
+    assert opcoes["w"] == "majority"
+
+    monkeypatch.setattr(database, "WRITE_CONCERN", "2")
+    assert database.opcoes_cliente()["w"] == 2
+
+
+def test_cliente_async_e_reaproveitado_no_mesmo_loop(monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://localhost:1")
+    monkeypatch.setenv("MONGODB_DBNAME", "teste")
+
+    async def dois_acessos():
+        return database.get_db_async().client, database.get_db_async().client
+
+    try:
+        primeiro, segundo = asyncio.run(dois_acessos())
+        assert primeiro is segundo
+        assert primeiro.options.pool_options.max_pool_size == database.POOL_MAX
+        # Um novo event loop não pode usar o cliente preso ao anterior
+        outro, _ = asyncio.run(dois_acessos())
+        assert outro is not primeiro
+    finally:
+        database.fechar_conexoes()
+
+
+def test_jobs_async_equivalem_aos_sincronos(bancos):
+    async def cenario():
+        primeiro = await jobs.criar_job_async(["1", "2", "2"])
+        # A unicidade dos itens ativos vale entre os dois caminhos
+        segundo = jobs.criar_job(["2", "3"])
+        assert segundo["duplicados"] == ["2"]
+        terceiro = await jobs.criar_job_async(["3", "4"])
+        assert terceiro["duplicados"] == ["3"]
+
+        estado = await jobs.obter_job_async(primeiro["jobId"])
+        assert estado == jobs.obter_job(primeiro["jobId"])
+        assert estado["total"] == 2
+        assert estado["itens_por_status"] == {jobs.PENDENTE: 2}
+
+        resposta = await jobs_controller.cancelar(primeiro["jobId"])
+        assert resposta["status"] == "success"
+        assert not await jobs.cancelar_job_async(primeiro["jobId"])
+        return primeiro["jobId"]
+
+    job_id = asyncio.run(cenario())
+    assert jobs.obter_job(job_id)["status"] == jobs.CANCELADO
+    assert bancos["jobs_itens"].count_documents({"jobId": job_id, "ativo": True}) == 0
+
+
+def test_processamento_individual_nao_bloqueia_o_event_loop(bancos, anonimizador_falso):
+    # Simula o NER: bloqueia a thread que o executa
+    anonimizador_falso.atraso_s = 0.2
+    bancos["interacoes"].insert_one({
+        "chamadoId": "42",
+        "mensagem": "Tarefa: Trocar o teclado da recepção. Obrigado."
+    })
+
+    async def cenario():
+        batidas = 0
+
+        async def relogio():
+            nonlocal batidas
+            while True:
+                await asyncio.sleep(0.01)
+                batidas += 1
+
+        tarefa = asyncio.create_task(relogio())
+        resultado = await importacao.processar_individualmente("42")
+        tarefa.cancel()
+        return resultado, batidas
+
+    resultado, batidas = asyncio.run(cenario())
+    assert resultado["chamadoId"] == "42"
+    assert resultado["descricao"] and resultado["descricao"] == resultado["descricao"].upper()
+    # Enquanto a anonimização ocupava o threadpool, o loop seguiu atendendo outras tarefas
+    assert batidas >= 5
+    salvo = bancos["interacoes_processadas"].find_one({"chamadoId": "42"})
+    assert salvo["descricao_dataset"] == resultado["descricao"]
+
+
+def test_chamado_inexistente_retorna_none(bancos):
+    assert asyncio.run(importacao.processar_individualmente("nao-existe")) is None
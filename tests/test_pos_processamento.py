@@ -0,0 +1,62 @@
+import random
+import re
+
+import pytest
+
+from modules.anonimo.service import Anonimizador
+
+
+def _pos_processar_anterior(texto_anonimizado, nomes_detectados):
+    """Implementação anterior: um re.sub por nome, um str.replace por correção e a normalização de espaços"""
+    nomes = set(nome for nome in nomes_detectados if nome not in Anonimizador.PALAVRAS_PRESERVAR)
+    for nome in nomes:
+        texto_anonimizado = re.sub(r'\b' + re.escape(nome) + r'\b', "<PERSON>", texto_anonimizado)
+    for padrao, substituicao in {
+        "<LOCATION> Olá": "Olá", "<LOCATION> a": "a", "<LOCATION> \\": "\\", "<ORGANIZATION>": "Termo"
+    }.items():
+        texto_anonimizado = texto_anonimizado.replace(padrao, substituicao)
+    return re.sub(r'\s+', ' ', texto_anonimizado).strip()
+
+
+@pytest.fixture(scope="module")
+def anonimizador():
+    # _pos_processar não usa o modelo; evita carregar o spaCy
+    return object.__new__(Anonimizador)
+
+
+CASOS = [
+    ("Olá, João Silva pediu acesso. CPF <CPF>", ["João Silva"]),
+    ("<LOCATION> Olá, Maria Souza", ["Maria Souza"]),
+    ("<LOCATION> ana Souza abriu o chamado", ["ana Souza"]),
+    ("<LOCATION> ação pendente com <ORGANIZATION>", []),
+    ("<LOCATION> \\\\servidor\\pasta  e\t\tmais\n linhas ", []),
+    ("<LOCATION>  a dois espaços", []),
+    ("<LOCATION> <LOCATION> Olá", []),
+    ("<LOCATION> <ORGANIZATION> e João Silva e João Silvano", ["João Silva"]),
+    ("Olá Maria Souza Olá", ["Olá", "Maria Souza", "Solicito"]),
+    ("Carlos Pereira (Carlos Pereira) e.Carlos Pereira", ["Carlos Pereira"]),
+    ("   ", []),
+    ("", ["João Silva"]),
+]
+
+
+@pytest.mark.parametrize("texto, nomes", CASOS)
+def test_saida_identica_a_implementacao_anterior(anonimizador, texto, nomes):
+    assert anonimizador._pos_processar(texto, nomes) == _pos_processar_anterior(texto, nomes)
+
+
+def test_saida_identica_em_textos_aleatorios(anonimizador):
+    aleatorio = random.Random(3)
+    nomes = ["João Silva", "Maria Souza", "ana Paula", "Pedro Álvares Cabral", "Luiz.Costa"]
+    pecas = nomes + ["<LOCATION>", "<ORGANIZATION>", "<PERSON>", "Olá", "a", "ação", "\\", "Termo",
+                     " ", " ", "  ", "\n", "\t", " ", ",", ".", "texto", "João", "Silva"]
+    for _ in range(2000):
+        texto = "".join(aleatorio.choice(pecas) for _ in range(aleatorio.randint(0, 30)))
+        detectados = aleatorio.sample(nomes, aleatorio.randint(0, len(nomes)))
+        assert anonimizador._pos_processar(texto, detectados) == _pos_processar_anterior(texto, detectados), texto
+
+
+def test_nome_contido_em_outro_prefere_o_mais_longo(anonimizador):
+    # Antes o resultado dependia da ordem de iteração do set
+    texto = "Contato: Ana Paula Souza e Ana Paula"
+    assert anonimizador._pos_processar(texto, ["Ana Paula", "Ana Paula Souza"]) == "Contato: <PERSON> e <PERSON>"
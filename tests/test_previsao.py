@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from modules.previsao.service import EnviadorPrevisao, enviar_lote
+from tests.stub_prever import StubPrever
+
+
+@pytest.fixture
+def stub():
+    servidor = StubPrever(atraso_s=0.01)
+    yield servidor
+    servidor.encerrar()
+
+
+def _chamados(quantidade):
+    return [{"chamadoId": str(i), "descricao": f"descricao {i}"} for i in range(quantidade)]
+
+
+def test_enviador_entrega_todos_os_chamados(stub):
+    with EnviadorPrevisao(url=stub.url, lote_tamanho=10, max_em_voo=4) as enviador:
+        for chamado in _chamados(95):
+            enviador.adicionar(chamado)
+
+    assert sorted(c["chamadoId"] for c in stub.recebidos) == sorted(str(i) for i in range(95))
+    assert stub.requisicoes == 10
+    assert enviador.enviados == 95
+    assert enviador.falhas == []
+
+
+def test_enviar_lote_tenta_novamente_apos_falha():
+    servidor = StubPrever(falhas_iniciais=2)
+    try:
+        assert enviar_lote(_chamados(3), url=servidor.url, tentativas=3, backoff_s=0.01)
+        assert servidor.requisicoes == 3
+        assert len(servidor.recebidos) == 3
+    finally:
+        servidor.encerrar()
+
+
+def test_erro_4xx_nao_e_repetido():
+    servidor = StubPrever(falhas_iniciais=100, status_falha=422)
+    try:
+        assert not enviar_lote(_chamados(3), url=servidor.url, tentativas=3, backoff_s=0.01)
+        assert servidor.requisicoes == 1
+    finally:
+        servidor.encerrar()
+
+
+def test_read_timeout_nao_e_repetido(monkeypatch):
+    # O /prever recebeu o lote; repetir o classificaria de novo
+    monkeypatch.setattr("modules.previsao.service.TIMEOUT_S", 0.05)
+    servidor = StubPrever(atraso_s=0.3)
+    try:
+        assert not enviar_lote(_chamados(3), url=servidor.url, tentativas=3, backoff_s=0.01)
+        assert servidor.requisicoes == 1
+    finally:
+        servidor.encerrar()
+
+
+def test_falha_de_conexao_e_repetida(monkeypatch):
+    esperas = []
+    monkeypatch.setattr("modules.previsao.service.time.sleep", esperas.append)
+    servidor = StubPrever()
+    servidor.encerrar()
+
+    assert not enviar_lote(_chamados(3), url=servidor.url, tentativas=3, backoff_s=0.01)
+    assert esperas == [0.01, 0.02]
+
+
+def test_enviador_registra_lotes_que_falharam(monkeypatch):
+    monkeypatch.setattr("modules.previsao.service.BACKOFF_S", 0.01)
+    servidor = StubPrever(falhas_iniciais=100)
+    try:
+        enviador = EnviadorPrevisao(url=servidor.url, lote_tamanho=5, max_em_voo=2)
+        for chamado in _chamados(10):
+            enviador.adicionar(chamado)
+        resumo = enviador.finalizar()
+        assert resumo == {"enviados": 0, "falhas": 10}
+    finally:
+        servidor.encerrar()
+
+
+def test_vazao_com_envios_concorrentes():
+    """Com 4 lotes em voo, a vazão deve superar o envio sequencial contra um /prever lento"""
+    servidor = StubPrever(atraso_s=0.05)
+    try:
+        duracoes = {}
+        for max_em_voo in (1, 4):
+            inicio = time.perf_counter()
+            with EnviadorPrevisao(url=servidor.url, lote_tamanho=10, max_em_voo=max_em_voo) as enviador:
+                for chamado in _chamados(200):
+                    enviador.adicionar(chamado)
+            duracoes[max_em_voo] = time.perf_counter() - inicio
+
+        assert duracoes[4] < duracoes[1]
+    finally:
+        servidor.encerrar()
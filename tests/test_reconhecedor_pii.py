@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from modules.anonimo import pii
+from modules.anonimo.reconhecedor import ReconhecedorPII
+
+AMOSTRA = json.loads((Path(__file__).parent / "dados" / "amostra_pii.json").read_text(encoding="utf-8"))
+TIPOS = {"CPF": pii.CPF, "EMAIL": pii.EMAIL, "TELEFONE": pii.TELEFONE}
+
+
+def _achados(texto):
+    return [(e.tipo, texto[e.inicio:e.fim]) for e in pii.encontrar(texto)]
+
+
+def test_cpf_valido_confere_digitos_verificadores():
+    assert pii.cpf_valido("52998224725")
+    assert not pii.cpf_valido("52998224726")
+    assert not pii.cpf_valido("11111111111")
+    assert not pii.cpf_valido("5299822472")
+
+
+@pytest.mark.parametrize("digitos,esperado", [
+    ("11987654321", True),
+    ("1134567890", True),
+    ("2134567890", True),
+    ("10987654321", False),   # DDD inexistente
+    ("11887654321", False),   # celular sem o 9
+    ("1164567890", False),    # fixo começando com 6
+])
+def test_telefone_valido(digitos, esperado):
+    assert pii.telefone_valido(digitos) is esperado
+
+
+def test_encontra_as_entidades_da_amostra():
+    for caso in AMOSTRA:
+        achados = _achados(caso["texto"])
+        for entidade in caso["entidades"]:
+            if entidade["tipo"] in TIPOS:
+                assert (TIPOS[entidade["tipo"]], entidade["texto"]) in achados, caso["texto"]
+
+
+@pytest.mark.parametrize("texto,trecho", [
+    ("Ligar para (11) 98765-4321 amanhã", "(11) 98765-4321"),
+    ("Ligar para (11)987654321 amanhã", "(11)987654321"),
+    ("Número +55 21 3456-7890 do escritório", "+55 21 3456-7890"),
+    ("Número 11 3456-7890 do escritório", "11 3456-7890"),
+    ("Retornar em 11987654321", "11987654321"),
+])
+def test_telefone_em_varios_formatos(texto, trecho):
+    assert _achados(texto) == [(pii.TELEFONE, trecho)]
+
+
+def test_digitos_validos_como_cpf_sao_cpf_antes_de_telefone():
+    assert _achados("Cliente 52998224725 sem acesso") == [(pii.CPF, "52998224725")]
+
+
+def test_cpf_formatado_invalido_sai_com_score_menor():
+    validado, invalido = pii.encontrar("CPF 529.982.247-25 ou 529.982.247-26")
+    assert (validado.tipo, validado.score) == (pii.CPF, pii.SCORE_VALIDADO)
+    assert (invalido.tipo, invalido.score) == (pii.CPF, pii.SCORE_CONTEXTO)
+
+
+@pytest.mark.parametrize("texto", [
+    "O pedido 11987654321 não foi faturado",
+    "Protocolo 52998224725 aberto ontem",
+    "A nota fiscal nº 1134567890 foi rejeitada",
+    "Celular (11) 98765-4321. A nota nº 11987654321 foi rejeitada",
+])
+def test_identificadores_nao_sao_pii(texto):
+    assert all(trecho not in ("11987654321", "52998224725", "1134567890") for _, trecho in _achados(texto))
+
+
+def test_telefone_formatado_invalido_sai_com_score_menor():
+    # Sem o PhoneRecognizer nativo, descartá-lo deixaria o número no texto
+    assert pii.encontrar("Ligue (11) 8765-4321 amanhã") == [pii.Entidade(pii.TELEFONE, 6, 20, pii.SCORE_CONTEXTO)]
+    assert pii.encontrar("Ligue 11 8765-4321 amanhã") == [pii.Entidade(pii.TELEFONE, 6, 18, pii.SCORE_CONTEXTO)]
+
+
+@pytest.mark.parametrize("texto", ["Valor 15 3000 4000 reais", "Foram 11 98765 4321 unidades"])
+def test_digitos_separados_por_espaco_sem_contexto_nao_sao_telefone(texto):
+    assert _achados(texto) == []
+
+
+def test_digitos_separados_por_espaco_com_contexto_sao_telefone():
+    assert _achados("Celular 15 3000 4000") == [(pii.TELEFONE, "15 3000 4000")]
+
+
+def test_contexto_recupera_numero_que_nao_valida():
+    assert _achados("Meu CPF é 12345678900") == [(pii.CPF, "12345678900")]
+    assert _achados("Celular 10987654321") == [(pii.TELEFONE, "10987654321")]
+    assert _achados("Total 12345678900") == []
+
+
+def test_resultados_em_ordem_e_sem_sobreposicao():
+    texto = "E-mail ana@empresa.com.br, CPF 529.982.247-25 e telefone (21) 3456-7890"
+    entidades = pii.encontrar(texto)
+    assert [e.tipo for e in entidades] == [pii.EMAIL, pii.CPF, pii.TELEFONE]
+    assert all(a.fim <= b.inicio for a, b in zip(entidades, entidades[1:]))
+
+
+def test_texto_sem_digitos_nem_arroba():
+    assert pii.encontrar("Solicito acesso ao sistema de vendas") == []
+
+
+def test_reconhecedor_filtra_entidades_pedidas():
+    reconhecedor = ReconhecedorPII()
+    texto = "CPF 529.982.247-25, e-mail ana@empresa.com.br"
+    resultados = reconhecedor.analyze(texto, [pii.CPF])
+    assert [(r.entity_type, texto[r.start:r.end], r.score) for r in resultados] == [
+        (pii.CPF, "529.982.247-25", pii.SCORE_VALIDADO)
+    ]
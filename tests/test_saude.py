@@ -0,0 +1,96 @@
+import json
+import subprocess
+import sys
+import threading
+
+import mongomock
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from modules.saude import controller, service as saude
+
+
+@pytest.fixture
+def anonimizador(anonimizador_falso):
+    """O carregamento do modelo só termina quando `carregamento` é sinalizado"""
+    anonimizador_falso.carregamento = threading.Event()
+    return anonimizador_falso
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(saude, "get_db", lambda: banco)
+    return banco
+
+
+def _ready():
+    resposta = controller.pronto()
+    return resposta.status_code, json.loads(resposta.body)
+
+
+def test_pronto_so_depois_do_aquecimento_em_segundo_plano(anonimizador, banco, monkeypatch):
+    prontidao = saude.Prontidao("segundo_plano")
+    monkeypatch.setattr(controller, "prontidao", prontidao)
+    prontidao.iniciar()
+
+    assert controller.vivo() == {"status": "ok"}
+    status, corpo = _ready()
+    assert status == 503
+    assert corpo["modelo"]["estado"] == "carregando"
+    assert corpo["mongo"]["estado"] == "ok"
+
+    anonimizador.carregamento.set()
+    prontidao._thread.join(5)
+    status, corpo = _ready()
+    assert status == 200
+    assert corpo["modelo"]["estado"] == "pronto"
+
+
+def test_mongo_indisponivel_deixa_o_servico_nao_pronto(anonimizador, monkeypatch):
+    def sem_servidor():
+        raise ServerSelectionTimeoutError("sem servidor")
+
+    monkeypatch.setattr(saude, "get_db", sem_servidor)
+    monkeypatch.setattr(saude, "INTERVALO_PING_S", 0)
+    anonimizador.carregamento.set()
+    prontidao = saude.Prontidao("sincrono")
+    prontidao.iniciar()
+
+    estado = prontidao.estado()
+    assert not estado["pronto"]
+    assert estado["modelo"]["estado"] == "pronto"
+    assert estado["mongo"] == {"estado": "indisponivel", "erro": "sem servidor"}
+
+    banco = mongomock.MongoClient()["teste"]
+    monkeypatch.setattr(saude, "get_db", lambda: banco)
+    assert prontidao.estado()["pronto"]
+
+
+def test_falha_no_modelo_e_reportada(banco, anonimizador_falso):
+    anonimizador_falso.erro = RuntimeError("Modelo de linguagem não disponível")
+    prontidao = saude.Prontidao("sincrono")
+    prontidao.iniciar()
+
+    estado = prontidao.estado()
+    assert not estado["pronto"]
+    assert estado["modelo"] == {"estado": "falhou", "erro": "Modelo de linguagem não disponível"}
+
+
+def test_sem_aquecimento_o_modelo_carrega_sob_demanda(anonimizador, banco):
+    prontidao = saude.Prontidao("desligado")
+    prontidao.iniciar()
+
+    estado = prontidao.estado()
+    assert estado["pronto"]
+    assert estado["modelo"]["estado"] == "sob_demanda"
+    assert not anonimizador.carregado()
+
+
+def test_importar_a_api_nao_carrega_spacy_nem_presidio():
+    codigo = (
+        "import sys; import modules.importacao.controller, modules.jobs.controller, modules.saude.controller; "
+        "print(sorted(m for m in ('spacy', 'presidio_analyzer', 'presidio_anonymizer', 'pandas') if m in sys.modules))"
+    )
+    resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert resultado.stdout.strip() == "[]"
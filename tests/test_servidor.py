@@ -0,0 +1,78 @@
+import gc
+import os
+import socket
+import subprocess
+import sys
+import pytest
+from modules.jobs import service as jobs
+from modules.servidor import service as servidor
+from modules.shared import database, metricas
+
+
+@pytest.fixture
+def anonimizador(anonimizador_falso):
+    yield anonimizador_falso
+    gc.unfreeze()
+
+
+def test_mestre_carrega_o_modelo_e_congela_o_gc(anonimizador, monkeypatch):
+    monkeypatch.setattr(servidor, "PRELOAD", True)
+    monkeypatch.setattr(servidor, "CONGELAR_GC", True)
+    servidor.preparar_mestre()
+
+    assert anonimizador.carregado()
+    assert gc.get_freeze_count() > 0
+
+
+def test_sem_preload_o_mestre_nao_carrega_nada(anonimizador, monkeypatch):
+    monkeypatch.setattr(servidor, "PRELOAD", False)
+    servidor.preparar_mestre()
+
+    assert not anonimizador.carregado()
+    assert gc.get_freeze_count() == 0
+
+
+def test_worker_descarta_conexoes_e_reabre_o_cache(anonimizador, monkeypatch):
+    monkeypatch.setattr(database, "_client", object())
+    monkeypatch.setattr(database, "_client_async", object())
+    monkeypatch.setattr(jobs, "DONO", "mestre:1")
+    anonimizador()
+    chamadas = []
+    monkeypatch.setattr(servidor, "somente_console", lambda: chamadas.append(True))
+
+    servidor.apos_fork()
+
+    assert chamadas == [True]
+
+    assert database._client is None and database._client_async is None
+    assert jobs.DONO == f"{socket.gethostname()}:{os.getpid()}"
+    assert anonimizador().cache.versao == "v1"
+
+
+def test_memoria_do_processo_inclui_pss():
+    memoria = metricas.memoria_processo()
+    assert memoria["rss"] > 0
+    assert 0 < memoria["pss"] <= memoria["rss"]
+
+    conteudo, _ = metricas.exportar()
+    assert b'apolo_memoria_processo_bytes{tipo="pss"}' in conteudo
+
+
+_SCRIPT_WORKER = """
+from modules.shared import metricas
+metricas.contar("itens", "teste_multiprocesso", 2)
+metricas.ajustar_fila("teste_multiprocesso", 3)
+metricas.exportar()
+"""
+
+
+def test_metrics_soma_os_workers_no_modo_multiprocesso(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", _SCRIPT_WORKER], env=env, check=True)
+
+    exportar = "from modules.shared import metricas; import sys; sys.stdout.buffer.write(metricas.exportar()[0])"
+    conteudo = subprocess.run([sys.executable, "-c", exportar], env=env, check=True, capture_output=True).stdout
+
+    assert b'apolo_itens_total{desfecho="teste_multiprocesso"} 4.0' in conteudo
+    assert conteudo.count(b'apolo_memoria_processo_bytes{pid=') >= 2
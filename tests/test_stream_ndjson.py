@@ -0,0 +1,136 @@
+import asyncio
+import json
+import mongomock
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+from starlette.requests import Request
+from modules.importacao import controller
+from modules.importacao import service as importacao
+
+MENSAGEM = "Tarefa: Trocar o teclado da recepção. Obrigado."
+
+
+@pytest.fixture
+def lotes_processados(anonimizador_falso, monkeypatch):
+    """Contagem dos lotes que chegaram ao processar_lote"""
+    monkeypatch.setattr(controller, "LOTE_STREAM", 2)
+    chamadas = []
+    original = importacao.processar_lote
+
+    def contar(itens):
+        chamadas.append(len(itens))
+        return original(itens)
+
+    monkeypatch.setattr(importacao, "processar_lote", contar)
+    return chamadas
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    cliente = mongomock.MongoClient()
+    assincrono = AsyncMongoMockClient(mock_mongo_client=cliente)["teste"]
+    monkeypatch.setattr(controller, "get_db_async", lambda: assincrono)
+    return cliente["teste"]
+
+
+def _requisicao(corpo, eventos=None):
+    """Request do Starlette com o corpo JSON; depois dele, `receive` devolve os `eventos`"""
+    fila = [{"type": "http.request", "body": json.dumps(corpo).encode(), "more_body": False}, *(eventos or [])]
+
+    async def receive():
+        evento = fila.pop(0) if fila else None
+        if callable(evento):
+            evento = await evento()
+        return evento or {"type": "http.disconnect"}
+
+    escopo = {"type": "http", "method": "POST", "path": "/api/v1/processar-stream", "headers": []}
+    return escopo, receive, Request(escopo, receive)
+
+
+def _linhas(corpo):
+    async def coletar():
+        _, _, requisicao = _requisicao(corpo)
+        resposta = await controller.processar_stream(requisicao)
+        assert resposta.media_type == "application/x-ndjson"
+        return [parte async for parte in resposta.body_iterator]
+
+    partes = asyncio.run(coletar())
+    return partes, [json.loads(linha) for parte in partes for linha in parte.decode().splitlines()]
+
+
+def test_textos_saem_em_ordem_um_pedaco_por_lote(lotes_processados):
+    textos = [MENSAGEM, "", MENSAGEM.replace("teclado", "mouse"), "Tarefa: Ligar para a Maria."]
+    partes, linhas = _linhas({"textos": textos})
+
+    assert len(partes) == 2
+    assert lotes_processados == [2, 2]
+    assert [linha["indice"] for linha in linhas] == [0, 1, 2, 3]
+    esperado = importacao.processar_lote([{"chamadoId": i, "mensagem": t} for i, t in enumerate(textos)])
+    assert [linha["descricao_dataset"] for linha in linhas] == [r["descricao_dataset"] for r in esperado]
+
+
+def test_ids_ausentes_sao_reportados_sem_interromper_o_stream(lotes_processados, banco):
+    banco["interacoes"].insert_many([
+        {"chamadoId": "1", "mensagem": MENSAGEM},
+        {"chamadoId": "3", "mensagem": MENSAGEM.replace("teclado", "monitor")},
+    ])
+    _, linhas = _linhas({"ids": ["1", "2", "3"]})
+
+    assert [linha["chamadoId"] for linha in linhas] == ["1", "2", "3"]
+    assert linhas[1] == {"chamadoId": "2", "erro": "não encontrado"}
+    assert "MONITOR" in linhas[2]["descricao_dataset"]
+    # Nada é gravado
+    assert banco["interacoes_processadas"].count_documents({}) == 0
+
+
+def test_falha_na_consulta_ao_mongo_vira_erro_por_item(lotes_processados, monkeypatch):
+    async def falhar(db, ids):
+        raise ConnectionError("MongoDB indisponível")
+
+    monkeypatch.setattr(controller, "get_db_async", lambda: None)
+    monkeypatch.setattr(controller, "buscar_interacoes_async", falhar)
+    partes, linhas = _linhas({"ids": ["1", "2", "3"]})
+
+    assert len(partes) == 2
+    assert linhas == [{"chamadoId": i, "erro": "falha no processamento"} for i in ("1", "2", "3")]
+
+
+def test_formato_invalido_e_limite_de_itens(monkeypatch):
+    for corpo in ({"chamadoId": "1"}, ["1", "2"], {"ids": ["1", {"id": "2"}]}, {"ids": [["1"]]}):
+        with pytest.raises(HTTPException) as erro:
+            asyncio.run(controller.processar_stream(_requisicao(corpo)[2]))
+        assert erro.value.status_code == 422
+
+    monkeypatch.setattr(controller, "MAX_ITENS_STREAM", 3)
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(controller.processar_stream(_requisicao({"textos": ["a"] * 4})[2]))
+    assert erro.value.status_code == 413
+
+
+def test_desconexao_do_cliente_interrompe_o_processamento(lotes_processados):
+    async def cenario():
+        primeiro_enviado = asyncio.Event()
+
+        async def desconectar_apos_o_primeiro_lote():
+            await primeiro_enviado.wait()
+            return {"type": "http.disconnect"}
+
+        escopo, receive, requisicao = _requisicao({"textos": [MENSAGEM] * 20}, [desconectar_apos_o_primeiro_lote])
+        resposta = await controller.processar_stream(requisicao)
+
+        enviados = []
+
+        async def send(mensagem):
+            if mensagem["type"] == "http.response.body" and mensagem.get("body"):
+                enviados.append(mensagem["body"])
+                primeiro_enviado.set()
+                await asyncio.sleep(0.05)
+
+        await resposta(escopo, receive, send)
+        return enviados
+
+    enviados = asyncio.run(cenario())
+    assert 1 <= len(enviados) < 10
+    # Além do lote enviado, no máximo o seguinte chegou a ser iniciado
+    assert len(lotes_processados) <= 2
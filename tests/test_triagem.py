@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from modules.anonimo.triagem import precisa_ner
+
+AMOSTRA = json.loads((Path(__file__).parent / "dados" / "amostra_pii.json").read_text(encoding="utf-8"))
+TIPOS_NER = {"PERSON", "LOCATION"}
+
+
+def _recall_ner(modo):
+    """Fração dos textos com entidades de NER que a triagem encaminha ao spaCy"""
+    com_entidades = [caso for caso in AMOSTRA if any(e["tipo"] in TIPOS_NER for e in caso["entidades"])]
+    encaminhados = [caso for caso in com_entidades if precisa_ner(caso["texto"], modo)]
+    return len(encaminhados) / len(com_entidades)
+
+
+def test_modo_estrito_nao_perde_textos_com_entidades():
+    assert _recall_ner("estrito") == 1.0
+
+
+def test_modo_estrito_encaminha_todo_texto_com_pii():
+    for caso in AMOSTRA:
+        if caso["entidades"]:
+            assert precisa_ner(caso["texto"], "estrito"), caso["texto"]
+
+
+def test_modo_rapido_encaminha_nomes_compostos():
+    for caso in AMOSTRA:
+        nomes = [e["texto"] for e in caso["entidades"] if e["tipo"] == "PERSON" and " " in e["texto"]]
+        if nomes:
+            assert precisa_ner(caso["texto"], "rapido"), caso["texto"]
+    assert _recall_ner("rapido") >= 0.8
+
+
+@pytest.mark.parametrize("modo", ["estrito", "rapido"])
+def test_textos_sem_entidades_evitam_o_ner(modo):
+    sem_entidades = [caso["texto"] for caso in AMOSTRA if not caso["entidades"]]
+    evitados = [texto for texto in sem_entidades if not precisa_ner(texto, modo)]
+    assert len(evitados) / len(sem_entidades) >= 0.7
+
+
+def test_modo_desligado_sempre_usa_ner():
+    assert all(precisa_ner(caso["texto"], "desligado") for caso in AMOSTRA)